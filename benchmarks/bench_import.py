@@ -0,0 +1,174 @@
+"""
+End-to-end import benchmark on synthetic projects with the mock API.
+
+Generates a project in Supervisely format in the local "Team Files" directory and runs
+the import stages against the mock API: download_data (download and scanning of the
+tree), check_dataset / check_items (validation, empty annotations for images without
+them), upload_project and upload_only_images. Throughput of every stage and peak memory
+are taken from the import metrics report.
+
+The report can be saved with --output and compared with a saved baseline with --baseline,
+the script exits with code 1 if throughput of any stage drops (or peak memory grows) by
+more than --tolerance.
+
+Usage: python benchmarks/bench_import.py --images 1000 --objects 20 \
+    --geometry-mix rectangle=5,polygon=3,bitmap=1 --broken 0.05 --output report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from common import setup_env, timer
+
+# settings of the app are read from the environment when its modules are imported
+SETTINGS_ENV = {
+    "validation_workers": "modal.state.validationWorkers",
+    "upload_workers": "modal.state.uploadWorkers",
+    "dedup": "modal.state.dedupImages",
+    "json_backend": "modal.state.jsonBackend",
+    "deep_validation": "modal.state.deepValidation",
+    "geometry_validation": "modal.state.geometryValidation",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--datasets", type=int, default=2)
+    parser.add_argument("--images", type=int, default=500, help="images per dataset")
+    parser.add_argument("--objects", type=int, default=10, help="objects per image")
+    parser.add_argument("--geometry-mix", default="rectangle=5,polygon=3,bitmap=1,point=1")
+    parser.add_argument("--broken", type=float, default=0.0, help="broken annotations fraction")
+    parser.add_argument("--no-ann", type=float, default=0.0, help="images without annotations")
+    parser.add_argument("--image-size", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--validation-workers", type=int)
+    parser.add_argument("--upload-workers", type=int)
+    parser.add_argument("--dedup", action="store_true")
+    parser.add_argument("--json-backend")
+    parser.add_argument("--deep-validation", action="store_true")
+    parser.add_argument("--geometry-validation", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the report to the file")
+    parser.add_argument("--baseline", help="compare with the report saved before")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args()
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for stage, stats in report["stages"].items():
+        base_stats = baseline["stages"].get(stage)
+        if base_stats is None or base_stats.get("items_per_sec", 0) == 0 or stats["items"] == 0:
+            continue
+        if stats.get("items_per_sec", 0) < base_stats["items_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{stage}: {stats.get('items_per_sec', 0)} items/s, "
+                f"baseline {base_stats['items_per_sec']} items/s"
+            )
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(
+            f"peak RSS: {report['peak_rss_mb']} MB, baseline {baseline['peak_rss_mb']} MB"
+        )
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"{'stage':>20} {'calls':>6} {'wall, s':>9} {'items':>8} {'items/s':>10} {'MB/s':>8}")
+    for stage, stats in report["stages"].items():
+        print(
+            f"{stage:>20} {stats['calls']:>6} {stats['wall_seconds']:>9.3f} "
+            f"{stats['items']:>8} {stats.get('items_per_sec', 0):>10.1f} "
+            f"{stats.get('bytes_per_sec', 0) / 1024 / 1024:>8.1f}"
+        )
+    print(
+        f"total {report['total_seconds']:.3f} s, peak RSS {report['peak_rss_mb']} MB "
+        f"(validation workers {report['peak_rss_children_mb']} MB)"
+    )
+
+
+def main():
+    args = parse_args()
+    for name, env_name in SETTINGS_ENV.items():
+        value = getattr(args, name)
+        if value is not None and value is not False:
+            os.environ[env_name] = str(value).lower()
+    setup_env()
+
+    import supervisely as sly  # noqa: E402
+
+    import json_backend  # noqa: E402
+    import sly_functions as f  # noqa: E402
+    import sly_globals as g  # noqa: E402
+    from mock_api import MockApi  # noqa: E402
+    from synthetic import generate_project, parse_geometry_mix  # noqa: E402
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        team_files_dir = os.path.join(tmp_dir, "team_files")
+        input_dir = os.path.join(team_files_dir, g.INPUT_DIR.strip("/"))
+        size = generate_project(
+            os.path.join(input_dir, "project"),
+            args.datasets,
+            args.images,
+            args.objects,
+            parse_geometry_mix(args.geometry_mix),
+            args.broken,
+            args.no_ann,
+            args.image_size,
+            args.seed,
+        )
+        print(
+            f"{args.datasets} datasets x {args.images} images, {args.objects} objects per image, "
+            f"{size / 1024 / 1024:.1f} MB"
+        )
+
+        api = MockApi(team_files_dir, args.latency)
+        results = {}
+        with timer(results, "import"):
+            project_dirs, _, index = f.download_data(api, g.TASK_ID, os.path.join(tmp_dir, "data"))
+            for project_dir in project_dirs:
+                meta = sly.ProjectMeta.from_json(
+                    json_backend.load_json_file(os.path.join(project_dir, "meta.json"))
+                )
+                ann_filter = f.get_annotation_filter(meta)
+                for dataset_dir in index.listdir(project_dir):
+                    f.check_dataset(
+                        os.path.join(project_dir, dataset_dir),
+                        meta,
+                        ann_filter,
+                        index,
+                    )
+                f.upload_project(api, project_dir, "project")
+                img_dirs = [
+                    os.path.join(project_dir, dataset_dir, "img")
+                    for dataset_dir in index.subdirs(project_dir)
+                ]
+                f.upload_only_images(api, img_dirs, index=index)
+
+    requests_cnt, uploaded_bytes = api.stats()
+    report = g.metrics.report()
+    report["requests"] = requests_cnt
+    report["uploaded_bytes"] = uploaded_bytes
+    report["args"] = vars(args)
+    print_report(report)
+    print(
+        f"import {results['import']:.3f} s, {requests_cnt} requests, "
+        f"{uploaded_bytes / 1024 / 1024:.1f} MB uploaded"
+    )
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+JSON backends benchmark on annotation files.
+
+Generates annotation files with rectangles, polygons and bitmaps (similar to the projects
+exported from Supervisely) and measures parsing and writing time with every installed
+backend of json_backend (stdlib json, ujson, orjson).
+
+Usage: python benchmarks/bench_json.py [files_cnt] [objects_per_file]
+"""
+
+import base64
+import os
+import random
+import sys
+import tempfile
+
+from common import setup_env, timer
+
+setup_env()
+
+import json_backend  # noqa: E402
+
+
+def make_annotation(objects_cnt: int) -> dict:
+    objects = []
+    for i in range(objects_cnt):
+        kind = i % 3
+        if kind == 0:
+            x, y = random.randint(0, 1800), random.randint(0, 1000)
+            objects.append(
+                {
+                    "classTitle": "car",
+                    "geometryType": "rectangle",
+                    "points": {"exterior": [[x, y], [x + 100, y + 60]], "interior": []},
+                    "tags": [],
+                }
+            )
+        elif kind == 1:
+            exterior = [[random.randint(0, 1920), random.randint(0, 1080)] for _ in range(64)]
+            objects.append(
+                {
+                    "classTitle": "road",
+                    "geometryType": "polygon",
+                    "points": {"exterior": exterior, "interior": []},
+                    "tags": [{"name": "occluded", "value": None}],
+                }
+            )
+        else:
+            data = base64.b64encode(os.urandom(2048)).decode()
+            objects.append(
+                {
+                    "classTitle": "person",
+                    "geometryType": "bitmap",
+                    "bitmap": {"data": data, "origin": [10, 20]},
+                    "tags": [],
+                }
+            )
+    return {
+        "description": "",
+        "size": {"height": 1080, "width": 1920},
+        "tags": [{"name": "split", "value": "train"}],
+        "objects": objects,
+    }
+
+
+def main(files_cnt: int = 500, objects_cnt: int = 60):
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i in range(files_cnt):
+            path = os.path.join(tmp_dir, f"{i}.jpg.json")
+            json_backend.set_backend("json")
+            json_backend.dump_json_file(make_annotation(objects_cnt), path)
+            paths.append(path)
+        total_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+        print(f"{files_cnt} files, {total_mb:.1f} MB")
+        print(f"{'backend':>8} {'load, s':>8} {'MB/s':>8} {'dump, s':>8}")
+        for backend in json_backend.AVAILABLE_BACKENDS:
+            json_backend.set_backend(backend)
+            results = {}
+            with timer(results, "load"):
+                data = [json_backend.load_json_file(path) for path in paths]
+            with timer(results, "dump"):
+                for path, ann in zip(paths, data):
+                    json_backend.dump_json_file(ann, path)
+            del data
+            print(
+                f"{backend:>8} {results['load']:>8.3f} {total_mb / results['load']:>8.1f} "
+                f"{results['dump']:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,49 @@
+"""
+Image to annotation matching benchmark.
+
+Matches N image names against N annotation names (half in the new "img.jpg.json" naming,
+half in the old "img.json" one, plus orphan annotations) and computes leftover annotations
+the same way check_items does. Time per item must stay flat while N grows.
+
+Usage: python benchmarks/bench_matching.py [max_items]
+"""
+
+import sys
+
+from common import setup_env, timer
+
+setup_env()
+
+import sly_functions as f  # noqa: E402
+
+
+def make_names(n: int):
+    img_names = [f"image_{i:07d}.jpg" for i in range(n)]
+    ann_names = [
+        f"image_{i:07d}.jpg.json" if i % 2 == 0 else f"image_{i:07d}.json" for i in range(n)
+    ]
+    ann_names.extend(f"orphan_{i:07d}.json" for i in range(n // 100))
+    return img_names, ann_names
+
+
+def match(img_names, ann_names):
+    res_ann_names = {f.get_effective_ann_name(name, ann_names) for name in img_names}
+    return ann_names - res_ann_names
+
+
+def main(max_items: int = 1_000_000):
+    n = 1000
+    print(f"{'items':>10} {'seconds':>10} {'ns/item':>10}")
+    while n <= max_items:
+        img_names, ann_names = make_names(n)
+        ann_names = set(ann_names)
+        results = {}
+        with timer(results, n):
+            leftover = match(img_names, ann_names)
+        assert len(leftover) == n // 100
+        print(f"{n:>10} {results[n]:>10.3f} {results[n] / n * 1e9:>10.0f}")
+        n *= 10
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
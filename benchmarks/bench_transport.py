@@ -0,0 +1,139 @@
+"""
+API transport benchmark with a local mock server emulating network round trip time.
+
+Every request of the mock server takes one RTT, every new connection costs --handshake-rtts
+more (TCP and TLS handshakes), a fraction of requests can fail with 503. The same number
+of API calls is sent with the default sly.Api transport (new connection per request) and
+with transport.PooledTransport (keep-alive connections), sequentially and from several
+threads, as the import does.
+
+Usage: python benchmarks/bench_transport.py --requests 200 --rtt 0.05 --threads 1,8,32
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import setup_env
+
+setup_env()
+
+import supervisely as sly  # noqa: E402
+
+import transport  # noqa: E402
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rtt: float, handshake_rtts: float, error_rate: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.rtt = rtt
+        self.handshake_rtts = handshake_rtts
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    @property
+    def address(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.rtt * self.server.handshake_rtts)
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > 0:
+            self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests += 1
+            failed = self.server.error_rate > 0 and (
+                self.server.requests % round(1 / self.server.error_rate) == 0
+            )
+        time.sleep(self.server.rtt)
+        status, body = (503, b"{}") if failed else (200, json.dumps({"id": 1}).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=0.05, help="round trip time, seconds")
+    parser.add_argument("--handshake-rtts", type=float, default=2, help="RTTs per connection")
+    parser.add_argument("--threads", default="1,8,32")
+    parser.add_argument("--connections", type=int, default=32, help="pool size")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 errors")
+    return parser.parse_args()
+
+
+def run(server: MockServer, api: sly.Api, requests_cnt: int, threads: int) -> dict:
+    server.connections, server.requests = 0, 0
+
+    def _call(idx):
+        api.post("images.info", {"id": idx})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(_call, range(requests_cnt)))
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "calls_per_sec": requests_cnt / seconds,
+        "connections": server.connections,
+        "requests": server.requests,
+    }
+
+
+def main():
+    args = parse_args()
+    server = MockServer(args.rtt, args.handshake_rtts, args.error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def _make_api(pooled: bool) -> sly.Api:
+        api = sly.Api(server.address, "x" * 128, retry_sleep_sec=args.rtt, ignore_task_id=True)
+        api._skip_https_redirect_check = True
+        if pooled:
+            transport.PooledTransport(api, args.connections).install()
+        return api
+
+    print(
+        f"{args.requests} calls, RTT {args.rtt * 1000:.0f} ms, "
+        f"{args.handshake_rtts} RTTs per new connection, error rate {args.error_rate}"
+    )
+    print(
+        f"{'transport':>10} {'threads':>8} {'seconds':>9} {'calls/s':>9} {'conns':>6} {'reqs':>6}"
+    )
+    for threads in [int(value) for value in args.threads.split(",")]:
+        for name, pooled in [("default", False), ("pooled", True)]:
+            stats = run(server, _make_api(pooled), args.requests, threads)
+            print(
+                f"{name:>10} {threads:>8} {stats['seconds']:>9.3f} {stats['calls_per_sec']:>9.1f} "
+                f"{stats['connections']:>6} {stats['requests']:>6}"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks import the app modules from src/ directly. The modules read the task context
+from the environment on import, so placeholder values are set for everything that is
+not provided (no requests are sent to the server by the benchmarks).
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+PLACEHOLDER_ENV = {
+    "SERVER_ADDRESS": "http://localhost",
+    "API_TOKEN": "benchmark",
+    "AGENT_TOKEN": "benchmark",
+    "TASK_ID": "0",
+    "TEAM_ID": "0",
+    "WORKSPACE_ID": "0",
+    "FOLDER": "/benchmark/",
+}
+
+
+def setup_env() -> None:
+    for key, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(key, value)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+
+@contextmanager
+def timer(results: dict, key):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
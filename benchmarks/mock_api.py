@@ -0,0 +1,267 @@
+"""
+Local stand-in for sly.Api used by the benchmarks.
+
+Implements the subset of the API used by the import (Team Files download, projects,
+datasets, images and annotations upload) on top of in-memory storage. "Team Files" is
+a local directory. Uploaded files are read completely, so the client side cost of the
+upload is measured, and every request may be delayed to simulate the server latency.
+"""
+
+import itertools
+import os
+import shutil
+import threading
+import time
+import types
+from collections import namedtuple
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from supervisely.io.fs import get_file_hash
+
+ProjectInfo = namedtuple("ProjectInfo", "id name items_count")
+DatasetInfo = namedtuple("DatasetInfo", "id name project_id")
+ImageInfo = namedtuple("ImageInfo", "id name hash dataset_id size", defaults=(None,))
+FileInfo = namedtuple("FileInfo", "id path sizeb")
+
+
+class MockServer:
+    """Storage of the mock API shared by its modules."""
+
+    def __init__(self, team_files_dir: str, latency: float = 0.0):
+        self.team_files_dir = team_files_dir
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.projects = {}
+        self.datasets = {}
+        self.images = {}
+        self.annotations = {}
+        self.hashes = set()
+        self.requests_cnt = 0
+        self.uploaded_bytes = 0
+
+    def request(self) -> None:
+        with self.lock:
+            self.requests_cnt += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def next_id(self) -> int:
+        with self.lock:
+            return next(self.ids)
+
+    def local_path(self, remote_path: str) -> str:
+        return os.path.join(self.team_files_dir, remote_path.lstrip("/"))
+
+
+class _FileApi:
+    def __init__(self, server: MockServer):
+        self._server = server
+
+    def is_on_agent(self, remote_path: str) -> bool:
+        return False
+
+    def get_directory_size(self, team_id: int, path: str) -> int:
+        self._server.request()
+        local_dir = self._server.local_path(path)
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(local_dir)
+            for name in files
+        )
+
+    def get_info_by_path(self, team_id: int, remote_path: str) -> FileInfo:
+        self._server.request()
+        local_path = self._server.local_path(remote_path)
+        return FileInfo(0, remote_path, os.path.getsize(local_path))
+
+    def download(
+        self,
+        team_id: int,
+        remote_path: str,
+        local_save_path: str,
+        progress_cb: Optional[Callable] = None,
+        **kwargs,
+    ) -> None:
+        self._server.request()
+        os.makedirs(os.path.dirname(local_save_path), exist_ok=True)
+        shutil.copyfile(self._server.local_path(remote_path), local_save_path)
+        if progress_cb is not None:
+            progress_cb(os.path.getsize(local_save_path))
+
+    def download_directory(
+        self,
+        team_id: int,
+        remote_path: str,
+        local_save_path: str,
+        progress_cb: Optional[Callable] = None,
+    ) -> None:
+        local_dir = self._server.local_path(remote_path)
+        for root, _, files in os.walk(local_dir):
+            save_dir = os.path.join(local_save_path, os.path.relpath(root, local_dir))
+            os.makedirs(save_dir, exist_ok=True)
+            for name in files:
+                self._server.request()
+                shutil.copyfile(os.path.join(root, name), os.path.join(save_dir, name))
+                if progress_cb is not None:
+                    progress_cb(os.path.getsize(os.path.join(save_dir, name)))
+
+
+class _ProjectApi:
+    def __init__(self, server: MockServer):
+        self._server = server
+
+    def create(self, workspace_id: int, name: str, **kwargs) -> ProjectInfo:
+        self._server.request()
+        project_id = self._server.next_id()
+        self._server.projects[project_id] = {"name": name, "meta": None}
+        return ProjectInfo(project_id, name, 0)
+
+    def update_meta(self, id: int, meta: dict) -> dict:
+        self._server.request()
+        self._server.projects[id]["meta"] = meta
+        return meta
+
+    def get_info_by_id(self, id: int) -> Optional[ProjectInfo]:
+        self._server.request()
+        project = self._server.projects.get(id)
+        if project is None:
+            return None
+        with self._server.lock:
+            datasets = {ds_id for ds_id, ds in self._server.datasets.items() if ds.project_id == id}
+            items_count = sum(1 for im in self._server.images.values() if im.dataset_id in datasets)
+        return ProjectInfo(id, project["name"], items_count)
+
+    def remove(self, id: int) -> None:
+        self._server.request()
+        self._server.projects.pop(id, None)
+
+
+class _DatasetApi:
+    def __init__(self, server: MockServer):
+        self._server = server
+
+    def create(self, project_id: int, name: str, **kwargs) -> DatasetInfo:
+        self._server.request()
+        dataset = DatasetInfo(self._server.next_id(), name, project_id)
+        self._server.datasets[dataset.id] = dataset
+        return dataset
+
+    def get_info_by_id(self, id: int) -> Optional[DatasetInfo]:
+        self._server.request()
+        return self._server.datasets.get(id)
+
+
+class _ImageApi:
+    def __init__(self, server: MockServer):
+        self._server = server
+
+    def _add_images(self, dataset_id: int, names: List[str], hashes: List[str]):
+        self._server.request()
+        images = [
+            ImageInfo(self._server.next_id(), name, image_hash, dataset_id)
+            for name, image_hash in zip(names, hashes)
+        ]
+        with self._server.lock:
+            for image in images:
+                self._server.images[image.id] = image
+        return images
+
+    def _upload_data_bulk(self, func_item_to_byte_stream: Callable, items_hashes: Iterable):
+        self._server.request()
+        for item, image_hash in items_hashes:
+            with func_item_to_byte_stream(item) as stream:
+                size = len(stream.read())
+            with self._server.lock:
+                self._server.hashes.add(image_hash)
+                self._server.uploaded_bytes += size
+
+    def check_existing_hashes(self, hashes: List[str]) -> List[str]:
+        self._server.request()
+        with self._server.lock:
+            return [image_hash for image_hash in hashes if image_hash in self._server.hashes]
+
+    def upload_hashes(
+        self,
+        dataset_id: int,
+        names: List[str],
+        hashes: List[str],
+        progress_cb: Optional[Callable] = None,
+        metas: Optional[List[dict]] = None,
+    ) -> List[ImageInfo]:
+        images = self._add_images(dataset_id, names, hashes)
+        if progress_cb is not None:
+            progress_cb(len(images))
+        return images
+
+    def upload_paths(
+        self,
+        dataset_id: int,
+        names: List[str],
+        paths: List[str],
+        progress_cb: Optional[Callable] = None,
+        metas: Optional[List[dict]] = None,
+    ) -> List[ImageInfo]:
+        hashes = [get_file_hash(path) for path in paths]
+        self._upload_data_bulk(lambda path: open(path, "rb"), zip(paths, hashes))
+        return self.upload_hashes(dataset_id, names, hashes, progress_cb, metas)
+
+    def remove_batch(self, ids: List[int]) -> None:
+        self._server.request()
+        with self._server.lock:
+            for id in ids:
+                self._server.images.pop(id)
+                self._server.annotations.pop(id, None)
+
+    def rename(self, id: int, name: str) -> ImageInfo:
+        self._server.request()
+        with self._server.lock:
+            image = self._server.images[id] = self._server.images[id]._replace(name=name)
+        return image
+
+    def get_list(self, dataset_id: int) -> List[ImageInfo]:
+        self._server.request()
+        with self._server.lock:
+            return [im for im in self._server.images.values() if im.dataset_id == dataset_id]
+
+
+class _AnnotationApi:
+    def __init__(self, server: MockServer):
+        self._server = server
+
+    def upload_paths(
+        self, img_ids: List[int], ann_paths: List[str], progress_cb: Optional[Callable] = None
+    ) -> None:
+        self._server.request()
+        for img_id, ann_path in zip(img_ids, ann_paths):
+            with open(ann_path, "rb") as f:
+                data = f.read()
+            with self._server.lock:
+                self._server.annotations[img_id] = len(data)
+                self._server.uploaded_bytes += len(data)
+        if progress_cb is not None:
+            progress_cb(len(img_ids))
+
+
+class MockApi:
+    """
+    Stand-in for sly.Api with the modules used by the import.
+
+    :param team_files_dir: Local directory that plays the role of Team Files.
+    :type team_files_dir: str
+    :param latency: Delay of every request in seconds.
+    :type latency: float
+    """
+
+    def __init__(self, team_files_dir: str, latency: float = 0.0):
+        self.server = MockServer(team_files_dir, latency)
+        self.file = _FileApi(self.server)
+        self.project = _ProjectApi(self.server)
+        self.dataset = _DatasetApi(self.server)
+        self.image = _ImageApi(self.server)
+        self.annotation = _AnnotationApi(self.server)
+        self.task = types.SimpleNamespace(set_fields=lambda *args, **kwargs: None)
+
+    def stats(self) -> Tuple[int, int]:
+        """Number of requests and uploaded bytes."""
+        return self.server.requests_cnt, self.server.uploaded_bytes
@@ -0,0 +1,168 @@
+"""
+Generator of synthetic projects in Supervisely format for the benchmarks.
+
+Images are small unique JPEGs (the content differs, so the hashes differ), annotations
+contain the requested mix of geometries. A fraction of annotations can be broken in the
+ways met in the real data (unknown class, wrong number of points, missing fields, truncated
+JSON) and a fraction of images can have no annotation file at all.
+"""
+
+import json
+import os
+import random
+from typing import Dict
+
+import cv2
+import numpy as np
+import supervisely as sly
+from supervisely.geometry.geometry import Geometry
+
+GEOMETRIES = {
+    "rectangle": sly.Rectangle,
+    "polygon": sly.Polygon,
+    "bitmap": sly.Bitmap,
+    "point": sly.Point,
+    "polyline": sly.Polyline,
+}
+# labels of every geometry are sampled from the pool of templates
+TEMPLATES_CNT = 16
+
+
+def parse_geometry_mix(value: str) -> Dict[str, float]:
+    """Parse the mix in the "rectangle=5,polygon=3,bitmap=1" format to geometry weights."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in GEOMETRIES:
+            raise ValueError(f"Unknown geometry {name}, available: {sorted(GEOMETRIES)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def _make_geometry(name: str, rng: random.Random, height: int, width: int) -> Geometry:
+    if name == "rectangle":
+        top, left = rng.randrange(height - 1), rng.randrange(width - 1)
+        return sly.Rectangle(
+            top, left, rng.randrange(top + 1, height), rng.randrange(left + 1, width)
+        )
+    if name in ("polygon", "polyline"):
+        points = [
+            sly.PointLocation(rng.randrange(height), rng.randrange(width))
+            for _ in range(rng.randint(3, 64))
+        ]
+        return sly.Polygon(points) if name == "polygon" else sly.Polyline(points)
+    if name == "bitmap":
+        mask_h, mask_w = rng.randint(8, height // 2), rng.randint(8, width // 2)
+        mask = np.random.RandomState(rng.randrange(2**31)).rand(mask_h, mask_w) > 0.5
+        mask[0, 0] = True
+        origin = sly.PointLocation(rng.randrange(height - mask_h), rng.randrange(width - mask_w))
+        return sly.Bitmap(mask, origin=origin)
+    return sly.Point(rng.randrange(height), rng.randrange(width))
+
+
+def _break_annotation(ann_json: dict, rng: random.Random) -> str:
+    kind = rng.randrange(4)
+    if kind == 0 or len(ann_json["objects"]) == 0:
+        return json.dumps(ann_json)[: rng.randint(1, 64)]
+    label = rng.choice(ann_json["objects"])
+    if kind == 1:
+        label["classTitle"] = "unknown_class"
+    elif kind == 2:
+        label.pop("points", None)
+        label.pop("bitmap", None)
+    else:
+        ann_json.pop("size")
+    return json.dumps(ann_json)
+
+
+def generate_project(
+    project_dir: str,
+    datasets_cnt: int = 2,
+    images_cnt: int = 100,
+    objects_cnt: int = 10,
+    geometry_mix: Dict[str, float] = None,
+    broken_fraction: float = 0.0,
+    no_ann_fraction: float = 0.0,
+    image_size: int = 64,
+    seed: int = 0,
+) -> int:
+    """
+    Create project directory in Supervisely format.
+
+    :param images_cnt: Number of images in every dataset.
+    :param objects_cnt: Number of objects on every image.
+    :param geometry_mix: Geometry name -> weight, rectangles only by default.
+    :param broken_fraction: Fraction of broken annotations.
+    :param no_ann_fraction: Fraction of images without annotation files.
+    :param image_size: Side of the generated images in pixels.
+    :return: Total size of the project files in bytes.
+    :rtype: int
+    """
+    rng = random.Random(seed)
+    geometry_mix = geometry_mix or {"rectangle": 1.0}
+    names, weights = list(geometry_mix), list(geometry_mix.values())
+    height, width = image_size, image_size
+
+    occluded = sly.TagMeta("occluded", sly.TagValueType.NONE)
+    split = sly.TagMeta("split", sly.TagValueType.ANY_STRING)
+    obj_classes = {name: sly.ObjClass(name, GEOMETRIES[name]) for name in names}
+    meta = sly.ProjectMeta(
+        obj_classes=sly.ObjClassCollection(list(obj_classes.values())),
+        tag_metas=sly.TagMetaCollection([occluded, split]),
+    )
+    os.makedirs(project_dir, exist_ok=True)
+    with open(os.path.join(project_dir, "meta.json"), "w") as f:
+        json.dump(meta.to_json(), f)
+
+    templates = {
+        name: [
+            sly.Label(
+                _make_geometry(name, rng, height, width),
+                obj_classes[name],
+                sly.TagCollection([sly.Tag(occluded)]) if i % 4 == 0 else None,
+            ).to_json()
+            for i in range(TEMPLATES_CNT)
+        ]
+        for name in names
+    }
+    base_image = np.random.RandomState(seed).randint(0, 256, (height, width, 3), np.uint8)
+
+    total_size = 0
+    for ds_idx in range(datasets_cnt):
+        img_dir = os.path.join(project_dir, f"ds{ds_idx}", "img")
+        ann_dir = os.path.join(project_dir, f"ds{ds_idx}", "ann")
+        os.makedirs(img_dir, exist_ok=True)
+        os.makedirs(ann_dir, exist_ok=True)
+        for img_idx in range(images_cnt):
+            img_name = f"image_{img_idx:07d}.jpg"
+            image = base_image.copy()
+            # unique content of every image in the project
+            image[0, :4] = np.frombuffer(
+                (ds_idx * images_cnt + img_idx).to_bytes(12, "big"), np.uint8
+            ).reshape(4, 3)
+            img_data = cv2.imencode(".jpg", image)[1].tobytes()
+            with open(os.path.join(img_dir, img_name), "wb") as f:
+                f.write(img_data)
+            total_size += len(img_data)
+
+            if rng.random() < no_ann_fraction:
+                continue
+            labels = [
+                dict(rng.choice(templates[name]))
+                for name in rng.choices(names, weights, k=objects_cnt)
+            ]
+            ann_json = {
+                "description": "",
+                "size": {"height": height, "width": width},
+                "tags": [{"name": "split", "value": "train"}],
+                "objects": labels,
+            }
+            if rng.random() < broken_fraction:
+                ann_data = _break_annotation(ann_json, rng)
+            else:
+                ann_data = json.dumps(ann_json)
+            with open(os.path.join(ann_dir, img_name + ".json"), "w") as f:
+                f.write(ann_data)
+            total_size += len(ann_data)
+    return total_size
@@ -0,0 +1,75 @@
+from typing import Iterable, Union
+
+import supervisely as sly
+from supervisely.annotation.annotation import AnnotationJsonFields
+from supervisely.annotation.label import LabelJsonFields
+from supervisely.annotation.tag import TagJsonFields
+
+
+def _tag_name(tag_json: Union[dict, str]) -> str:
+    return tag_json if isinstance(tag_json, str) else tag_json.get(TagJsonFields.TAG_NAME)
+
+
+class AnnotationFilter:
+    """
+    Remove labels of the given classes and the given tags (of images and labels) from
+    annotations in Supervisely JSON format.
+
+    Annotations are filtered as parsed dicts, without constructing sly.Annotation objects.
+
+    :param remove_classes: Names of classes which labels are removed.
+    :type remove_classes: Iterable[str]
+    :param remove_tags: Names of tags to remove.
+    :type remove_tags: Iterable[str]
+    """
+
+    def __init__(self, remove_classes: Iterable[str] = (), remove_tags: Iterable[str] = ()):
+        self.remove_classes = sorted(set(remove_classes))
+        self.remove_tags = sorted(set(remove_tags))
+        self._remove_classes = set(self.remove_classes)
+        self._remove_tags = set(self.remove_tags)
+
+    def is_empty(self) -> bool:
+        return len(self._remove_classes) == 0 and len(self._remove_tags) == 0
+
+    def is_removed(self, label_json: dict) -> bool:
+        """Check that the label is removed by the filter, so it does not need validation."""
+        return label_json.get(LabelJsonFields.OBJ_CLASS_NAME) in self._remove_classes
+
+    def _filter_tags(self, owner_json: dict, field: str) -> bool:
+        tags = owner_json.get(field)
+        if not isinstance(tags, list):
+            return False
+        kept = [tag for tag in tags if _tag_name(tag) not in self._remove_tags]
+        if len(kept) == len(tags):
+            return False
+        owner_json[field] = kept
+        return True
+
+    def apply(self, ann_json: dict) -> bool:
+        """
+        Filter the annotation in place.
+
+        :param ann_json: Annotation in Supervisely JSON format.
+        :type ann_json: dict
+        :return: True if the annotation was changed.
+        :rtype: bool
+        """
+        if self.is_empty():
+            return False
+        changed = False
+        labels = ann_json[AnnotationJsonFields.LABELS]
+        if len(self._remove_classes) > 0:
+            kept = [label for label in labels if not self.is_removed(label)]
+            if len(kept) != len(labels):
+                ann_json[AnnotationJsonFields.LABELS] = labels = kept
+                changed = True
+        if len(self._remove_tags) > 0:
+            changed |= self._filter_tags(ann_json, AnnotationJsonFields.IMG_TAGS)
+            for label in labels:
+                changed |= self._filter_tags(label, LabelJsonFields.TAGS)
+        return changed
+
+    def filter_meta(self, meta: sly.ProjectMeta) -> sly.ProjectMeta:
+        """Remove the filtered classes and tags from the project meta."""
+        return meta.delete_obj_classes(self.remove_classes).delete_tag_metas(self.remove_tags)
@@ -0,0 +1,637 @@
+import bisect
+import heapq
+import io
+import os
+import re
+import shutil
+import subprocess
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+import supervisely as sly
+from supervisely.api.module_api import ApiField
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZIP_MAGIC = b"PK\x03\x04"
+RANGE_READ_AHEAD = 4 * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+ARCHIVE_EXTENSIONS = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tar.xz",
+    ".tar.zst",
+    ".tzst",
+)
+# parts of split archives: "project.zip.001", "project.tar.part1"
+SPLIT_PART_RE = re.compile(r"^(?P<base>.+)\.(?:(?P<number>\d{3,})|part(?P<part>\d+))$", re.I)
+# formats are detected by the first bytes, the file names may be wrong (e.g. external links)
+MAGIC_BYTES = {
+    "zip": (ZIP_MAGIC, b"PK\x05\x06"),
+    "gz": (b"\x1f\x8b",),
+    "bz2": (b"BZh",),
+    "xz": (b"\xfd7zXZ\x00",),
+    "zst": (b"\x28\xb5\x2f\xfd",),
+}
+# decompressors that run in a separate process, in parallel with the extraction of tar members,
+# the first installed one is used
+DECOMPRESS_COMMANDS = {
+    "gz": (["pigz", "-dc"], ["gzip", "-dc"]),
+    "bz2": (["lbzip2", "-dc"], ["pbzip2", "-dc"], ["bzip2", "-dc"]),
+    "xz": (["xz", "-dc", "-T0"],),
+    "zst": (["zstd", "-dcq"],),
+}
+NESTED_ARCHIVES_DEPTH = 3
+
+
+class StreamingNotSupported(RuntimeError):
+    """Archive can not be extracted on the fly and has to be downloaded first."""
+
+
+class ProgressReader(io.RawIOBase):
+    """Read-only stream wrapper that reports the number of consumed bytes to progress_cb."""
+
+    def __init__(self, stream, progress_cb: Optional[Callable] = None):
+        self._stream = stream
+        self._progress_cb = progress_cb
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        if self._progress_cb is not None and len(data) > 0:
+            self._progress_cb(len(data))
+        return len(data)
+
+
+class _Prepend(io.RawIOBase):
+    """Stream that returns already consumed head bytes before the rest of the stream."""
+
+    def __init__(self, head: bytes, stream):
+        self._head = head
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if len(self._head) > 0:
+            length = min(len(buffer), len(self._head))
+            buffer[:length] = self._head[:length]
+            self._head = self._head[length:]
+            return length
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class HttpRangeReader(io.RawIOBase):
+    """
+    Seekable read-only file over HTTP Range requests.
+
+    Lets zipfile read the central directory at the end of a remote archive and then fetch only
+    the member data, without saving the archive to the disk. Every request reads at least
+    RANGE_READ_AHEAD bytes, so small reads of zip headers do not turn into separate requests.
+    """
+
+    def __init__(self, url: str, size: int, session: requests.Session = None):
+        self._url = url
+        self._size = size
+        self._session = session or requests.Session()
+        self._pos = 0
+        self._buffer = b""
+        self._buffer_start = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._pos
+
+    def _fetch(self, start: int, length: int):
+        end = min(start + max(length, RANGE_READ_AHEAD), self._size) - 1
+        response = self._session.get(self._url, headers={"Range": f"bytes={start}-{end}"})
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RuntimeError("Server ignored the Range header.")
+        self._buffer = response.content
+        self._buffer_start = start
+
+    def readinto(self, buffer):
+        if self._pos >= self._size or len(buffer) == 0:
+            return 0
+        length = min(len(buffer), self._size - self._pos)
+        offset = self._pos - self._buffer_start
+        if offset < 0 or offset + length > len(self._buffer):
+            self._fetch(self._pos, length)
+            offset = 0
+        buffer[:length] = self._buffer[offset : offset + length]
+        self._pos += length
+        return length
+
+
+def _safe_path(dst_dir: str, member_name: str) -> str:
+    path = os.path.realpath(os.path.join(dst_dir, member_name))
+    if os.path.commonpath([path, os.path.realpath(dst_dir)]) != os.path.realpath(dst_dir):
+        raise RuntimeError(f"Archive member is outside of the target directory: {member_name}")
+    return path
+
+
+def extract_tar_stream(stream, dst_dir: str) -> int:
+    """
+    Extract tar (optionally gz, bz2 or xz compressed) archive from the non-seekable stream
+    member by member as the data arrives.
+
+    :return: Number of extracted files.
+    :rtype: int
+    """
+    files_cnt = 0
+    with tarfile.open(fileobj=stream, mode="r|*") as tar:
+        for member in tar:
+            path = _safe_path(dst_dir, member.name)
+            if member.isdir():
+                sly.fs.mkdir(path)
+            elif member.isfile():
+                sly.fs.ensure_base_path(path)
+                with tar.extractfile(member) as src, open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                files_cnt += 1
+            # links and special files are not expected in the projects and are skipped
+    return files_cnt
+
+
+def extract_zip(
+    fileobj,
+    dst_dir: str,
+    progress_cb: Optional[Callable] = None,
+    members: Optional[Iterable[str]] = None,
+) -> int:
+    """
+    Extract zip archive from the seekable file object.
+
+    :param members: Names of the members to extract, all members by default.
+    :type members: Iterable[str], optional
+    :return: Number of extracted files.
+    :rtype: int
+    """
+    files_cnt = 0
+    members = set(members) if members is not None else None
+    with zipfile.ZipFile(fileobj) as archive:
+        for member in archive.infolist():
+            if members is not None and member.filename not in members:
+                continue
+            path = _safe_path(dst_dir, member.filename)
+            if member.is_dir():
+                sly.fs.mkdir(path)
+                continue
+            sly.fs.ensure_base_path(path)
+            with archive.open(member) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            files_cnt += 1
+            if progress_cb is not None:
+                progress_cb(member.compress_size)
+    return files_cnt
+
+
+def extract_from_link(
+    link: str, dst_dir: str, progress_cb_factory: Callable[[int], Callable]
+) -> int:
+    """
+    Extract archive from the external link without saving it to the disk.
+
+    Tar archives are extracted from the HTTP stream, zip archives are read with Range
+    requests (the central directory first, then the members). Raises StreamingNotSupported
+    before anything is extracted if the server can not serve zip archive by ranges.
+
+    :param link: Link to the archive.
+    :type link: str
+    :param dst_dir: Directory to extract archive to.
+    :type dst_dir: str
+    :param progress_cb_factory: Function that creates progress callback by total size in bytes.
+    :type progress_cb_factory: Callable[[int], Callable]
+    :return: Number of extracted files.
+    :rtype: int
+    """
+    sly.fs.mkdir(dst_dir)
+    with requests.Session() as session:
+        with session.get(link, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+            url = response.url
+            size = int(response.headers.get("content-length", 0))
+            accept_ranges = response.headers.get("accept-ranges", "") == "bytes"
+            response.raw.decode_content = True
+            head = response.raw.read(len(ZIP_MAGIC))
+            if head != ZIP_MAGIC:
+                stream = io.BufferedReader(
+                    ProgressReader(response.raw, progress_cb_factory(size)), COPY_BUFFER_SIZE
+                )
+                return extract_tar_stream(_Prepend(head, stream), dst_dir)
+
+        if not accept_ranges or size == 0:
+            raise StreamingNotSupported("Server does not support Range requests for zip archive.")
+        reader = io.BufferedReader(HttpRangeReader(url, size, session), COPY_BUFFER_SIZE)
+        return extract_zip(reader, dst_dir, progress_cb_factory(size))
+
+
+def extract_from_team_files(
+    api: sly.Api, team_id: int, remote_path: str, dst_dir: str, progress_cb: Callable = None
+) -> int:
+    """
+    Extract tar archive from Team Files while it is being downloaded.
+
+    :return: Number of extracted files.
+    :rtype: int
+    """
+    sly.fs.mkdir(dst_dir)
+    response = api.post(
+        "file-storage.download",
+        {ApiField.TEAM_ID: team_id, ApiField.PATH: remote_path},
+        stream=True,
+    )
+    with response:
+        response.raw.decode_content = True
+        stream = io.BufferedReader(ProgressReader(response.raw, progress_cb), COPY_BUFFER_SIZE)
+        return extract_tar_stream(stream, dst_dir)
+
+
+def _has_archive_ext(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def split_part(path: str) -> Optional[Tuple[str, int]]:
+    """
+    Parse the path of a split archive part.
+
+    :return: Path of the whole archive and the part number or None if the file is not a part.
+    :rtype: Tuple[str, int], optional
+    """
+    match = SPLIT_PART_RE.match(os.path.basename(path))
+    if match is None or not _has_archive_ext(match.group("base")):
+        return None
+    number = match.group("number") or match.group("part")
+    return os.path.join(os.path.dirname(path), match.group("base")), int(number)
+
+
+def is_archive(path: str) -> bool:
+    return _has_archive_ext(path) or split_part(path) is not None
+
+
+def archive_base(path: str) -> str:
+    """Path of the whole archive for the split archive part, the path itself otherwise."""
+    part = split_part(path)
+    return part[0] if part is not None else path
+
+
+def strip_archive_ext(name: str) -> str:
+    for ext in sorted(ARCHIVE_EXTENSIONS, key=len, reverse=True):
+        if name.lower().endswith(ext):
+            return name[: -len(ext)]
+    return name
+
+
+def archive_parts(path: str, siblings: Iterable[str]) -> List[str]:
+    """
+    Find all parts of the split archive among the files of its directory.
+
+    :param path: Path of any part of the archive, the list contains only it for whole archives.
+    :type path: str
+    :param siblings: Paths of the files in the same directory.
+    :type siblings: Iterable[str]
+    :return: Paths of the parts in order.
+    :rtype: List[str]
+    """
+    if split_part(path) is None:
+        return [path]
+    base = archive_base(path)
+    parts = sorted(
+        (part[1], sibling)
+        for sibling, part in ((sibling, split_part(sibling)) for sibling in siblings)
+        if part is not None and part[0] == base
+    )
+    numbers = [number for number, _ in parts]
+    if len(numbers) == 0 or numbers != list(range(min(numbers[0], 1), numbers[-1] + 1)):
+        raise RuntimeError(
+            f"Some parts of the split archive {os.path.basename(base)} are missing, "
+            f"found parts: {numbers}."
+        )
+    return [sibling for _, sibling in parts]
+
+
+class MultiFileReader(io.RawIOBase):
+    """Seekable read-only file over the parts of a split archive, concatenated in order."""
+
+    def __init__(self, paths: List[str]):
+        self._paths = list(paths)
+        self._offsets = [0]
+        for path in self._paths:
+            self._offsets.append(self._offsets[-1] + os.path.getsize(path))
+        self._size = self._offsets[-1]
+        self._pos = 0
+        self._index = None
+        self._file = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self._size or len(buffer) == 0:
+            return 0
+        index = bisect.bisect_right(self._offsets, self._pos) - 1
+        if index != self._index:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self._paths[index], "rb", buffering=0)
+            self._index = index
+        self._file.seek(self._pos - self._offsets[index])
+        length = min(len(buffer), self._offsets[index + 1] - self._pos)
+        read = self._file.readinto(memoryview(buffer)[:length])
+        self._pos += read
+        return read
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+def open_parts(paths: List[str], buffer_size: int = COPY_BUFFER_SIZE):
+    """Open the archive given as a single file or as the parts of a split archive."""
+    if len(paths) == 1:
+        return open(paths[0], "rb", buffering=buffer_size)
+    return io.BufferedReader(MultiFileReader(paths), buffer_size)
+
+
+def detect_format(fileobj) -> Optional[str]:
+    """
+    Detect the archive format by the first bytes of the seekable file object.
+
+    :return: "zip", compression of the tar archive ("gz", "bz2", "xz", "zst") or None for
+        uncompressed tar.
+    :rtype: str, optional
+    """
+    head = fileobj.read(8)
+    fileobj.seek(0)
+    for name, magics in MAGIC_BYTES.items():
+        if head.startswith(magics):
+            return name
+    return None
+
+
+def _balance_members(members: List[zipfile.ZipInfo], shards_cnt: int) -> List[List[str]]:
+    # the largest members first, every member goes to the least loaded shard
+    shards = [(0, idx, []) for idx in range(shards_cnt)]
+    for member in sorted(members, key=lambda member: member.compress_size, reverse=True):
+        size, idx, names = heapq.heappop(shards)
+        names.append(member.filename)
+        heapq.heappush(shards, (size + member.compress_size, idx, names))
+    return [names for _, _, names in shards if len(names) > 0]
+
+
+def extract_zip_parallel(
+    open_fileobj: Callable, dst_dir: str, workers: int, progress_cb: Optional[Callable] = None
+) -> int:
+    """
+    Extract zip archive with several threads, every thread reads its own file object.
+
+    Members are distributed between the threads by their compressed size. Decompression
+    and writing of the files release the GIL, so the threads work in parallel.
+
+    :param open_fileobj: Function that opens a new seekable file object of the archive.
+    :type open_fileobj: Callable
+    :return: Number of extracted files.
+    :rtype: int
+    """
+    with open_fileobj() as fileobj, zipfile.ZipFile(fileobj) as archive:
+        members = {}
+        for member in archive.infolist():
+            if member.is_dir():
+                sly.fs.mkdir(_safe_path(dst_dir, member.filename))
+            else:
+                # duplicated names go to the same shard and are extracted in order
+                members[member.filename] = member
+    shards = _balance_members(list(members.values()), workers)
+    if len(shards) == 0:
+        return 0
+
+    progress_lock = threading.Lock()
+
+    def _progress(size):
+        with progress_lock:
+            progress_cb(size)
+
+    def _extract(names):
+        with open_fileobj() as fileobj:
+            return extract_zip(fileobj, dst_dir, _progress if progress_cb else None, names)
+
+    with ThreadPoolExecutor(len(shards)) as pool:
+        return sum(pool.map(_extract, shards))
+
+
+def _decompress_command(compression: str) -> Optional[List[str]]:
+    for command in DECOMPRESS_COMMANDS.get(compression, ()):
+        if shutil.which(command[0]) is not None:
+            return command
+    return None
+
+
+def _feed(src, dst, errors: list) -> None:
+    try:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+    except Exception as e:
+        # BrokenPipeError if the decompressor exited, its error is reported instead
+        errors.append(e)
+    finally:
+        try:
+            dst.close()
+        except OSError:
+            pass
+
+
+def _extract_tar(fileobj, dst_dir: str, compression: Optional[str], progress_cb) -> int:
+    stream = ProgressReader(fileobj, progress_cb)
+    command = _decompress_command(compression) if compression is not None else None
+    if command is None:
+        if compression != "zst":
+            return extract_tar_stream(io.BufferedReader(stream, COPY_BUFFER_SIZE), dst_dir)
+        if zstandard is None:
+            raise RuntimeError("Install zstd or zstandard package to unpack .tar.zst archives.")
+        decompressor = zstandard.ZstdDecompressor()
+        with decompressor.stream_reader(stream, read_size=COPY_BUFFER_SIZE) as reader:
+            return extract_tar_stream(reader, dst_dir)
+
+    process = subprocess.Popen(
+        command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    errors = []
+    feeder = threading.Thread(target=_feed, args=(stream, process.stdin, errors), daemon=True)
+    feeder.start()
+    try:
+        files_cnt = extract_tar_stream(process.stdout, dst_dir)
+        # read the padding after the end of the archive, so the decompressor can exit
+        while process.stdout.read(COPY_BUFFER_SIZE):
+            pass
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        feeder.join()
+        process.wait()
+        process.stdout.close()
+    stderr = process.stderr.read().decode(errors="replace").strip()
+    process.stderr.close()
+    if process.returncode != 0:
+        raise RuntimeError(f"{command[0]} failed to decompress the archive: {stderr}")
+    if len(errors) > 0:
+        raise errors[0]
+    return files_cnt
+
+
+def unpack_archive(
+    paths: List[str], dst_dir: str, workers: int = 1, progress_cb: Optional[Callable] = None
+) -> int:
+    """
+    Unpack zip or tar (optionally gz, bz2, xz or zstd compressed) archive, given as a single
+    file or as the parts of a split archive in order. The format is detected by content.
+
+    Zip members are extracted by several threads. Compressed tar archives are decompressed
+    by an external decompressor (pigz, zstd, ...) if it is installed, in parallel with the
+    extraction of the members.
+
+    :param paths: Paths of the archive parts.
+    :type paths: List[str]
+    :param dst_dir: Directory to extract archive to.
+    :type dst_dir: str
+    :param workers: Number of threads extracting zip members.
+    :type workers: int
+    :param progress_cb: Progress callback, receives the number of processed archive bytes.
+    :type progress_cb: Callable, optional
+    :return: Number of extracted files.
+    :rtype: int
+    """
+    sly.fs.mkdir(dst_dir)
+    size = sum(os.path.getsize(path) for path in paths)
+    start = time.perf_counter()
+    with open_parts(paths) as fileobj:
+        archive_format = detect_format(fileobj)
+        if archive_format != "zip":
+            files_cnt = _extract_tar(fileobj, dst_dir, archive_format, progress_cb)
+    if archive_format == "zip":
+        reported = [0]
+
+        def _zip_progress(read_size):
+            reported[0] += read_size
+            progress_cb(read_size)
+
+        files_cnt = extract_zip_parallel(
+            lambda: open_parts(paths, io.DEFAULT_BUFFER_SIZE),
+            dst_dir,
+            workers,
+            _zip_progress if progress_cb else None,
+        )
+        if progress_cb is not None and size > reported[0]:
+            # zip headers are not counted by the members
+            progress_cb(size - reported[0])
+    seconds = time.perf_counter() - start
+    sly.logger.info(
+        f"Unpacked {files_cnt} files from {os.path.basename(archive_base(paths[0]))}.",
+        extra={
+            "format": archive_format or "tar",
+            "parts": len(paths),
+            "size_mb": round(size / 1024 / 1024, 1),
+            "seconds": round(seconds, 3),
+            "mb_per_sec": round(size / 1024 / 1024 / max(seconds, 1e-6), 1),
+            "files_per_sec": round(files_cnt / max(seconds, 1e-6), 1),
+        },
+    )
+    return files_cnt
+
+
+def find_archives(root: str) -> Dict[str, List[str]]:
+    """Find archives in the directory tree: paths of the parts by the path of every archive."""
+    found = {}
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            if is_archive(path):
+                found.setdefault(archive_base(path), []).append(path)
+    return found
+
+
+def unpack_nested_archives(root: str, workers: int = 1, depth: int = NESTED_ARCHIVES_DEPTH) -> int:
+    """
+    Unpack archives found in the directory tree (e.g. in the unpacked main archive), every
+    archive to the directory named after it, and remove them. Archives found in the unpacked
+    archives are unpacked too, up to the given depth. Archives that fail to unpack are left
+    as is.
+
+    :return: Number of unpacked archives.
+    :rtype: int
+    """
+    unpacked_cnt = 0
+    failed = set()
+    for _ in range(depth):
+        found = {base: paths for base, paths in find_archives(root).items() if base not in failed}
+        if len(found) == 0:
+            break
+        for base, paths in found.items():
+            dst_dir = os.path.join(os.path.dirname(base), strip_archive_ext(os.path.basename(base)))
+            dst_existed = os.path.isdir(dst_dir)
+            try:
+                paths = archive_parts(paths[0], paths)
+                unpack_archive(paths, dst_dir, workers)
+            except Exception as e:
+                sly.logger.warn(f"Failed to unpack nested archive {base}: {e}")
+                if not dst_existed:
+                    sly.fs.remove_dir(dst_dir)
+                failed.add(base)
+                continue
+            for path in paths:
+                sly.fs.silent_remove(path)
+            unpacked_cnt += 1
+    return unpacked_cnt
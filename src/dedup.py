@@ -0,0 +1,121 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+
+import supervisely as sly
+from supervisely._utils import sizeof_fmt
+from supervisely.io.fs import get_file_hash_chunked
+
+
+class ImageDeduplicator:
+    """
+    Upload every unique image content once per task.
+
+    Images are hashed in parallel with streaming reads (the hash is the same as the server
+    uses), usually during validation, so the upload does not read files twice. Before
+    upload, content that is already on the server or already uploaded by this task is
+    skipped. Images are then added to datasets by hash, so duplicates cost no traffic.
+
+    :param workers: Number of threads to hash files.
+    :type workers: int
+    """
+
+    def __init__(self, workers: int = 8):
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, str] = {}
+        self._sizes: Dict[str, int] = {}
+        self._on_server: Set[str] = set()
+        self.images_cnt = 0
+        self.total_bytes = 0
+        self.uploaded_cnt = 0
+        self.uploaded_bytes = 0
+        self.existing_cnt = 0
+
+    def _hash_file(self, path: str) -> None:
+        image_hash = get_file_hash_chunked(path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._hashes[path] = image_hash
+            self._sizes[path] = size
+
+    def hash_files(self, paths: List[str]) -> List[str]:
+        """Return hashes of the files, computing the missing ones in parallel."""
+        with self._lock:
+            missing = [path for path in dict.fromkeys(paths) if path not in self._hashes]
+        if len(missing) > 0:
+            if self._workers <= 1 or len(missing) == 1:
+                for path in missing:
+                    self._hash_file(path)
+            else:
+                with ThreadPoolExecutor(min(self._workers, len(missing))) as pool:
+                    list(pool.map(self._hash_file, missing))
+        with self._lock:
+            return [self._hashes[path] for path in paths]
+
+    def upload_data(self, api: sly.Api, paths: List[str]) -> List[str]:
+        """
+        Upload content of the images unless the same content is on the server.
+
+        :return: Hashes of the images.
+        :rtype: List[str]
+        """
+        hashes = self.hash_files(paths)
+        pending = {}
+        with self._lock:
+            for path, image_hash in zip(paths, hashes):
+                if image_hash not in self._on_server and image_hash not in pending:
+                    pending[image_hash] = path
+        existing = set()
+        if len(pending) > 0:
+            existing = set(api.image.check_existing_hashes(list(pending)))
+            to_upload = [(path, h) for h, path in pending.items() if h not in existing]
+            if len(to_upload) > 0:
+                # images data is uploaded without adding to the datasets,
+                # it is the first step of api.image.upload_paths
+                api.image._upload_data_bulk(lambda path: open(path, "rb"), to_upload)
+        with self._lock:
+            self._on_server.update(pending)
+            self.images_cnt += len(paths)
+            self.total_bytes += sum(self._sizes[path] for path in paths)
+            self.existing_cnt += len(existing)
+            for image_hash, path in pending.items():
+                if image_hash not in existing:
+                    self.uploaded_cnt += 1
+                    self.uploaded_bytes += self._sizes[path]
+        return hashes
+
+    def upload_paths(
+        self,
+        api: sly.Api,
+        dataset_id: int,
+        names: List[str],
+        paths: List[str],
+        progress_cb: Optional[Callable] = None,
+        metas: Optional[List[dict]] = None,
+    ) -> List[sly.ImageInfo]:
+        """Deduplicating alternative to api.image.upload_paths."""
+        hashes = self.upload_data(api, paths)
+        return api.image.upload_hashes(dataset_id, names, hashes, progress_cb, metas=metas)
+
+    def log_report(self) -> None:
+        if self.images_cnt == 0:
+            return
+        saved_bytes = self.total_bytes - self.uploaded_bytes
+        sly.logger.info(
+            f"Deduplication: {self.images_cnt} images "
+            f"({sizeof_fmt(self.total_bytes)}), "
+            f"{self.uploaded_cnt} unique images uploaded "
+            f"({sizeof_fmt(self.uploaded_bytes)}), "
+            f"{self.existing_cnt} already on the server. "
+            f"Saved {sizeof_fmt(saved_bytes)} of traffic.",
+            extra={
+                "images": self.images_cnt,
+                "total_bytes": self.total_bytes,
+                "uploaded_images": self.uploaded_cnt,
+                "uploaded_bytes": self.uploaded_bytes,
+                "existing_images": self.existing_cnt,
+                "saved_bytes": saved_bytes,
+            },
+        )
@@ -0,0 +1,330 @@
+import base64
+import binascii
+import contextlib
+import hashlib
+import json
+import os
+import string
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, List, Optional, Tuple
+
+import requests
+import supervisely as sly
+
+import transport
+
+CHUNK_SIZE = 1024 * 1024
+STATE_SAVE_INTERVAL = 32 * 1024 * 1024
+MAX_RETRIES = 5
+HASH_ALGORITHMS_BY_HEX_LENGTH = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+RemoteFileInfo = namedtuple("RemoteFileInfo", ["url", "size", "etag", "accept_ranges"])
+
+
+def probe(url: str, session: requests.Session = None) -> RemoteFileInfo:
+    """
+    Get final URL (after redirects), size, ETag and Range support of the remote file.
+
+    The first byte is requested with a Range GET (HEAD is rejected by presigned URLs) and
+    the response is read to the end, so the connection is returned to the pool of the session
+    and reused by the download.
+
+    :param url: Link to the file.
+    :type url: str
+    :return: Information about the remote file.
+    :rtype: RemoteFileInfo
+    """
+    session = session or requests.Session()
+    headers = {"Range": "bytes=0-0"}
+    with session.get(url, headers=headers, allow_redirects=True, stream=True) as response:
+        response.raise_for_status()
+        encoding = response.headers.get("content-encoding", "identity")
+        content_range = response.headers.get("content-range", "")
+        accept_ranges = response.status_code == 206 and "/" in content_range
+        if accept_ranges:
+            # the body (a single byte) is read, so the connection is released to the pool
+            response.content
+            total = content_range.rsplit("/", 1)[1].strip()
+            size = int(total) if total.isdigit() else 0
+        else:
+            # the server ignored the Range header and sends the whole file: it is not read,
+            # this connection is closed
+            size = int(response.headers.get("content-length", 0))
+        return RemoteFileInfo(
+            url=response.url,
+            size=size if encoding == "identity" else 0,
+            etag=response.headers.get("etag"),
+            accept_ranges=accept_ranges,
+        )
+
+
+def _state_path(path: str) -> str:
+    return path + ".state.json"
+
+
+def _load_state(path: str, info: RemoteFileInfo) -> Optional[dict]:
+    state_path = _state_path(path)
+    if not sly.fs.file_exists(state_path) or not sly.fs.file_exists(path):
+        return None
+    try:
+        state = sly.json.load_json_file(state_path)
+    except Exception:
+        return None
+    if state.get("size") != info.size or state.get("etag") != info.etag:
+        sly.logger.info("Remote file has been changed since the last attempt, restarting download.")
+        return None
+    if os.path.getsize(path) != info.size:
+        return None
+    return state
+
+
+def _save_state(path: str, state: dict) -> None:
+    state_path = _state_path(path)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _split_to_segments(size: int, connections: int) -> List[List[int]]:
+    segment_size = -(-size // connections)
+    # [start, end (inclusive), downloaded bytes]
+    return [
+        [start, min(start + segment_size, size) - 1, 0] for start in range(0, size, segment_size)
+    ]
+
+
+def parse_expected_hash(expected_hash: str) -> Tuple[str, str]:
+    """
+    Parse user-supplied hash of the file: "<hex>" (the algorithm is detected by the length),
+    "name:<hex>" or "name:<base64>".
+
+    :return: Algorithm name accepted by hashlib.new and the digest.
+    :rtype: Tuple[str, str]
+    :raises ValueError: If the algorithm is unknown or the digest does not match it.
+    """
+    if ":" in expected_hash:
+        algorithm, value = expected_hash.split(":", 1)
+        algorithm, value = algorithm.strip().lower(), value.strip()
+    else:
+        value = expected_hash.strip()
+        algorithm = HASH_ALGORITHMS_BY_HEX_LENGTH.get(len(value))
+        if algorithm is None:
+            raise ValueError(
+                f"Can not detect hash algorithm of {expected_hash!r}, use 'name:value'."
+            )
+    try:
+        digest_size = hashlib.new(algorithm).digest_size
+    except ValueError:
+        raise ValueError(f"Unsupported hash algorithm {algorithm!r} of {expected_hash!r}.")
+    if digest_size == 0:
+        # variable length digests (shake_*) can not be compared without the length
+        raise ValueError(f"Unsupported hash algorithm {algorithm!r} of {expected_hash!r}.")
+    if len(value) == digest_size * 2 and all(c in string.hexdigits for c in value):
+        return algorithm, value
+    try:
+        if len(base64.b64decode(value, validate=True)) == digest_size:
+            return algorithm, value
+    except binascii.Error:
+        pass
+    raise ValueError(
+        f"{expected_hash!r} is not a hex or base64 {algorithm} digest " f"of {digest_size} bytes."
+    )
+
+
+def _etag_md5(etag: Optional[str]) -> Optional[str]:
+    # single-part S3 / GCS ETags and many static servers return plain MD5 of the content,
+    # weak ETags and multipart ones (with "-") are not content hashes
+    if etag is None or etag.startswith("W/"):
+        return None
+    value = etag.strip('"')
+    if len(value) == 32 and all(c in "0123456789abcdefABCDEF" for c in value):
+        return value.lower()
+    return None
+
+
+def file_hash(path: str, algorithm: str):
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def verify_checksum(path: str, info: RemoteFileInfo, expected_hash: str = None) -> None:
+    """
+    Verify downloaded file with user-supplied hash or with ETag if it is MD5 of the content.
+    User-supplied value may be prefixed with the algorithm name ("sha256:<hex>"),
+    hex and base64 digests are accepted.
+
+    :raises RuntimeError: If the checksum does not match.
+    """
+    if expected_hash:
+        algorithm, expected = parse_expected_hash(expected_hash)
+    else:
+        algorithm, expected = "md5", _etag_md5(info.etag)
+        if expected is None:
+            sly.logger.debug("Checksum is not provided and ETag is not MD5, skipping verification.")
+            return
+    hasher = file_hash(path, algorithm)
+    actual_hex, actual_b64 = hasher.hexdigest(), base64.b64encode(hasher.digest()).decode()
+    if expected.lower() != actual_hex and expected != actual_b64:
+        raise RuntimeError(
+            f"Checksum mismatch for the downloaded file: expected {algorithm} {expected}, "
+            f"got {actual_hex}."
+        )
+    sly.logger.info(f"Downloaded file {algorithm} checksum is verified.")
+
+
+def _download_segment(session, info, path, segment, state, lock, progress_cb):
+    for attempt in range(MAX_RETRIES):
+        start, end, done = segment
+        if start + done > end:
+            return
+        try:
+            headers = {"Range": f"bytes={start + done}-{end}"}
+            with session.get(info.url, headers=headers, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise RuntimeError("Server ignored the Range header.")
+                with open(path, "r+b") as f:
+                    f.seek(start + done)
+                    # only flushed bytes are counted in the state, so it never runs ahead of data
+                    unsaved = 0
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        unsaved += len(chunk)
+                        with lock:
+                            if progress_cb is not None:
+                                progress_cb(len(chunk))
+                        if unsaved >= STATE_SAVE_INTERVAL:
+                            f.flush()
+                            with lock:
+                                segment[2] += unsaved
+                                _save_state(path, state)
+                            unsaved = 0
+                    f.flush()
+                    with lock:
+                        segment[2] += unsaved
+                        _save_state(path, state)
+            if segment[0] + segment[2] > segment[1]:
+                return
+        except (requests.RequestException, RuntimeError) as e:
+            delay = 2**attempt
+            sly.logger.warn(
+                f"Failed to download bytes {start + done}-{end}: {repr(e)}. "
+                f"Retrying in {delay} seconds..."
+            )
+            time.sleep(delay)
+    raise RuntimeError(f"Failed to download file after {MAX_RETRIES} attempts.")
+
+
+def _download_whole(session, info, path, progress_cb):
+    with session.get(info.url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                if progress_cb is not None:
+                    progress_cb(len(chunk))
+
+
+def download_resumable(
+    info: RemoteFileInfo,
+    path: str,
+    progress_cb: Callable = None,
+    connections: int = 1,
+    expected_hash: str = None,
+    session: requests.Session = None,
+) -> str:
+    """
+    Download file with HTTP Range requests, resuming previous attempt if possible.
+
+    Progress of every segment is stored in the sidecar state file next to the file,
+    so an interrupted download continues from the saved offsets. With several connections
+    the file is split into segments which are downloaded in parallel. After download
+    the file is verified with the user-supplied hash or the ETag (when it is MD5).
+
+    :param info: Information about the remote file, see :func:`probe`.
+    :type info: RemoteFileInfo
+    :param path: Local path to save the file.
+    :type path: str
+    :param progress_cb: Function for tracking download progress in bytes.
+    :type progress_cb: Callable, optional
+    :param connections: Number of parallel connections.
+    :type connections: int
+    :param expected_hash: Expected checksum of the file, e.g. "sha256:<hex>".
+    :type expected_hash: str, optional
+    :param session: Session to reuse the connections of, e.g. opened by :func:`probe`.
+    :type session: requests.Session, optional
+    :return: Path to the downloaded file.
+    :rtype: str
+    :raises ValueError: If the expected hash is malformed, before anything is downloaded.
+    """
+    if expected_hash:
+        parse_expected_hash(expected_hash)
+    sly.fs.ensure_base_path(path)
+    # the session of the caller is not closed
+    session_context = (
+        transport.create_session(connections)
+        if session is None
+        else contextlib.nullcontext(session)
+    )
+    with session_context as session:
+        completed = (
+            sly.fs.file_exists(path)
+            and not sly.fs.file_exists(_state_path(path))
+            and os.path.getsize(path) == info.size
+        )
+        if completed:
+            sly.logger.info(f"File {path} is already downloaded.")
+        elif not info.accept_ranges or info.size == 0:
+            sly.logger.info("Server does not support Range requests, resume is not available.")
+            _download_whole(session, info, path, progress_cb)
+        else:
+            state = _load_state(path, info)
+            if state is None:
+                state = {
+                    "url": info.url,
+                    "size": info.size,
+                    "etag": info.etag,
+                    "segments": _split_to_segments(info.size, max(connections, 1)),
+                }
+                with open(path, "wb") as f:
+                    f.truncate(info.size)
+                _save_state(path, state)
+            else:
+                done = sum(segment[2] for segment in state["segments"])
+                sly.logger.info(f"Resuming download, {done} of {info.size} bytes are downloaded.")
+                if progress_cb is not None:
+                    progress_cb(done)
+
+            lock = threading.Lock()
+            threads = []
+            errors = []
+
+            def _run(segment):
+                try:
+                    _download_segment(session, info, path, segment, state, lock, progress_cb)
+                except Exception as e:
+                    errors.append(e)
+
+            for segment in state["segments"]:
+                thread = threading.Thread(target=_run, args=(segment,), daemon=True)
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+            if len(errors) > 0:
+                raise errors[0]
+
+    try:
+        verify_checksum(path, info, expected_hash)
+    except RuntimeError:
+        sly.fs.silent_remove(path)
+        sly.fs.silent_remove(_state_path(path))
+        raise
+    sly.fs.silent_remove(_state_path(path))
+    return path
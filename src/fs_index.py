@@ -0,0 +1,166 @@
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import supervisely as sly
+from supervisely.io.fs import JUNK_FILES, get_file_name
+
+
+class DirIndex:
+    """
+    In-memory index of the local directory tree built with a single os.scandir pass.
+
+    Stages of the import query the index instead of listing the same directories again
+    (projects search, datasets structure checks, image and annotation names). The code that
+    creates or removes files in the indexed tree has to update the index with
+    :meth:`add_file` and :meth:`discard`. File sizes are read lazily and cached.
+    The index may be read and updated from several threads (concurrent imports of projects,
+    the upload stage of the streaming import), every access takes the lock and the readers
+    return copies.
+
+    :param root: Path to the directory to index.
+    :type root: str
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.normpath(root)
+        self._files: Dict[str, Set[str]] = {}
+        self._dirs: Dict[str, List[str]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._scan(self.root)
+
+    def _scan(self, top: str) -> None:
+        stack = [top]
+        while len(stack) > 0:
+            path = stack.pop()
+            files, dirs = set(), []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                            stack.append(entry.path)
+                        else:
+                            files.add(entry.name)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            self._files[path] = files
+            self._dirs[path] = sorted(dirs)
+
+    def is_dir(self, path: str) -> bool:
+        with self._lock:
+            return os.path.normpath(path) in self._dirs
+
+    def is_file(self, path: str) -> bool:
+        dir_path, name = os.path.split(os.path.normpath(path))
+        with self._lock:
+            return name in self._files.get(dir_path, ())
+
+    def files(self, path: str) -> List[str]:
+        """Names of files in the directory."""
+        with self._lock:
+            return sorted(self._files.get(os.path.normpath(path), ()))
+
+    def subdirs(self, path: str) -> List[str]:
+        """Names of subdirectories in the directory."""
+        with self._lock:
+            return list(self._dirs.get(os.path.normpath(path), ()))
+
+    def listdir(self, path: str) -> List[str]:
+        """Names of files and subdirectories in the directory, like os.listdir."""
+        with self._lock:
+            return self.subdirs(path) + self.files(path)
+
+    def dirs(self, root: Optional[str] = None) -> Iterator[str]:
+        """All indexed directories under the root (including the root itself), top-down."""
+        for path, _, _ in self.walk(root):
+            yield path
+
+    def walk(self, root: Optional[str] = None) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        Top-down walk over the index, like os.walk. The lock is not held between the steps,
+        directories discarded during the walk are skipped.
+        """
+        stack = [os.path.normpath(root or self.root)]
+        while len(stack) > 0:
+            path = stack.pop()
+            with self._lock:
+                if path not in self._dirs:
+                    continue
+                subdirs, files = self.subdirs(path), self.files(path)
+            yield path, subdirs, files
+            stack.extend(os.path.join(path, name) for name in reversed(subdirs))
+
+    def file_paths(self, path: str, recursive: bool = False) -> List[str]:
+        """Global paths to files in the directory."""
+        if not recursive:
+            return [os.path.join(path, name) for name in self.files(path)]
+        return [os.path.join(r, name) for r, _, files in self.walk(path) for name in files]
+
+    def files_count(self) -> int:
+        """Number of files in the whole tree."""
+        with self._lock:
+            return sum(len(files) for files in self._files.values())
+
+    def file_size(self, path: str) -> int:
+        path = os.path.normpath(path)
+        with self._lock:
+            size = self._sizes.get(path)
+        if size is None:
+            size = os.path.getsize(path)
+            with self._lock:
+                self._sizes[path] = size
+        return size
+
+    def add_file(self, path: str) -> None:
+        dir_path, name = os.path.split(os.path.normpath(path))
+        with self._lock:
+            self._files.setdefault(dir_path, set()).add(name)
+            self._sizes.pop(os.path.normpath(path), None)
+
+    def add_dir(self, path: str) -> None:
+        path = os.path.normpath(path)
+        with self._lock:
+            if path in self._dirs:
+                return
+            parent, name = os.path.split(path)
+            if parent in self._dirs and name not in self._dirs[parent]:
+                self._dirs[parent] = sorted(self._dirs[parent] + [name])
+            self._files[path] = set()
+            self._dirs[path] = []
+
+    def discard(self, path: str) -> None:
+        """Remove file or directory (with its content) from the index."""
+        path = os.path.normpath(path)
+        parent, name = os.path.split(path)
+        with self._lock:
+            if parent in self._files:
+                self._files[parent].discard(name)
+            if parent in self._dirs and name in self._dirs[parent]:
+                self._dirs[parent] = [d for d in self._dirs[parent] if d != name]
+            if path in self._dirs:
+                prefix = path + os.sep
+                for dir_path in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+                    del self._dirs[dir_path]
+                    self._files.pop(dir_path, None)
+            self._sizes.pop(path, None)
+
+    def remove_junk(self) -> List[str]:
+        """Remove junk files and dirs (e.g. .DS_Store, __MACOSX) from the disk and the index."""
+        removed_dirs, removed_paths = [], []
+        for path, subdirs, files in list(self.walk()):
+            if any(path.startswith(removed_dir + os.sep) for removed_dir in removed_dirs):
+                continue
+            for name in subdirs:
+                if get_file_name(name) in JUNK_FILES:
+                    removed_dirs.append(os.path.join(path, name))
+                    sly.fs.remove_dir(removed_dirs[-1])
+            for name in files:
+                if get_file_name(name) in JUNK_FILES:
+                    removed_paths.append(os.path.join(path, name))
+                    sly.fs.silent_remove(removed_paths[-1])
+        removed_paths.extend(removed_dirs)
+        for path in removed_paths:
+            self.discard(path)
+        return removed_paths
@@ -0,0 +1,184 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, Optional, Tuple
+
+import supervisely as sly
+
+# JPEG start of frame markers (all except DHT, JPG and DAC which share the range)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+EXIF_ORIENTATION_TAG = 0x0112
+TIFF_WIDTH_TAG = 0x0100
+TIFF_HEIGHT_TAG = 0x0101
+# EXIF orientations with 90 degrees rotation, OpenCV swaps width and height for them
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _read_ifd0(data: bytes) -> dict:
+    """Read SHORT and LONG values of the first IFD of TIFF structure (TIFF file or EXIF)."""
+    byte_order = {b"II": "<", b"MM": ">"}.get(data[:2])
+    if byte_order is None:
+        return {}
+    offset = struct.unpack(byte_order + "I", data[4:8])[0]
+    entries_cnt = struct.unpack(byte_order + "H", data[offset : offset + 2])[0]
+    tags = {}
+    for i in range(entries_cnt):
+        entry = data[offset + 2 + i * 12 : offset + 14 + i * 12]
+        if len(entry) < 12:
+            break
+        tag, value_type = struct.unpack(byte_order + "HH", entry[:4])
+        if value_type == 3:
+            tags[tag] = struct.unpack(byte_order + "H", entry[8:10])[0]
+        elif value_type == 4:
+            tags[tag] = struct.unpack(byte_order + "I", entry[8:12])[0]
+    return tags
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(2)
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue
+        if marker in (0xD9, 0xDA):
+            return None
+        length = struct.unpack(">H", f.read(2))[0]
+        if marker == 0xE1:
+            data = f.read(length - 2)
+            if data.startswith(b"Exif\x00\x00"):
+                orientation = _read_ifd0(data[6:]).get(EXIF_ORIENTATION_TAG, orientation)
+        elif marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", f.read(5))
+            if orientation in TRANSPOSED_ORIENTATIONS:
+                return width, height
+            return height, width
+        else:
+            f.seek(length - 2, 1)
+
+
+def _png_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(8)
+    length, chunk_type = struct.unpack(">I4s", f.read(8))
+    if chunk_type != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", f.read(8))
+    f.seek(length - 8 + 4, 1)
+    # EXIF chunk may rotate the image, it must precede the image data
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type == b"eXIf":
+            return None
+        if chunk_type in (b"IDAT", b"IEND"):
+            return height, width
+        f.seek(length + 4, 1)
+
+
+def _webp_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(12)
+    header = f.read(18)
+    chunk_type = header[:4]
+    if chunk_type == b"VP8 ":
+        width, height = struct.unpack("<HH", header[14:18])
+        return height & 0x3FFF, width & 0x3FFF
+    if chunk_type == b"VP8L":
+        bits = struct.unpack("<I", header[9:13])[0]
+        return ((bits >> 14) & 0x3FFF) + 1, (bits & 0x3FFF) + 1
+    if chunk_type == b"VP8X":
+        if header[8] & 0x08:
+            # has EXIF, which may rotate the image
+            return None
+        width = int.from_bytes(header[12:15], "little") + 1
+        height = int.from_bytes(header[15:18], "little") + 1
+        return height, width
+    return None
+
+
+def _bmp_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(14)
+    header = f.read(12)
+    if struct.unpack("<I", header[:4])[0] == 12:
+        width, height = struct.unpack("<HH", header[4:8])
+    else:
+        width, height = struct.unpack("<ii", header[4:12])
+    return abs(height), width
+
+
+def _tiff_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    f.seek(0)
+    # IFD0 usually follows the header, bigger files with IFD at the end are decoded
+    tags = _read_ifd0(f.read(64 * 1024))
+    if tags.get(EXIF_ORIENTATION_TAG, 1) != 1:
+        return None
+    if TIFF_WIDTH_TAG not in tags or TIFF_HEIGHT_TAG not in tags:
+        return None
+    return tags[TIFF_HEIGHT_TAG], tags[TIFF_WIDTH_TAG]
+
+
+def _probe_size(path: str) -> Optional[Tuple[int, int]]:
+    with open(path, "rb") as f:
+        head = f.read(16)
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_size(f)
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _png_size(f)
+        if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+            return _webp_size(f)
+        if head.startswith(b"BM"):
+            return _bmp_size(f)
+        if head[:4] in (b"II*\x00", b"MM\x00*"):
+            return _tiff_size(f)
+    return None
+
+
+def read_image_size(path: str) -> Tuple[int, int]:
+    """
+    Get image size from the file header without decoding the image.
+
+    JPEG, PNG, WebP, BMP and TIFF headers are parsed (the format is detected by the content,
+    not by the extension). Other formats, corrupted headers and images that may be rotated
+    by EXIF orientation in a way the header does not tell are decoded with sly.image.read,
+    so the result is the same as the shape of the decoded image.
+
+    :param path: Path to the image.
+    :type path: str
+    :return: Height and width of the image.
+    :rtype: Tuple[int, int]
+    """
+    try:
+        size = _probe_size(path)
+    except (struct.error, IndexError, ValueError):
+        size = None
+    if size is None or size[0] <= 0 or size[1] <= 0:
+        size = sly.image.read(path).shape[:2]
+    return tuple(size)
+
+
+def read_image_sizes(paths: List[str], workers: int = 8) -> List[Optional[Tuple[int, int]]]:
+    """
+    Get sizes of the images in parallel, see :func:`read_image_size`.
+
+    :return: Height and width for every image, None if the image can not be read.
+    :rtype: List[Optional[Tuple[int, int]]]
+    """
+
+    def _read(path):
+        try:
+            return read_image_size(path)
+        except Exception as e:
+            sly.logger.debug(f"Failed to read size of the image {path}: {repr(e)}")
+            return None
+
+    if workers <= 1 or len(paths) <= 1:
+        return [_read(path) for path in paths]
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(_read, paths))
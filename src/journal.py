@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import supervisely as sly
+
+
+class UploadJournal:
+    """
+    Persistent journal of the import progress stored in SQLite database.
+
+    Records target project and dataset IDs and per-image upload state, so a restarted task
+    resumes uploading into the same project and skips already uploaded items.
+    Projects are identified by the key built from the input source and the project directory.
+
+    :param path: Path to the database file.
+    :type path: str
+    """
+
+    def __init__(self, path: str):
+        sly.fs.ensure_base_path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS projects (
+                key TEXT PRIMARY KEY,
+                project_id INTEGER NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS datasets (
+                project_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                dataset_id INTEGER NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (project_id, name)
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                dataset_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                image_id INTEGER NOT NULL,
+                ann_uploaded INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dataset_id, name)
+            );
+            """
+        )
+
+    def _execute(self, query: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def _executemany(self, query: str, params: List[tuple]) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(query, params)
+
+    def get_project(self, key: str) -> Optional[int]:
+        """Return ID of the project with unfinished upload for the given key."""
+        rows = self._execute(
+            "SELECT project_id FROM projects WHERE key = ? AND finished = 0", (key,)
+        )
+        return rows[0][0] if len(rows) > 0 else None
+
+    def add_project(self, key: str, project_id: int) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO projects (key, project_id, finished) VALUES (?, ?, 0)",
+            (key, project_id),
+        )
+
+    def finish_project(self, key: str) -> None:
+        self._execute("UPDATE projects SET finished = 1 WHERE key = ?", (key,))
+
+    def get_dataset(self, project_id: int, name: str) -> Optional[Tuple[int, bool]]:
+        """Return dataset ID and whether its upload is finished."""
+        rows = self._execute(
+            "SELECT dataset_id, finished FROM datasets WHERE project_id = ? AND name = ?",
+            (project_id, name),
+        )
+        return (rows[0][0], bool(rows[0][1])) if len(rows) > 0 else None
+
+    def get_finished_datasets(self, project_id: int) -> List[str]:
+        rows = self._execute(
+            "SELECT name FROM datasets WHERE project_id = ? AND finished = 1", (project_id,)
+        )
+        return [row[0] for row in rows]
+
+    def add_dataset(self, project_id: int, name: str, dataset_id: int) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO datasets (project_id, name, dataset_id, finished) "
+            "VALUES (?, ?, ?, 0)",
+            (project_id, name, dataset_id),
+        )
+
+    def finish_dataset(self, dataset_id: int) -> None:
+        self._execute("UPDATE datasets SET finished = 1 WHERE dataset_id = ?", (dataset_id,))
+
+    def get_images(self, dataset_id: int) -> Dict[str, Tuple[int, bool]]:
+        """Return uploaded images of the dataset: name -> (image ID, annotation is uploaded)."""
+        rows = self._execute(
+            "SELECT name, image_id, ann_uploaded FROM images WHERE dataset_id = ?", (dataset_id,)
+        )
+        return {name: (image_id, bool(ann_uploaded)) for name, image_id, ann_uploaded in rows}
+
+    def add_images(self, dataset_id: int, names: List[str], image_ids: List[int]) -> None:
+        self._executemany(
+            "INSERT OR REPLACE INTO images (dataset_id, name, image_id, ann_uploaded) "
+            "VALUES (?, ?, ?, 0)",
+            [(dataset_id, name, image_id) for name, image_id in zip(names, image_ids)],
+        )
+
+    def finish_annotations(self, dataset_id: int, names: List[str]) -> None:
+        self._executemany(
+            "UPDATE images SET ann_uploaded = 1 WHERE dataset_id = ? AND name = ?",
+            [(dataset_id, name) for name in names],
+        )
@@ -0,0 +1,93 @@
+import json
+import os
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+AVAILABLE_BACKENDS = ["json"] + [
+    name for name, module in [("ujson", ujson), ("orjson", orjson)] if module is not None
+]
+
+_backend = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    Select library used to parse and write JSON files: "orjson", "ujson" or "json" (stdlib).
+
+    :param name: Backend name, the fastest installed one is selected if it is not given.
+    :type name: str, optional
+    :return: Name of the selected backend.
+    :rtype: str
+    """
+    global _backend
+    if name is None:
+        name = AVAILABLE_BACKENDS[-1]
+    if name not in AVAILABLE_BACKENDS:
+        raise ValueError(
+            f"JSON backend {name!r} is not available, installed backends: {AVAILABLE_BACKENDS}."
+        )
+    _backend = name
+    return _backend
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def loads(data: bytes):
+    """
+    Decode JSON document.
+
+    The document that fails with a third-party backend is decoded again with stdlib json,
+    so documents accepted by stdlib only (e.g. with NaN values) are still loaded and decoding
+    errors are always raised as json.JSONDecodeError with the error position.
+    """
+    try:
+        if _backend == "orjson":
+            return orjson.loads(data)
+        if _backend == "ujson":
+            return ujson.loads(data)
+    except ValueError:
+        pass
+    return json.loads(data)
+
+
+def dumps(data) -> bytes:
+    if _backend == "orjson":
+        return orjson.dumps(data)
+    if _backend == "ujson":
+        return ujson.dumps(data, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def load_json_file(path: str):
+    with open(path, "rb") as fin:
+        return loads(fin.read())
+
+
+def dump_json_file(data, path: str, atomic: bool = False) -> None:
+    """
+    Write JSON file. With atomic=True the data is written to a temporary file which then
+    replaces the target, so the file is never left partially written.
+    """
+    if not atomic:
+        with open(path, "wb") as fout:
+            fout.write(dumps(data))
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as fout:
+            fout.write(dumps(data))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,285 @@
+from numbers import Number
+from typing import List, Optional, Type
+
+import numpy as np
+import supervisely as sly
+from supervisely.annotation.annotation import AnnotationJsonFields
+from supervisely.annotation.json_geometries_map import GET_GEOMETRY_FROM_STR
+from supervisely.annotation.label import LabelJsonFields
+from supervisely.annotation.tag import TagJsonFields
+from supervisely.geometry import validation
+from supervisely.geometry.any_geometry import AnyGeometry
+from supervisely.geometry.constants import (
+    BITMAP,
+    DATA,
+    EXTERIOR,
+    GEOMETRY_SHAPE,
+    GEOMETRY_TYPE,
+    INTERIOR,
+    ORIGIN,
+    POINTS,
+)
+from supervisely.geometry.geometry import Geometry
+
+# min and max number of exterior points of the geometries (as checked by their constructors)
+POINTS_GEOMETRIES = {
+    sly.Rectangle: (2, 2),
+    sly.Point: (1, 1),
+    sly.Polygon: (1, None),
+    sly.Polyline: (2, None),
+}
+BITMAP_GEOMETRIES = (sly.Bitmap, sly.AlphaMask)
+
+
+def _points_array(points: list) -> Optional[np.ndarray]:
+    # the list is converted at once, the numbers are not checked one by one
+    try:
+        array = np.array(points)
+    except ValueError:
+        return None
+    if array.ndim != 2 or array.shape[1] != 2 or array.dtype.kind not in "iuf":
+        return None
+    return array.astype(np.float64, copy=False)
+
+
+def _validate_points_containers(label_json: dict) -> None:
+    # validation.validate_geometry_points_fields without the checks of every coordinate,
+    # the coordinates are checked for all labels of the annotation at once by GeometryBatch
+    if POINTS not in label_json:
+        raise ValueError(f"Input data must contain {POINTS} field.")
+    points = label_json[POINTS]
+    if not isinstance(points, dict):
+        raise TypeError(f'Input data field "{POINTS}" must be dict object.')
+    if EXTERIOR not in points or INTERIOR not in points:
+        raise ValueError(f'"{POINTS}" field must contain {EXTERIOR} and {INTERIOR} fields.')
+    if not isinstance(points[EXTERIOR], list):
+        raise TypeError(f"{EXTERIOR} field must be a list of 2 numbers lists.")
+    interior = points[INTERIOR]
+    if not isinstance(interior, list) or not all(isinstance(part, list) for part in interior):
+        raise TypeError(f"{INTERIOR} field must be a list of lists of 2 numbers lists.")
+
+
+def _validate_points(
+    label_json: dict, min_cnt: int, max_cnt: int = None, check_coords: bool = True
+) -> None:
+    if check_coords:
+        validation.validate_geometry_points_fields(label_json)
+    else:
+        _validate_points_containers(label_json)
+    points_cnt = len(label_json[POINTS][EXTERIOR])
+    if points_cnt < min_cnt or (max_cnt is not None and points_cnt > max_cnt):
+        expected = min_cnt if min_cnt == max_cnt else f"at least {min_cnt}"
+        raise ValueError(f'"{EXTERIOR}" field must contain {expected} points, got {points_cnt}.')
+
+
+def _validate_bitmap(label_json: dict) -> None:
+    if BITMAP not in label_json:
+        raise ValueError(f"Data must contain {BITMAP} field to create Bitmap object.")
+    bitmap = label_json[BITMAP]
+    if not isinstance(bitmap, dict) or ORIGIN not in bitmap or DATA not in bitmap:
+        raise ValueError(f"{BITMAP} field must contain {ORIGIN} and {DATA} fields.")
+    origin = bitmap[ORIGIN]
+    if not isinstance(origin, list) or len(origin) != 2:
+        raise ValueError(f"{ORIGIN} field must be a list of 2 numbers.")
+    if not all(isinstance(coord, Number) for coord in origin):
+        raise ValueError(f"{ORIGIN} field must be a list of 2 numbers.")
+    if not isinstance(bitmap[DATA], str) or len(bitmap[DATA]) == 0:
+        raise ValueError(f"{DATA} field must be a non-empty base64 string.")
+
+
+def _validate_tags(tags_json: list, tag_metas: sly.TagMetaCollection) -> None:
+    for tag_json in tags_json:
+        if isinstance(tag_json, str):
+            tag_name, value = tag_json, None
+        else:
+            tag_name = tag_json[TagJsonFields.TAG_NAME]
+            value = tag_json.get(TagJsonFields.VALUE, None)
+        tag_meta = tag_metas.get(tag_name)
+        if tag_meta is None:
+            raise ValueError("TagMeta is None")
+        if not tag_meta.is_valid_value(value):
+            raise ValueError(f"Tag {tag_name} can not have value {value}")
+
+
+class GeometryBatch:
+    """
+    Geometry check of all bitmaps and point geometries of one annotation at once.
+
+    Bitmaps are decoded, exterior points of all point geometries are converted to one array,
+    then the bounds of all geometries are compared with the image size with vectorized NumPy
+    operations instead of constructing the geometry objects one label at a time.
+
+    A geometry is invalid if it can not be decoded (broken bitmap data, empty mask, no points,
+    non-numeric or non-finite coordinates) or lies completely outside the image.
+    The labels are expected to pass the structural check of :func:`validate_label`, which
+    leaves the check of the coordinates to the batch.
+
+    :param img_size: The "size" field of the annotation, bounds are not checked if it is invalid.
+    :type img_size: dict
+    """
+
+    def __init__(self, img_size: dict):
+        self._height, self._width = None, None
+        if isinstance(img_size, dict):
+            height = img_size.get(AnnotationJsonFields.IMG_SIZE_HEIGHT)
+            width = img_size.get(AnnotationJsonFields.IMG_SIZE_WIDTH)
+            if isinstance(height, int) and isinstance(width, int) and height > 0 and width > 0:
+                self._height, self._width = height, width
+        self._points_labels = []
+        self._bitmap_labels = []
+        self._bitmap_types = []
+
+    def __len__(self) -> int:
+        return len(self._points_labels) + len(self._bitmap_labels)
+
+    def add(self, label_json: dict, geometry_type: Type[Geometry]) -> None:
+        if geometry_type in BITMAP_GEOMETRIES:
+            self._bitmap_labels.append(label_json)
+            self._bitmap_types.append(geometry_type)
+        else:
+            self._points_labels.append(label_json)
+
+    def _outside(self, bboxes: np.ndarray) -> np.ndarray:
+        # bboxes are rows of [left, top, right, bottom] in pixel coordinates
+        if self._height is None or len(bboxes) == 0:
+            return np.zeros(len(bboxes), dtype=bool)
+        return (
+            (bboxes[:, 2] < 0)
+            | (bboxes[:, 3] < 0)
+            | (bboxes[:, 0] >= self._width)
+            | (bboxes[:, 1] >= self._height)
+        )
+
+    def _check_points(self) -> np.ndarray:
+        invalid = np.zeros(len(self._points_labels), dtype=bool)
+        labels_points = []
+        for idx, label_json in enumerate(self._points_labels):
+            points = label_json[POINTS]
+            invalid[idx] = len(points[EXTERIOR]) == 0
+            label_points = points[EXTERIOR]
+            if len(points[INTERIOR]) > 0:
+                label_points = label_points + [pt for part in points[INTERIOR] for pt in part]
+            labels_points.append(label_points)
+        # points of all geometries as one [x, y] array, every geometry is a segment of it
+        points = _points_array(
+            [pt for pts, bad in zip(labels_points, invalid) if not bad for pt in pts]
+        )
+        if points is None:
+            # some geometries have wrong coordinates (or none are left), checked one by one
+            arrays = [
+                None if bad else _points_array(pts) for pts, bad in zip(labels_points, invalid)
+            ]
+            invalid = np.array([array is None for array in arrays])
+            if invalid.all():
+                return invalid
+            points = np.concatenate([array for array in arrays if array is not None])
+        counts = np.array([len(pts) for pts, bad in zip(labels_points, invalid) if not bad])
+        starts = np.cumsum(counts) - counts
+        finite = np.logical_and.reduceat(np.isfinite(points).all(axis=1), starts)
+        bboxes = np.hstack(
+            [
+                np.minimum.reduceat(points, starts, axis=0),
+                np.maximum.reduceat(points, starts, axis=0),
+            ]
+        )
+        invalid[~invalid] = ~finite | self._outside(bboxes)
+        return invalid
+
+    def _check_bitmaps(self) -> np.ndarray:
+        invalid = np.zeros(len(self._bitmap_labels), dtype=bool)
+        bboxes = np.zeros((len(self._bitmap_labels), 4), dtype=np.float64)
+        for idx, (label_json, geometry_type) in enumerate(
+            zip(self._bitmap_labels, self._bitmap_types)
+        ):
+            bitmap = label_json[BITMAP]
+            try:
+                mask = geometry_type.base64_2_data(bitmap[DATA])
+            except Exception:
+                invalid[idx] = True
+                continue
+            if mask.ndim != 2:
+                invalid[idx] = True
+                continue
+            rows = np.flatnonzero(mask.any(axis=1))
+            if len(rows) == 0:
+                invalid[idx] = True
+                continue
+            cols = np.flatnonzero(mask.any(axis=0))
+            # tight bounds of the mask, the origin is [x, y] of its top left pixel
+            bboxes[idx] = [cols[0], rows[0], cols[-1], rows[-1]]
+            bboxes[idx] += np.tile(bitmap[ORIGIN], 2)
+        invalid |= self._outside(bboxes)
+        return invalid
+
+    def find_invalid(self) -> List[dict]:
+        """
+        :return: Labels with invalid geometries.
+        :rtype: List[dict]
+        """
+        invalid = []
+        if len(self._points_labels) > 0:
+            mask = self._check_points()
+            invalid.extend(label for label, bad in zip(self._points_labels, mask) if bad)
+        if len(self._bitmap_labels) > 0:
+            mask = self._check_bitmaps()
+            invalid.extend(label for label, bad in zip(self._bitmap_labels, mask) if bad)
+        return invalid
+
+
+def validate_label(
+    label_json: dict,
+    meta: sly.ProjectMeta,
+    deep: bool = False,
+    geometries: Optional[GeometryBatch] = None,
+) -> None:
+    """
+    Check that the label can be deserialized with the given project meta.
+
+    The check is structural: the class exists in the meta, the fields required by the class
+    geometry are present and have correct types and the tags match the tag metas.
+    Geometry objects are not constructed, so bitmaps are not decoded and points are not
+    converted. Geometries without a structural check are deserialized completely.
+
+    :param label_json: Label in Supervisely JSON format.
+    :type label_json: dict
+    :param meta: Project meta.
+    :type meta: sly.ProjectMeta
+    :param deep: Construct the label with sly.Label.from_json instead of structural check.
+    :type deep: bool
+    :param geometries: Batch for the geometry check. Bitmaps and point geometries get the
+        structural check (in the deep mode too) and are added to the batch.
+    :type geometries: GeometryBatch, optional
+    :raises Exception: If the label is invalid.
+    """
+    if deep and geometries is None:
+        sly.Label.from_json(label_json, meta)
+        return
+
+    obj_class_name = label_json[LabelJsonFields.OBJ_CLASS_NAME]
+    obj_class = meta.get_obj_class(obj_class_name)
+    if obj_class is None:
+        raise RuntimeError(
+            f"Failed to deserialize a Label object from JSON: "
+            f"label class name {obj_class_name} was not found in the given project meta."
+        )
+    geometry_type = obj_class.geometry_type
+    if geometry_type is AnyGeometry:
+        geometry_type = GET_GEOMETRY_FROM_STR(
+            label_json[GEOMETRY_TYPE] if GEOMETRY_TYPE in label_json else label_json[GEOMETRY_SHAPE]
+        )
+
+    if geometry_type in POINTS_GEOMETRIES:
+        _validate_points(label_json, *POINTS_GEOMETRIES[geometry_type], geometries is None)
+    elif geometry_type in BITMAP_GEOMETRIES:
+        _validate_bitmap(label_json)
+    elif deep:
+        sly.Label.from_json(label_json, meta)
+        return
+    else:
+        geometry_type.from_json(label_json)
+
+    if geometries is not None and (
+        geometry_type in POINTS_GEOMETRIES or geometry_type in BITMAP_GEOMETRIES
+    ):
+        geometries.add(label_json, geometry_type)
+    _validate_tags(label_json[LabelJsonFields.TAGS], meta.tag_metas)
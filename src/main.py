@@ -1,141 +1,190 @@
 import os
+from typing import List, Tuple
 
 import supervisely as sly
 
+import json_backend
+import scheduler
 import sly_functions as f
 import sly_globals as g
+import streaming
+import transport
+from fs_index import DirIndex
 
 
-@g.my_app.callback("import-images-project")
-@sly.timeit
-def import_images_project(
-    api: sly.Api, task_id: int, context: dict, state: dict, app_logger
-) -> None:
-    project_dirs, only_images = f.download_data(api=api, task_id=task_id, save_path=g.STORAGE_DIR)
-    if len(project_dirs) == 0 and len(only_images) == 0:
-        raise Exception("Not found any images for import. Please, check your input data.")
+def log_reports() -> None:
+    if g.dedup is not None:
+        g.dedup.log_report()
+    g.metrics.log_report(g.METRICS_PATH)
+    if g.UPLOAD_METRICS:
+        try:
+            attachments = []
+            if g.validation_failures.exists():
+                attachments.append(g.validation_failures.path)
+            g.metrics.upload_report(g.api, g.TEAM_ID, g.TASK_ID, g.METRICS_PATH, attachments)
+        except Exception as e:
+            sly.logger.warn(f"Failed to upload import metrics report: {repr(e)}")
 
-    if len(project_dirs) > 0:
-        sly.logger.info(
-            f"Found {len(project_dirs)} project directories in the given directory. "
-            f"Paths to the projects: {project_dirs}."
+
+def log_summary(success_projects: int, projects_without_ann: int, failed_projects: int) -> None:
+    log_reports()
+    total = success_projects + projects_without_ann + failed_projects
+    msg = f"SUMMARY: \n    Total processed projects: {total}. "
+    if success_projects + projects_without_ann > 0:
+        msg += f"\n    Uploaded projects: {success_projects + projects_without_ann} "
+    if projects_without_ann > 0:
+        msg += f"({projects_without_ann} projects without annotations)."
+    if failed_projects > 0:
+        msg += f"\n    Failed to upload projects: {failed_projects}."
+        msg += "Incorrect Supervisely format. Please, check your input data."
+    sly.logger.info(msg)
+
+    if success_projects == 0 and projects_without_ann == 0:
+        raise Exception(
+            "Failed to import data. Not found images or projects in Supervisely format."
         )
 
-        success_projects = 0
-        projects_without_ann = 0
-        failed_projects = 0
 
-        for project_dir in project_dirs:
-            if g.PROJECT_NAME is None:
-                project_name = os.path.basename(os.path.normpath(project_dir))
-            else:
-                project_name = g.PROJECT_NAME
-            sly.logger.info(f"Working with directory '{project_dir}'.")
+def import_project_dir(
+    api: sly.Api,
+    task_id: int,
+    project_dir: str,
+    index: DirIndex,
+    validation_workers: int = None,
+) -> Tuple[int, int, int]:
+    """
+    Import project directory (with the fallback to separate upload of valid datasets and
+    to images only upload).
 
-            try:
-                project_fs = sly.Project(project_dir, sly.OpenMode.READ)
-                sly.logger.info(f"Successfully opened project {project_fs.name} from {project_dir}")
-                project_id, _ = project_fs.upload(project_dir, api, g.WORKSPACE_ID, project_name)
-                sly.logger.info(f"Project {project_name} uploaded successfully.")
-                success_projects += 1
-                # -------------------------------------- Add Workflow Output ------------------------------------- #
-                g.workflow.add_output(project_id)
-                sly.logger.debug(f"Workflow Output: Successful project - {project_id}.")
-                # ----------------------------------------------- - ---------------------------------------------- #
-                continue
-            except Exception as e:
-                sly.logger.info(
-                    f"Failed to upload project {project_name} from {project_dir} using "
-                    f"sly.Project.upload: {e}"
-                    "Will try to upload images and annotations separately."
-                )
+    :return: Numbers of uploaded projects, projects without annotations and failed projects.
+    :rtype: Tuple[int, int, int]
+    """
+    success_projects = 0
+    projects_without_ann = 0
+    failed_projects = 0
+    if g.PROJECT_NAME is None:
+        project_name = os.path.basename(os.path.normpath(project_dir))
+    else:
+        project_name = g.PROJECT_NAME
+    sly.logger.info(f"Working with directory '{project_dir}'.")
 
-            meta_path = os.path.join(project_dir, "meta.json")
-            meta_json = sly.json.load_json_file(meta_path)
-            meta = sly.ProjectMeta.from_json(meta_json)
+    if g.STREAMING_IMPORT:
+        datasets = [os.path.join(project_dir, name) for name in index.subdirs(project_dir)]
+        with_ann, without_ann = streaming.import_project(
+            api, task_id, project_dir, project_name, datasets, index
+        )
+        success_projects += int(with_ann)
+        projects_without_ann += int(without_ann)
+        if not with_ann and not without_ann:
+            sly.logger.warn(f"Not found images in the directory '{project_dir}'.")
+            failed_projects += 1
+        return success_projects, projects_without_ann, failed_projects
 
-            keep_classes = []
-            remove_classes = []
-            for obj_cls in meta.obj_classes:
-                if obj_cls.geometry_type != sly.Cuboid:
-                    keep_classes.append(obj_cls.name)
-                else:
-                    sly.logger.warn(
-                        f"Class {obj_cls.name} has unsupported geometry type {obj_cls.geometry_type.name()}. "
-                        f"Class will be removed from meta and all annotations."
+    # in the pre-flight mode the project is validated (and the failing items are repaired)
+    # before the upload starts, so the project is not uploaded again after sly.Project.upload
+    # fails in the middle
+    # the excluded classes and tags are filtered out only by the validation below
+    if not g.PREFLIGHT_VALIDATION and not (g.EXCLUDE_CLASSES or g.EXCLUDE_TAGS):
+        try:
+            project_fs = sly.Project(project_dir, sly.OpenMode.READ)
+            sly.logger.info(f"Successfully opened project {project_fs.name} from {project_dir}")
+            if g.journal is not None or g.dedup is not None or g.TARGET_PROJECT_ID is not None:
+                project_id = f.upload_project(api, project_dir, project_name)
+            else:
+                with g.metrics.stage("upload_project", project_fs.total_items):
+                    project_id, _ = project_fs.upload(
+                        project_dir, api, g.WORKSPACE_ID, project_name
                     )
-                    remove_classes.append(obj_cls.name)
-
-            project_items_cnt = 0
-            invalid_datasets = []
-            ds_cnt = len(os.listdir(project_dir))
-            for dataset_dir in os.listdir(project_dir):
-                dataset_path = os.path.join(project_dir, dataset_dir)
-                imgs_dir = os.path.join(dataset_path, "img")
-                ann_dir = os.path.join(dataset_path, "ann")
-                if not sly.fs.dir_exists(dataset_path):
-                    ds_cnt -= 1
-                    continue
-                if len(os.listdir(dataset_path)) == 0:
-                    sly.fs.remove_dir(dataset_path)
-                    ds_cnt -= 1
-                    continue
-                if not sly.fs.dir_exists(imgs_dir):
-                    invalid_datasets.append(dataset_path)
-                    continue
-                if len(os.listdir(imgs_dir)) == 0:
-                    sly.fs.remove_dir(dataset_path)
-                    ds_cnt -= 1
-                    continue
-                if not sly.fs.dir_exists(ann_dir):
-                    sly.fs.mkdir(ann_dir)
-
-                ds_items_cnt = f.check_items(imgs_dir, ann_dir, meta, keep_classes, remove_classes)
-                if ds_items_cnt == 0:
-                    invalid_datasets.append(dataset_path)
-                    continue
-                else:
-                    project_items_cnt += ds_items_cnt
+            sly.logger.info(f"Project {project_name} uploaded successfully.")
+            success_projects += 1
+            # -------------------------------------- Add Workflow Output ------------------------------------- #
+            g.workflow.add_output(project_id)
+            sly.logger.debug(f"Workflow Output: Successful project - {project_id}.")
+            # ----------------------------------------------- - ---------------------------------------------- #
+            return success_projects, projects_without_ann, failed_projects
+        except Exception as e:
+            sly.logger.info(
+                f"Failed to upload project {project_name} from {project_dir} using "
+                f"sly.Project.upload: {e}"
+                "Will try to upload images and annotations separately."
+            )
+    else:
+        sly.logger.info(f"Validating project {project_name} from {project_dir} before upload.")
 
-            if len(invalid_datasets) > 0:
-                sly.logger.warn(
-                    f"Incorrect Supervisely format datasets: {invalid_datasets}. \n"
-                    f"Trying to upload only images."
-                )
-                project_without_ann = f.upload_only_images(api, invalid_datasets, recursively=True)
-                if project_without_ann is not None:
-                    project_items_cnt += project_without_ann.items_count
-                    projects_without_ann += 1
-                    # -------------------------------------- Add Workflow Output ------------------------------------- #
-                    g.workflow.add_output(project_without_ann.id)
-                    sly.logger.debug(
-                        f"Workflow Output: Project without annotations - {project_without_ann.id}."
-                    )
-                    # ----------------------------------------------- - ---------------------------------------------- #
+    meta_path = os.path.join(project_dir, "meta.json")
+    meta_json = json_backend.load_json_file(meta_path)
+    meta = sly.ProjectMeta.from_json(meta_json)
 
-            if project_items_cnt == 0:
-                sly.logger.warn(f"Not found images in the directory '{project_dir}'.")
-                failed_projects += 1
-                continue
-
-            if len(remove_classes) > 0:
-                meta = meta.delete_obj_classes(remove_classes)
-                sly.logger.info(f"Meta was updated. Removed classes: {remove_classes}.")
-                sly.json.dump_json_file(meta.to_json(), meta_path)
-
-            if ds_cnt > len(invalid_datasets):
-                try:
-                    # find projects again, because some datasets may be already uploaded and removed
-                    for project_dir in sly.fs.dirs_filter(project_dir, f.search_projects):
-                        progress_project_cb = f.get_progress_cb(
-                            api,
-                            task_id,
-                            f"Uploading project: {project_name}",
-                            project_items_cnt * 2,
-                        )
+    ann_filter = f.get_annotation_filter(meta)
 
-                        sly.logger.info(f"Start uploading project '{project_name}'...")
+    project_items_cnt = 0
+    invalid_datasets = []
+    ds_cnt = len(index.listdir(project_dir))
+    for dataset_dir in index.listdir(project_dir):
+        dataset_path = os.path.join(project_dir, dataset_dir)
+        ds_items_cnt = f.check_dataset(dataset_path, meta, ann_filter, index, validation_workers)
+        if ds_items_cnt is None:
+            ds_cnt -= 1
+            continue
+        if ds_items_cnt == 0:
+            invalid_datasets.append(dataset_path)
+            continue
+        else:
+            project_items_cnt += ds_items_cnt
 
+    if len(invalid_datasets) > 0:
+        sly.logger.warn(
+            f"Incorrect Supervisely format datasets: {invalid_datasets}. \n"
+            f"Trying to upload only images."
+        )
+        project_without_ann = f.upload_only_images(
+            api, invalid_datasets, recursively=True, index=index
+        )
+        if project_without_ann is not None:
+            project_items_cnt += project_without_ann.items_count
+            projects_without_ann += 1
+            # -------------------------------------- Add Workflow Output ------------------------------------- #
+            g.workflow.add_output(project_without_ann.id)
+            sly.logger.debug(
+                f"Workflow Output: Project without annotations - {project_without_ann.id}."
+            )
+            # ----------------------------------------------- - ---------------------------------------------- #
+
+    if project_items_cnt == 0:
+        sly.logger.warn(f"Not found images in the directory '{project_dir}'.")
+        failed_projects += 1
+        return success_projects, projects_without_ann, failed_projects
+
+    if not ann_filter.is_empty():
+        meta = ann_filter.filter_meta(meta)
+        sly.logger.info(
+            f"Meta was updated. Removed classes: {ann_filter.remove_classes}, "
+            f"tags: {ann_filter.remove_tags}."
+        )
+        json_backend.dump_json_file(meta.to_json(), meta_path, atomic=True)
+
+    if ds_cnt > len(invalid_datasets):
+        try:
+            # find projects again, because some datasets may be already uploaded and removed
+            project_dirs_left = [
+                path for path in index.dirs(project_dir) if f.search_projects(path, index)
+            ]
+            for project_dir in project_dirs_left:
+                progress_project_cb = f.get_progress_cb(
+                    api,
+                    task_id,
+                    f"Uploading project: {project_name}",
+                    project_items_cnt * 2,
+                )
+
+                sly.logger.info(f"Start uploading project '{project_name}'...")
+
+                if g.journal is not None or g.dedup is not None or g.TARGET_PROJECT_ID is not None:
+                    project_id = f.upload_project(
+                        api, project_dir, project_name, progress_project_cb
+                    )
+                else:
+                    with g.metrics.stage("upload_project", project_items_cnt):
                         project_id, _ = sly.upload_project(
                             dir=project_dir,
                             api=api,
@@ -144,54 +193,136 @@ def import_images_project(
                             progress_cb=progress_project_cb,
                         )
 
-                        sly.logger.info(f"Project '{project_name}' uploaded successfully.")
-                        success_projects += 1
-                        # -------------------------------------- Add Workflow Output ------------------------------------- #
-                        g.workflow.add_output(project_id)
-                        sly.logger.debug(f"Workflow Output: Successful project - {project_id}.")
-                        # ----------------------------------------------- - ---------------------------------------------- #
-                except Exception as e:
-                    try:
-                        project = sly.project.read_single_project(project_dir)
-                        sly.logger.warn(f"Project '{project_name}' uploading failed: {str(e)}.")
-                        project = f.upload_only_images(
-                            api, [ds.item_dir for ds in project.datasets], recursively=True
-                        )
-                        if project is None:
-                            raise Exception
-                        # -------------------------------------- Add Workflow Output ------------------------------------- #
-                        g.workflow.add_output(project.id)
-                        sly.logger.debug(
-                            f"Workflow Output: Project without annotations - {project.id}."
-                        )
-                        # ----------------------------------------------- - ---------------------------------------------- #
-                        projects_without_ann += 1
-                    except Exception:
-                        failed_projects += 1
-                        sly.logger.warn(f"Not found images in the directory '{project_dir}'.")
-
-        total = success_projects + projects_without_ann + failed_projects
-        msg = f"SUMMARY: \n    Total processed projects: {total}. "
-        if success_projects + projects_without_ann > 0:
-            msg += f"\n    Uploaded projects: {success_projects + projects_without_ann} "
-        if projects_without_ann > 0:
-            msg += f"({projects_without_ann} projects without annotations)."
-        if failed_projects > 0:
-            msg += f"\n    Failed to upload projects: {failed_projects}."
-            msg += "Incorrect Supervisely format. Please, check your input data."
-        sly.logger.info(msg)
-
-        if success_projects == 0 and projects_without_ann == 0:
+                sly.logger.info(f"Project '{project_name}' uploaded successfully.")
+                success_projects += 1
+                # -------------------------------------- Add Workflow Output ------------------------------------- #
+                g.workflow.add_output(project_id)
+                sly.logger.debug(f"Workflow Output: Successful project - {project_id}.")
+                # ----------------------------------------------- - ---------------------------------------------- #
+        except Exception as e:
+            if g.PREFLIGHT_VALIDATION and g.journal is not None:
+                # the datasets were validated and the uploaded items are journaled, so the
+                # project is resumed by the next run instead of uploading the images once more
+                # to another project
+                sly.logger.warn(
+                    f"Project '{project_name}' uploading failed: {str(e)}. "
+                    "Restart the import to resume it."
+                )
+                failed_projects += 1
+                return success_projects, projects_without_ann, failed_projects
+            try:
+                project = sly.project.read_single_project(project_dir)
+                sly.logger.warn(f"Project '{project_name}' uploading failed: {str(e)}.")
+                project = f.upload_only_images(
+                    api, [ds.item_dir for ds in project.datasets], recursively=True
+                )
+                if project is None:
+                    raise Exception
+                # -------------------------------------- Add Workflow Output ------------------------------------- #
+                g.workflow.add_output(project.id)
+                sly.logger.debug(f"Workflow Output: Project without annotations - {project.id}.")
+                # ----------------------------------------------- - ---------------------------------------------- #
+                projects_without_ann += 1
+            except Exception:
+                failed_projects += 1
+                sly.logger.warn(f"Not found images in the directory '{project_dir}'.")
+
+    return success_projects, projects_without_ann, failed_projects
+
+
+def run_projects(
+    api: sly.Api, task_id: int, project_dirs: List[str], index: DirIndex
+) -> List[Tuple[int, int, int]]:
+    """
+    Import project directories, several at a time if g.PROJECT_WORKERS > 1.
+
+    Concurrent imports share the limits of requests (set by the transport of the API object,
+    see :func:`import_images_project`) and bytes (size of the projects files) in flight.
+    Failure of one project does not stop the others, it is counted as failed.
+
+    :return: Results of :func:`import_project_dir` for every project directory.
+    :rtype: List[Tuple[int, int, int]]
+    """
+    if g.PROJECT_WORKERS <= 1 or len(project_dirs) <= 1:
+        return [
+            import_project_dir(api, task_id, project_dir, index) for project_dir in project_dirs
+        ]
+
+    sly.logger.info(f"Importing {len(project_dirs)} projects, {g.PROJECT_WORKERS} at a time.")
+    sizes = [
+        sum(index.file_size(path) for path in index.file_paths(project_dir, recursive=True))
+        for project_dir in project_dirs
+    ]
+
+    def _import(project_dir):
+        try:
+            # datasets are validated in the project thread: forking validation workers
+            # while other threads upload is not safe
+            return import_project_dir(api, task_id, project_dir, index, validation_workers=1)
+        except Exception as e:
+            sly.logger.warn(f"Failed to import project from '{project_dir}': {repr(e)}")
+            return 0, 0, 1
+
+    return scheduler.run_concurrently(
+        _import, project_dirs, sizes, g.PROJECT_WORKERS, g.MAX_BYTES_IN_FLIGHT
+    )
+
+
+@g.my_app.callback("import-images-project")
+@sly.timeit
+def import_images_project(
+    api: sly.Api, task_id: int, context: dict, state: dict, app_logger
+) -> None:
+    if g.HTTP_CONNECTIONS > 0 or g.PROJECT_WORKERS > 1:
+        # the API object is created by the app for every event, all requests of the import
+        # are sent with it, the concurrent imports of projects share its limit of requests
+        connections = g.HTTP_CONNECTIONS or g.MAX_REQUESTS_IN_FLIGHT
+        max_requests = g.MAX_REQUESTS_IN_FLIGHT if g.PROJECT_WORKERS > 1 else connections
+        transport.PooledTransport(api, connections, max_requests).install()
+    f.resolve_input_path(api)
+    if g.STREAMING_IMPORT:
+        results = streaming.import_remote_projects(api, task_id, g.STORAGE_DIR)
+        if len(results) > 0:
+            success_projects = sum(1 for with_ann, _ in results if with_ann)
+            projects_without_ann = sum(1 for _, without_ann in results if without_ann)
+            failed_projects = sum(1 for result in results if not any(result))
+            log_summary(success_projects, projects_without_ann, failed_projects)
+            g.my_app.stop()
+            return
+        sly.logger.info(
+            "Input data can not be imported dataset by dataset, downloading it entirely."
+        )
+
+    project_dirs, only_images, index = f.download_data(
+        api=api, task_id=task_id, save_path=g.STORAGE_DIR
+    )
+    if len(project_dirs) == 0 and len(only_images) == 0:
+        raise Exception("Not found any images for import. Please, check your input data.")
+
+    if len(project_dirs) > 0:
+        sly.logger.info(
+            f"Found {len(project_dirs)} project directories in the given directory. "
+            f"Paths to the projects: {project_dirs}."
+        )
+
+        if g.TARGET_PROJECT_ID is not None and len(project_dirs) > 1:
             raise Exception(
-                "Failed to import data. Not found images or projects in Supervisely format."
+                "Incremental import to the existing project supports a single project directory, "
+                f"found {len(project_dirs)}."
             )
+        results = run_projects(api, task_id, project_dirs, index)
+        success_projects = sum(result[0] for result in results)
+        projects_without_ann = sum(result[1] for result in results)
+        failed_projects = sum(result[2] for result in results)
+        log_summary(success_projects, projects_without_ann, failed_projects)
 
     elif len(only_images) > 0:
         sly.logger.warn(
             f"Not found valid data (projects in Supervisely format). "
             f"Trying to upload only images from directories: {only_images}."
         )
-        project = f.upload_only_images(api, only_images)
+        project = f.upload_only_images(api, only_images, index=index)
+        log_reports()
         if project is None:
             raise Exception("Failed to import data. Not found images.")
         # -------------------------------------- Add Workflow Output ------------------------------------- #
@@ -0,0 +1,86 @@
+from typing import Dict, Optional
+
+import supervisely as sly
+
+import json_backend
+
+MANIFESTS_DIR = "/import-images-in-sly-format/manifests"
+
+
+class ImportManifest:
+    """
+    Manifest of the items imported into the project by the incremental import: image ID,
+    image size and hash, annotation hash for every item of every dataset.
+
+    The manifest is stored in Team Files (one file per project), so the next run of the
+    import into the same project uploads only new images and changed annotations.
+    Image hashes are the same as the server computes, annotation hashes are taken from the
+    annotation files after validation and filtering.
+
+    :param project_id: ID of the target project.
+    :type project_id: int
+    :param datasets: Items by dataset name and item name.
+    :type datasets: Dict[str, Dict[str, dict]], optional
+    """
+
+    VERSION = 1
+
+    def __init__(self, project_id: int, datasets: Dict[str, Dict[str, dict]] = None):
+        self.project_id = project_id
+        self.datasets = datasets or {}
+
+    @staticmethod
+    def remote_path(project_id: int) -> str:
+        return f"{MANIFESTS_DIR}/{project_id}.json"
+
+    @classmethod
+    def load(cls, api: sly.Api, team_id: int, project_id: int, path: str) -> "ImportManifest":
+        """
+        Download the manifest of the project from Team Files, an empty manifest is returned
+        if the project was not imported incrementally before.
+
+        :param path: Local path to save the manifest to.
+        :type path: str
+        """
+        remote_path = cls.remote_path(project_id)
+        if not api.file.exists(team_id, remote_path):
+            sly.logger.info(f"Manifest of the project {project_id} is not found, it is created.")
+            return cls(project_id)
+        sly.fs.ensure_base_path(path)
+        api.file.download(team_id, remote_path, path)
+        data = json_backend.load_json_file(path)
+        if data.get("version") != cls.VERSION or data.get("project_id") != project_id:
+            sly.logger.warn(f"Manifest {remote_path} has unsupported format, it is ignored.")
+            return cls(project_id)
+        return cls(project_id, data["datasets"])
+
+    def get_item(self, dataset: str, name: str) -> Optional[dict]:
+        return self.datasets.get(dataset, {}).get(name)
+
+    def set_item(
+        self, dataset: str, name: str, image_id: int, size: int, image_hash: str, ann_hash: str
+    ) -> None:
+        self.datasets.setdefault(dataset, {})[name] = {
+            "image_id": image_id,
+            "size": size,
+            "hash": image_hash,
+            "ann_hash": ann_hash,
+        }
+
+    def remove_item(self, dataset: str, name: str) -> None:
+        self.datasets.get(dataset, {}).pop(name, None)
+
+    def save(self, path: str) -> None:
+        sly.fs.ensure_base_path(path)
+        data = {"version": self.VERSION, "project_id": self.project_id, "datasets": self.datasets}
+        json_backend.dump_json_file(data, path, atomic=True)
+
+    def upload(self, api: sly.Api, team_id: int, path: str) -> None:
+        """Save the manifest and replace the previous one in Team Files."""
+        self.save(path)
+        remote_path = self.remote_path(self.project_id)
+        if api.file.exists(team_id, remote_path):
+            api.file.remove_file(team_id, remote_path)
+        api.file.upload(team_id, path, remote_path)
+        items_cnt = sum(len(items) for items in self.datasets.values())
+        sly.logger.info(f"Manifest of {items_cnt} items is uploaded to Team Files: {remote_path}.")
@@ -0,0 +1,117 @@
+import json
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import List, Optional
+
+import supervisely as sly
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+class ImportMetrics:
+    """
+    Per-stage timing and throughput of the import.
+
+    Every stage (download, unpack, listing, validation, upload, ...) is measured with
+    :meth:`stage`. Calls of the same stage are summed; they may run in parallel threads,
+    so both the summed duration and the wall time between the first start and the last
+    end are reported. Stages measured for a dataset are also grouped by dataset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._stages = {}
+        self._datasets = defaultdict(dict)
+
+    @staticmethod
+    def _new_stats(start: float) -> dict:
+        return {"calls": 0, "seconds": 0.0, "first_start": start, "last_end": start}
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, bytes: int = 0, dataset: Optional[str] = None):
+        """
+        Measure the stage. The yielded dict holds counters of the call ("items", "bytes" and
+        any other), they may be updated inside the block.
+        """
+        counters = {"items": items, "bytes": bytes}
+        start = time.time()
+        try:
+            yield counters
+        finally:
+            end = time.time()
+            with self._lock:
+                targets = [self._stages.setdefault(name, self._new_stats(start))]
+                if dataset is not None:
+                    targets.append(self._datasets[dataset].setdefault(name, self._new_stats(start)))
+                for stats in targets:
+                    stats["calls"] += 1
+                    stats["seconds"] += end - start
+                    stats["first_start"] = min(stats["first_start"], start)
+                    stats["last_end"] = max(stats["last_end"], end)
+                    for key, value in counters.items():
+                        stats[key] = stats.get(key, 0) + value
+
+    @staticmethod
+    def _format(stats: dict) -> dict:
+        result = {
+            key: value for key, value in stats.items() if key not in ("first_start", "last_end")
+        }
+        wall_seconds = stats["last_end"] - stats["first_start"]
+        result["seconds"] = round(stats["seconds"], 3)
+        result["wall_seconds"] = round(wall_seconds, 3)
+        if wall_seconds > 0:
+            result["items_per_sec"] = round(stats.get("items", 0) / wall_seconds, 1)
+            result["bytes_per_sec"] = round(stats.get("bytes", 0) / wall_seconds, 1)
+        return result
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "total_seconds": round(time.time() - self._start, 3),
+                "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+                "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+                "stages": {name: self._format(stats) for name, stats in self._stages.items()},
+                "datasets": {
+                    dataset: {name: self._format(stats) for name, stats in stages.items()}
+                    for dataset, stages in self._datasets.items()
+                },
+            }
+
+    def save(self, path: str) -> dict:
+        report = self.report()
+        sly.fs.ensure_base_path(path)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def log_report(self, path: str) -> dict:
+        """Save the report to the file and log the stages summary."""
+        report = self.save(path)
+        sly.logger.info(
+            "Import metrics",
+            extra={key: value for key, value in report.items() if key != "datasets"},
+        )
+        return report
+
+    def upload_report(
+        self, api: sly.Api, team_id: int, task_id: int, path: str, attachments: List[str] = ()
+    ) -> None:
+        """
+        Upload the saved report to Team Files and set it as the task output.
+        Attachments (e.g. the list of failed items) are uploaded to the same directory.
+        """
+        remote_dir = f"/import-images-in-sly-format/{task_id}"
+        for attachment in attachments:
+            api.file.upload(team_id, attachment, f"{remote_dir}/{os.path.basename(attachment)}")
+        remote_path = f"{remote_dir}/{os.path.basename(path)}"
+        file_info = api.file.upload(team_id, path, remote_path)
+        api.task.set_output_file_download(task_id, file_info.id, os.path.basename(path))
+        sly.logger.info(f"Import metrics report is uploaded to Team Files: {remote_dir}.")
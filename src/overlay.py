@@ -0,0 +1,59 @@
+import os
+from typing import Optional
+
+import supervisely as sly
+
+
+def agent_local_path(api: sly.Api, remote_path: str) -> Optional[str]:
+    """
+    Path of the agent directory in the app container, if the app runs on the same agent
+    and the agent storage is mounted (the same check as api.file.download_from_agent does).
+
+    :param remote_path: Path in the agent storage, e.g. "agent://1/data/project/".
+    :type remote_path: str
+    :return: Local path or None if the directory is not available locally.
+    :rtype: str, optional
+    """
+    agent_id, path_in_agent_folder = api.file.parse_agent_id_and_path(remote_path)
+    agent_storage = sly.env.agent_storage(raise_not_found=False)
+    if agent_storage is None or agent_id != sly.env.agent_id(raise_not_found=False):
+        return None
+    local_path = os.path.normpath(agent_storage + path_in_agent_folder)
+    return local_path if os.path.isdir(local_path) else None
+
+
+def create_overlay(src_dir: str, dst_dir: str) -> int:
+    """
+    Mirror the directory tree: directories are created, files are symlinks to the source
+    files, so the source is read in place and is never modified.
+
+    The import writes to the overlay only with atomic replaces (repaired annotations,
+    created empty annotations, filtered meta), which replace the symlinks with regular files
+    in the overlay, and removes only the symlinks. The overlay of a previous run is removed.
+
+    Symlinks to directories are skipped with a warning: they may form loops or point outside
+    the source directory.
+
+    :param src_dir: Source directory.
+    :type src_dir: str
+    :param dst_dir: Overlay directory.
+    :type dst_dir: str
+    :return: Number of linked files.
+    :rtype: int
+    """
+    sly.fs.remove_dir(dst_dir)
+    files_cnt = 0
+    stack = [(os.path.normpath(src_dir), dst_dir)]
+    while len(stack) > 0:
+        src_path, dst_path = stack.pop()
+        os.makedirs(dst_path, exist_ok=True)
+        with os.scandir(src_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, os.path.join(dst_path, entry.name)))
+                elif entry.is_symlink() and entry.is_dir():
+                    sly.logger.warn(f"Symlink to the directory {entry.path} is skipped.")
+                else:
+                    os.symlink(entry.path, os.path.join(dst_path, entry.name))
+                    files_cnt += 1
+    return files_cnt
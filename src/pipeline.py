@@ -0,0 +1,117 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, List
+
+import supervisely as sly
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    Staged pipeline connected with bounded queues.
+
+    Items produced by the source iterable flow through the stages one by one, every stage runs
+    in its own thread(s). When a queue is full the previous stage blocks, so the number of items
+    between the source and the last stage never exceeds the sum of queue sizes plus the items
+    being processed (backpressure). A stage may return ``None`` to drop the item.
+
+    :param queue_size: Maximum number of items waiting in front of each stage.
+    :type queue_size: int
+    """
+
+    def __init__(self, queue_size: int = 1):
+        self._queue_size = max(queue_size, 1)
+        self._stages = []
+        self._error = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, func: Callable[[Any], Any], workers: int = 1) -> "Pipeline":
+        self._stages.append((name, func, max(workers, 1)))
+        return self
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, name: str, e: Exception):
+        if self._error is None:
+            sly.logger.warn(f"Pipeline stage '{name}' failed: {repr(e)}")
+            self._error = e
+        self._stop.set()
+
+    def _run_source(self, source: Iterable, out_q: queue.Queue):
+        try:
+            for item in source:
+                if not self._put(out_q, item):
+                    return
+        except Exception as e:
+            self._fail("source", e)
+        finally:
+            self._put(out_q, _DONE)
+
+    def _run_stage(self, name: str, func: Callable, in_q, out_q, running: dict):
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _DONE:
+                    # let sibling workers of this stage see the end of the stream too
+                    self._put(in_q, _DONE)
+                    break
+                result = func(item)
+                if result is not None and not self._put(out_q, result):
+                    break
+        except Exception as e:
+            self._fail(name, e)
+        finally:
+            with self._lock:
+                running[name] -= 1
+                last_worker = running[name] == 0
+            if last_worker:
+                self._put(out_q, _DONE)
+
+    def run(self, source: Iterable) -> List[Any]:
+        """
+        Run all stages over the items of the source and wait for completion.
+
+        :param source: Iterable producing input items, it is consumed in a separate thread.
+        :type source: Iterable
+        :raises Exception: The first exception raised by the source or any of the stages.
+        :return: Items returned by the last stage.
+        :rtype: List[Any]
+        """
+        queues = [queue.Queue(self._queue_size) for _ in range(len(self._stages) + 1)]
+        threads = [threading.Thread(target=self._run_source, args=(source, queues[0]), daemon=True)]
+        running = {name: workers for name, _, workers in self._stages}
+        for idx, (name, func, workers) in enumerate(self._stages):
+            for _ in range(workers):
+                args = (name, func, queues[idx], queues[idx + 1], running)
+                threads.append(threading.Thread(target=self._run_stage, args=args, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        results = []
+        while True:
+            item = self._get(queues[-1])
+            if item is _DONE:
+                break
+            results.append(item)
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return results
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Sequence
+
+
+class BytesBudget:
+    """
+    Global limit of the data size being uploaded concurrently.
+
+    A job larger than the whole budget is started only when nothing else is running,
+    so it does not wait forever.
+
+    :param max_bytes: Maximum size of the data in flight.
+    :type max_bytes: int
+    """
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        with self._condition:
+            while self._in_flight > 0 and self._in_flight + size > self._max_bytes:
+                self._condition.wait()
+            self._in_flight += size
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self._in_flight -= size
+            self._condition.notify_all()
+
+
+def run_concurrently(
+    func: Callable, items: Sequence, sizes: Sequence[int], workers: int, max_bytes: int
+) -> List:
+    """
+    Call func for every item in the thread pool keeping the total size of the items
+    processed at the same time under max_bytes. Items are started in the given order.
+
+    :return: Results in the order of the items.
+    :rtype: List
+    """
+    budget = BytesBudget(max_bytes)
+
+    def _run(item, size):
+        budget.acquire(size)
+        try:
+            return func(item)
+        finally:
+            budget.release(size)
+
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(min(workers, len(items))) as pool:
+        return list(pool.map(_run, items, sizes))
@@ -1,20 +1,25 @@
 import functools
+import hashlib
 import json
+import multiprocessing
 import os
+import threading
 import time
 import traceback
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from os.path import basename, dirname, normpath
-from typing import Callable, List
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
-import requests
 import supervisely as sly
+from supervisely._utils import sizeof_fmt
 from supervisely.annotation.annotation import AnnotationJsonFields
 from supervisely.annotation.label import LabelJsonFields
 from supervisely.io.fs import (
-    download,
+    JUNK_FILES,
     file_exists,
     get_file_ext,
+    get_file_hash_chunked,
     get_file_name,
     get_file_name_with_ext,
     mkdir,
@@ -22,8 +27,23 @@ from supervisely.io.fs import (
 )
 from tqdm import tqdm
 
+import archives
+import downloads
+import image_size
+import json_backend
+import label_validation
+import overlay
+import transport
+from ann_filter import AnnotationFilter
+from fs_index import DirIndex
+from manifest import ImportManifest
+from team_files import TeamFilesListing
+from validation_report import ValidationSummary
 import sly_globals as g
 
+# dataset-wide arguments of check_items in a forked validation worker, set by the pool initializer
+_worker_check_context = {}
+
 
 def update_progress(count, api: sly.Api, task_id: int, progress: sly.Progress) -> None:
     count = min(count, progress.total - progress.current)
@@ -47,32 +67,33 @@ def get_progress_cb(
 
 
 def download_file_from_link(link, file_name, archive_path, progress_message, app_logger):
-    if not file_exists(archive_path):
-        progress = sly.Progress(progress_message, 0, is_size=True)
-        progress_cb = functools.partial(
-            update_progress, api=g.api, task_id=g.TASK_ID, progress=progress
-        )
-        progress_cb(0)
-        download(link, archive_path, cache=g.my_app.cache, progress=progress)
-    else:
-        with requests.get(link, allow_redirects=True, stream=True) as r:
-            sizeb = int(r.headers.get("content-length", 0))
-        if sizeb != os.path.getsize(archive_path):
-            silent_remove(archive_path)
-            raise Exception("Failed to download dataset archive.")
+    # the connection opened by the probe request is reused by the download
+    with transport.create_session(g.DOWNLOAD_CONNECTIONS) as session:
+        info = downloads.probe(link, session)
+        progress_cb = get_progress_cb(g.api, g.TASK_ID, progress_message, info.size, is_size=True)
+        try:
+            downloads.download_resumable(
+                info,
+                archive_path,
+                progress_cb=progress_cb,
+                connections=g.DOWNLOAD_CONNECTIONS,
+                expected_hash=g.ARCHIVE_HASH,
+                session=session,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to download dataset archive: {e}")
 
     app_logger.info(f"{file_name} has been successfully downloaded")
 
 
-def search_projects(dir_path):
-    files = os.listdir(dir_path)
+def search_projects(dir_path, index: DirIndex = None):
+    files = index.listdir(dir_path) if index is not None else os.listdir(dir_path)
     meta_exists = "meta.json" in files
     if meta_exists:
         try:
             meta_path = os.path.join(dir_path, "meta.json")
             try:
-                with open(meta_path, encoding="utf-8") as fin:
-                    meta_json = json.load(fin)
+                meta_json = json_backend.load_json_file(meta_path)
             except json.decoder.JSONDecodeError as e:
                 sly.logger.error(
                     f"Can not decode meta.json file with path {meta_path}: {e.msg} at "
@@ -80,68 +101,72 @@ def search_projects(dir_path):
                     exc_info=False,
                 )
                 return False
-            meta_json = sly.json.load_json_file(meta_path)
-            meta = sly.ProjectMeta.from_json(meta_json)
+            sly.ProjectMeta.from_json(meta_json)
         except Exception as e:
             sly.logger.error(
                 f"Incorrect meta.json file in {dir_path}. \nError: {repr(e)}",
                 exc_info=False,
             )
             return False
-    datasets = [f for f in files if sly.fs.dir_exists(os.path.join(dir_path, f))]
+    is_dir = index.is_dir if index is not None else sly.fs.dir_exists
+    datasets = [f for f in files if is_dir(os.path.join(dir_path, f))]
     datasets_exists = len(datasets) > 0
     return meta_exists and datasets_exists
 
 
-def search_images_dir(dir_path):
-    listdir = os.listdir(dir_path)
+def search_images_dir(dir_path, index: DirIndex = None):
+    listdir = index.files(dir_path) if index is not None else os.listdir(dir_path)
     images_found = any([sly.image.has_valid_ext(os.path.join(dir_path, f)) for f in listdir])
     return images_found
 
 
 def is_archive(path):
-    return get_file_ext(path) in [".zip", ".tar"] or path.endswith(".tar.gz")
+    return archives.is_archive(path)
 
 
-def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
+def is_tar_archive(path):
+    return path.lower().endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz"))
+
+
+def resolve_input_path(api: sly.Api) -> None:
     """
-    Download data and returns list of valid images project paths.
+    Normalize input path from the app context: switch between folder and file modes
+    and move up from dataset subdirectories to the project directory.
+    Updates g.INPUT_DIR and g.INPUT_FILE in place.
+
+    Team Files are listed through g.input_listing: the input directory is listed recursively
+    once, the checks below and the later stages use the cached listing.
 
     :param api: Supervisely API object.
     :type api: sly.Api
-    :param task_id: Supervisely task ID.
-    :type task_id: int
-    :param save_path: Path to save data.
-    :type save_path: str
-    :return: List of valid images project paths.
-    :rtype: List[str]
     """
+    g.input_listing = listing = TeamFilesListing(api, g.TEAM_ID)
 
     if not g.IS_ON_AGENT:
         if g.INPUT_DIR:
-            listdir = api.file.listdir(g.TEAM_ID, g.INPUT_DIR)
-            archives_cnt = len([is_archive(file) for file in listdir if is_archive(file) is True])
+            listing.prefetch(g.INPUT_DIR)
+            listdir = listing.listdir(g.INPUT_DIR)
+            archive_files = [file for file in listdir if is_archive(file)]
+            # parts of a split archive are counted as one archive
+            archives_cnt = len({archives.archive_base(file) for file in archive_files})
             if archives_cnt > 1:
                 raise Exception("Multiple archives are not supported.")
-            if len(listdir) == 1 and archives_cnt == 1:
+            if archives_cnt == 1 and len(listdir) == len(archive_files):
                 sly.logger.info(
                     "Folder mode is selected, but archive file is uploaded. Switching to file mode."
                 )
-                g.INPUT_DIR, g.INPUT_FILE = None, listdir[0]
+                g.INPUT_DIR, g.INPUT_FILE = None, archives.archive_parts(listdir[0], listdir)[0]
             else:
                 if all(
                     basename(normpath(x)) in ["img", "ann", "meta"]
                     for x in listdir
-                    if api.file.dir_exists(g.TEAM_ID, x)
+                    if listing.dir_exists(x)
                 ):
                     g.INPUT_DIR = dirname(normpath(g.INPUT_DIR))
-                    listdir = api.file.listdir(g.TEAM_ID, g.INPUT_DIR)
                 if basename(normpath(g.INPUT_DIR)) in ["img", "ann", "meta"]:
                     g.INPUT_DIR = dirname(normpath(g.INPUT_DIR))
-                    listdir = api.file.listdir(g.TEAM_ID, g.INPUT_DIR)
                 if "meta.json" in [
-                    basename(normpath(x))
-                    for x in api.file.listdir(g.TEAM_ID, dirname(normpath(g.INPUT_DIR)))
+                    basename(normpath(x)) for x in listing.listdir(dirname(normpath(g.INPUT_DIR)))
                 ]:
                     g.INPUT_DIR = dirname(normpath(g.INPUT_DIR))
                 if not g.INPUT_DIR.endswith("/"):
@@ -155,19 +180,18 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
                 g.INPUT_DIR, g.INPUT_FILE = dirname(g.INPUT_FILE), None
             elif sly.image.is_valid_ext(file_ext) or file_ext == ".json":
                 parent_dir = dirname(normpath(g.INPUT_FILE))
-                listdir = api.file.listdir(g.TEAM_ID, parent_dir)
+                listing.prefetch(parent_dir)
+                listdir = listing.listdir(parent_dir)
                 if all(
                     basename(normpath(x)) in ["img", "ann", "meta"]
                     for x in listdir
-                    if api.file.dir_exists(g.TEAM_ID, x)
+                    if listing.dir_exists(x)
                 ):
                     parent_dir = dirname(normpath(parent_dir))
-                    listdir = api.file.listdir(g.TEAM_ID, parent_dir)
                 if basename(normpath(parent_dir)) in ["img", "ann", "meta"]:
                     parent_dir = dirname(normpath(parent_dir))
-                    listdir = api.file.listdir(g.TEAM_ID, parent_dir)
                 if "meta.json" in [
-                    basename(normpath(x)) for x in api.file.listdir(g.TEAM_ID, dirname(parent_dir))
+                    basename(normpath(x)) for x in listing.listdir(dirname(parent_dir))
                 ]:
                     sly.logger.info(f"Found meta.json in {dirname(parent_dir)}.")
                     parent_dir = dirname(normpath(parent_dir))
@@ -175,6 +199,126 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
                     parent_dir += "/"
                 g.INPUT_DIR, g.INPUT_FILE = parent_dir, None
 
+
+def plan_download(listing: TeamFilesListing, remote_dir: str) -> Dict[str, int]:
+    """
+    Select files of the remote directory that are needed for the import: junk files
+    (see JUNK_FILES) and files in "ann" and "meta" directories of datasets that can not
+    belong to any image in the "img" directory next to them are skipped. A file is kept if
+    its name without ".json" matches the name of an image or the name without the extension,
+    ignoring case and the image extension, so the files that only differ from the image name
+    are downloaded and handled by the checks of the dataset. All other files are kept.
+
+    :return: Sizes of the selected files by their remote paths.
+    :rtype: Dict[str, int]
+    """
+    files = listing.files(remote_dir)
+    names_by_dir = defaultdict(set)
+    for path in files:
+        names_by_dir[dirname(path)].add(basename(path))
+
+    needed_by_dataset = {}
+
+    def _needed_names(dataset_dir: str) -> Optional[Set[str]]:
+        # lowercase names and names without extensions of the images of the dataset
+        if dataset_dir not in needed_by_dataset:
+            img_dir = os.path.join(dataset_dir, "img")
+            needed = None
+            if img_dir in names_by_dir:
+                needed = set()
+                for img_name in names_by_dir[img_dir]:
+                    if sly.image.has_valid_ext(img_name):
+                        needed.add(img_name.lower())
+                        needed.add(os.path.splitext(img_name)[0].lower())
+            needed_by_dataset[dataset_dir] = needed
+        return needed_by_dataset[dataset_dir]
+
+    def _is_needed(name: str, needed: Set[str]) -> bool:
+        if not name.lower().endswith(g.ANN_EXT):
+            return False
+        item_name = name[: -len(g.ANN_EXT)].lower()
+        return item_name in needed or os.path.splitext(item_name)[0] in needed
+
+    selected = {}
+    for path, size in files.items():
+        rel_parts = os.path.relpath(path, remote_dir).split(os.sep)
+        if any(part in JUNK_FILES for part in rel_parts):
+            continue
+        parent = dirname(path)
+        if basename(parent) in ("ann", "meta"):
+            needed = _needed_names(dirname(parent))
+            if needed is not None and not _is_needed(basename(path), needed):
+                continue
+        selected[path] = size
+    return selected
+
+
+def download_files(
+    api: sly.Api,
+    files: List[str],
+    remote_dir: str,
+    local_dir: str,
+    progress_cb: Optional[Callable] = None,
+) -> None:
+    """Download the files of the remote directory keeping its structure, in parallel."""
+    progress_lock = threading.Lock()
+
+    def _download(remote_path):
+        local_path = os.path.join(local_dir, os.path.relpath(remote_path, remote_dir))
+        sly.fs.ensure_base_path(local_path)
+        api.file.download(g.TEAM_ID, remote_path, local_path)
+        if progress_cb is not None:
+            with progress_lock:
+                progress_cb(os.path.getsize(local_path))
+
+    with ThreadPoolExecutor(g.DOWNLOAD_WORKERS) as pool:
+        list(pool.map(_download, files))
+
+
+def unpack_archives(
+    api: sly.Api, task_id: int, archive_paths: List[str], input_path: str, sizeb: int
+) -> None:
+    """
+    Unpack the downloaded archive (or the parts of the split archive) and the archives
+    nested in it, then remove the archives.
+    """
+    progress_cb = get_progress_cb(
+        api, task_id, f"Unpacking {basename(archives.archive_base(archive_paths[0]))}", sizeb, True
+    )
+    with g.metrics.stage("unpack", bytes=sizeb) as stage:
+        stage["items"] = archives.unpack_archive(
+            archive_paths, input_path, g.UNPACK_WORKERS, progress_cb
+        )
+        for archive_path in archive_paths:
+            silent_remove(archive_path)
+        unpack_nested_archives(input_path)
+    sly.logger.info(f"Unpacked archive to {input_path}.")
+
+
+def unpack_nested_archives(input_path: str) -> None:
+    """Unpack the archives found in the unpacked (or extracted while downloading) archive."""
+    nested_cnt = archives.unpack_nested_archives(input_path, g.UNPACK_WORKERS)
+    if nested_cnt > 0:
+        sly.logger.info(f"Unpacked {nested_cnt} archives found in the main archive.")
+
+
+def download_data(
+    api: sly.Api, task_id: int, save_path: str
+) -> Tuple[List[str], List[str], DirIndex]:
+    """
+    Download data and returns list of valid images project paths.
+
+    :param api: Supervisely API object.
+    :type api: sly.Api
+    :param task_id: Supervisely task ID.
+    :type task_id: int
+    :param save_path: Path to save data.
+    :type save_path: str
+    :return: List of valid images project paths, list of directories with images only
+        (if no projects are found) and index of the downloaded directory tree.
+    :rtype: Tuple[List[str], List[str], DirIndex]
+    """
+
     if g.INPUT_DIR is not None:
         # If the app received a path to the directory in TeamFiles from environment variables.
         sly.logger.debug(f"The app is working with directory {g.INPUT_DIR}.")
@@ -185,21 +329,59 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
             cur_files_path = g.INPUT_DIR
         remote_path = g.INPUT_DIR
         input_path = os.path.join(save_path, os.path.basename(os.path.normpath(cur_files_path)))
-        sizeb = api.file.get_directory_size(g.TEAM_ID, remote_path)
-        progress_cb = get_progress_cb(
-            api=api,
-            task_id=task_id,
-            message=f"Downloading {remote_path.lstrip('/').rstrip('/')}",
-            total=sizeb,
-            is_size=True,
-        )
-        api.file.download_directory(
-            team_id=g.TEAM_ID,
-            remote_path=remote_path,
-            local_save_path=input_path,
-            progress_cb=progress_cb,
-        )
-        sly.fs.remove_junk_from_dir(input_path)
+        local_path = None
+        if g.IS_ON_AGENT and g.IN_PLACE_IMPORT:
+            local_path = overlay.agent_local_path(api, g.INPUT_DIR)
+            if local_path is None:
+                sly.logger.warn(
+                    "Agent storage is not mounted to the app, the directory will be downloaded."
+                )
+        if local_path is not None:
+            # the source is read in place, only changed annotations are written to the overlay
+            with g.metrics.stage("overlay") as stage:
+                stage["items"] = overlay.create_overlay(local_path, input_path)
+            sly.logger.info(
+                f"Importing {stage['items']} files in place from {local_path}, "
+                f"repaired annotations are written to {input_path}."
+            )
+        else:
+            selected = None
+            if g.input_listing is not None and not g.IS_ON_AGENT:
+                sizeb = g.input_listing.get_directory_size(remote_path)
+                if g.SELECTIVE_DOWNLOAD:
+                    selected = plan_download(g.input_listing, remote_path)
+                    skipped_sizeb = sizeb - sum(selected.values())
+                    # the directory is downloaded as one archive, files are downloaded one by one,
+                    # so it pays off only when a noticeable part of the data is skipped
+                    if skipped_sizeb < sizeb * g.SELECTIVE_DOWNLOAD_MIN_SKIPPED:
+                        selected = None
+                    else:
+                        sly.logger.info(
+                            f"Downloading {len(selected)} files needed for the import, "
+                            f"skipping {sizeof_fmt(skipped_sizeb)} of junk and unmatched "
+                            "annotations."
+                        )
+                        sizeb -= skipped_sizeb
+            else:
+                sizeb = api.file.get_directory_size(g.TEAM_ID, remote_path)
+            progress_cb = get_progress_cb(
+                api=api,
+                task_id=task_id,
+                message=f"Downloading {remote_path.lstrip('/').rstrip('/')}",
+                total=sizeb,
+                is_size=True,
+            )
+            with g.metrics.stage("download", bytes=sizeb) as stage:
+                if selected is not None:
+                    stage["items"] = len(selected)
+                    download_files(api, list(selected), remote_path, input_path, progress_cb)
+                else:
+                    api.file.download_directory(
+                        team_id=g.TEAM_ID,
+                        remote_path=remote_path,
+                        local_save_path=input_path,
+                        progress_cb=progress_cb,
+                    )
 
     elif g.INPUT_FILE is not None:
         # If the app received a path to the file in TeamFiles from environment variables.
@@ -212,7 +394,18 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
         remote_path = g.INPUT_FILE
 
         save_archive_path = os.path.join(save_path, get_file_name_with_ext(cur_files_path))
-        sizeb = api.file.get_info_by_path(g.TEAM_ID, remote_path).sizeb
+        remote_parts = [remote_path]
+        if archives.split_part(remote_path) is not None:
+            remote_dir = dirname(remote_path)
+            siblings = (
+                g.input_listing.listdir(remote_dir)
+                if g.input_listing is not None
+                else api.file.listdir(g.TEAM_ID, remote_dir)
+            )
+            remote_parts = archives.archive_parts(remote_path, siblings)
+            sly.logger.info(f"Found {len(remote_parts)} parts of the split archive {remote_path}.")
+            cur_files_path = archives.archive_base(cur_files_path)
+        sizeb = sum(api.file.get_info_by_path(g.TEAM_ID, part).sizeb for part in remote_parts)
         progress_cb = get_progress_cb(
             api=api,
             task_id=task_id,
@@ -220,23 +413,45 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
             total=sizeb,
             is_size=True,
         )
-        api.file.download(
-            team_id=g.TEAM_ID,
-            remote_path=remote_path,
-            local_save_path=save_archive_path,
-            progress_cb=progress_cb,
-        )
-
         input_path = os.path.join(save_path, get_file_name(cur_files_path))
-        if not is_archive(save_archive_path):
-            sly.logger.warn(
-                f"Unsupported file extension ({save_archive_path}). \n"
-                "Please, upload the data as directory or archive (.tar, .tar.gz or .zip)."
-            )
-            raise Exception(f"Downloaded file has unsupported extension. Read the app overview.")
-        sly.fs.unpack_archive(save_archive_path, input_path)
-        sly.logger.info(f"Unpacked archive {save_archive_path} to {input_path}.")
-        silent_remove(save_archive_path)
+        if (
+            g.STREAM_ARCHIVES
+            and not g.IS_ON_AGENT
+            and len(remote_parts) == 1
+            and is_tar_archive(remote_path)
+        ):
+            with g.metrics.stage("download_and_unpack", bytes=sizeb):
+                archives.extract_from_team_files(
+                    api, g.TEAM_ID, remote_path, input_path, progress_cb
+                )
+                unpack_nested_archives(input_path)
+            sly.logger.info(f"Extracted archive {remote_path} to {input_path} while downloading.")
+        else:
+            with g.metrics.stage("download", bytes=sizeb) as stage:
+                if len(remote_parts) > 1:
+                    stage["items"] = len(remote_parts)
+                    download_files(api, remote_parts, dirname(remote_path), save_path, progress_cb)
+                else:
+                    api.file.download(
+                        team_id=g.TEAM_ID,
+                        remote_path=remote_path,
+                        local_save_path=save_archive_path,
+                        progress_cb=progress_cb,
+                    )
+            archive_paths = [
+                os.path.join(save_path, get_file_name_with_ext(part)) for part in remote_parts
+            ]
+
+            if not is_archive(save_archive_path):
+                sly.logger.warn(
+                    f"Unsupported file extension ({save_archive_path}). \n"
+                    "Please, upload the data as directory or archive "
+                    "(.tar, .tar.gz, .tar.zst, .zip or their parts: .zip.001, .tar.part1)."
+                )
+                raise Exception(
+                    f"Downloaded file has unsupported extension. Read the app overview."
+                )
+            unpack_archives(api, task_id, archive_paths, input_path, sizeb)
 
     elif g.EXTERNAL_LINK is not None:
         remote_path = g.EXTERNAL_LINK
@@ -244,30 +459,74 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
         proj_path = os.path.join(save_path, get_file_name(file_name))
         if not os.path.exists(proj_path):
             mkdir(proj_path, True)
-        save_archive_path = os.path.join(proj_path, file_name)
-        download_file_from_link(
-            link=remote_path,
-            file_name=file_name,
-            archive_path=save_archive_path,
-            progress_message=f"Downloading archive from link",
-            app_logger=g.my_app.logger,
-        )
         input_path = os.path.join(save_path, get_file_name(proj_path))
-        if not is_archive(save_archive_path):
-            raise Exception(f"Downloaded file is not archive. Path: {save_archive_path}")
-        try:
-            sly.fs.unpack_archive(save_archive_path, input_path)
-            # TODO Detecting multi-part archives in the main archive and unpacking them
-        except Exception as e:
-            raise Exception(f"Failed to read dataset archive file. Please try again. Error: {e}")
-        sly.logger.debug(f"Unpacked archive {save_archive_path} to {input_path}.")
-        silent_remove(save_archive_path)
+        extracted = False
+        if g.STREAM_ARCHIVES:
+            try:
+                with g.metrics.stage("download_and_unpack"):
+                    archives.extract_from_link(
+                        remote_path,
+                        input_path,
+                        lambda sizeb: get_progress_cb(
+                            api,
+                            task_id,
+                            "Downloading and extracting archive from link",
+                            sizeb,
+                            True,
+                        ),
+                    )
+                    unpack_nested_archives(input_path)
+                sly.logger.info(f"Extracted archive from link to {input_path} while downloading.")
+                extracted = True
+            except archives.StreamingNotSupported as e:
+                sly.logger.info(f"{e} Archive will be downloaded before unpacking.")
+            except Exception as e:
+                raise Exception(
+                    f"Failed to read dataset archive file. Please try again. Error: {e}"
+                )
+        if not extracted:
+            # the archive of the link is kept in the downloads directory until it is unpacked,
+            # so a restarted task resumes its download, archives of other links are removed
+            link_key = hashlib.sha1(remote_path.encode("utf-8")).hexdigest()
+            link_dir = os.path.join(g.DOWNLOADS_DIR, link_key)
+            for entry in os.scandir(g.DOWNLOADS_DIR):
+                if entry.path == link_dir:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    sly.fs.remove_dir(entry.path)
+                else:
+                    silent_remove(entry.path)
+            save_archive_path = os.path.join(link_dir, file_name)
+            with g.metrics.stage("download") as stage:
+                download_file_from_link(
+                    link=remote_path,
+                    file_name=file_name,
+                    archive_path=save_archive_path,
+                    progress_message=f"Downloading archive from link",
+                    app_logger=g.my_app.logger,
+                )
+                sizeb = os.path.getsize(save_archive_path)
+                stage["bytes"] = sizeb
+            if not is_archive(save_archive_path):
+                raise Exception(f"Downloaded file is not archive. Path: {save_archive_path}")
+            try:
+                unpack_archives(api, task_id, [save_archive_path], input_path, sizeb)
+            except Exception as e:
+                raise Exception(
+                    f"Failed to read dataset archive file. Please try again. Error: {e}"
+                )
+
+    with g.metrics.stage("listing") as stage:
+        # the tree is scanned once, all the searches below and the later stages use the index
+        index = DirIndex(input_path)
+        index.remove_junk()
+        stage["items"] = index.files_count()
 
-    project_dirs = [project_dir for project_dir in sly.fs.dirs_filter(input_path, search_projects)]
+        project_dirs = [path for path in index.dirs() if search_projects(path, index)]
 
-    only_images = []
-    if len(project_dirs) == 0:
-        only_images = [img_dir for img_dir in sly.fs.dirs_filter(input_path, search_images_dir)]
+        only_images = []
+        if len(project_dirs) == 0:
+            only_images = [path for path in index.dirs() if search_images_dir(path, index)]
 
     bad_projs = defaultdict(int)
     project_type_to_cls = {
@@ -278,10 +537,10 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
     }
     bad_projs = defaultdict(int)
     # search for projects with another types
-    for r, d, fs in os.walk(input_path):
+    for r, d, fs in index.walk():
         if "meta.json" in fs:
             try:
-                meta_json = sly.json.load_json_file(os.path.join(r, "meta.json"))
+                meta_json = json_backend.load_json_file(os.path.join(r, "meta.json"))
                 meta = sly.ProjectMeta.from_json(meta_json)
             except:
                 continue
@@ -303,10 +562,11 @@ def download_data(api: sly.Api, task_id: int, save_path: str) -> List[str]:
 
     if bad_proj_cnt > 0:
         sly.logger.warn(f"{bad_proj_msg}. Make sure that you are uploading only images projects.")
-    return project_dirs, only_images
+    return project_dirs, only_images, index
 
 
-def get_effective_ann_name(img_name, ann_names):
+def get_effective_ann_name(img_name, ann_names: Set[str]):
+    # ann_names must be a set (or dict) of names, so the lookup does not depend on dataset size
     new_format_name = img_name + g.ANN_EXT
     if new_format_name in ann_names:
         return new_format_name
@@ -315,41 +575,142 @@ def get_effective_ann_name(img_name, ann_names):
         return old_format_name if (old_format_name in ann_names) else None
 
 
-def create_empty_ann(imgs_dir, img_name, ann_dir):
-    ann = sly.Annotation.from_img_path(os.path.join(imgs_dir, img_name))
+def create_empty_ann(imgs_dir, img_name, ann_dir, img_size: Tuple[int, int] = None):
+    if img_size is None:
+        img_size = image_size.read_image_size(os.path.join(imgs_dir, img_name))
+    ann = sly.Annotation(img_size)
     ann_name = img_name + g.ANN_EXT
-    sly.json.dump_json_file(ann.to_json(), os.path.join(ann_dir, ann_name))
+    # replaces the annotation (or the symlink to the source annotation) atomically
+    json_backend.dump_json_file(ann.to_json(), os.path.join(ann_dir, ann_name), atomic=True)
     return ann_name
 
 
-def upload_only_images(api: sly.Api, img_dirs: list, recursively: bool = False):
+def list_images(img_dir: str, recursively: bool = False, index: DirIndex = None) -> List[str]:
+    if index is not None and index.is_dir(img_dir):
+        return [
+            path
+            for path in index.file_paths(img_dir, recursive=recursively)
+            if sly.image.has_valid_ext(path)
+        ]
+    if not sly.fs.dir_exists(img_dir):
+        return []
+    if recursively:
+        return sly.fs.list_files_recursively(
+            img_dir,
+            valid_extensions=sly.image.SUPPORTED_IMG_EXTS,
+        )
+    return sly.fs.list_files(
+        img_dir,
+        valid_extensions=sly.image.SUPPORTED_IMG_EXTS,
+        ignore_valid_extensions_case=True,
+    )
+
+
+def upload_images_batch(api: sly.Api, batch: List[Tuple[int, str, str]]) -> int:
+    """
+    Upload batch of images which may belong to different datasets.
+
+    Images data is sent with bulk requests for the whole batch (the server skips files it
+    already has), then images are added to their datasets by hashes. The batch is retried
+    on errors, datasets which already got their images are not repeated.
+
+    :param batch: Dataset ID, image name and path for every image.
+    :type batch: List[Tuple[int, str, str]]
+    :return: Number of uploaded images.
+    :rtype: int
+    """
+    paths = [path for _, _, path in batch]
+    if g.dedup is not None:
+        hashes = g.dedup.hash_files(paths)
+    else:
+        hashes = [get_file_hash_chunked(path) for path in paths]
+    groups = defaultdict(list)
+    for (dataset_id, name, _), image_hash in zip(batch, hashes):
+        groups[dataset_id].append((name, image_hash))
+
+    finished = set()
+    for attempt in range(g.UPLOAD_RETRIES):
+        try:
+            if g.dedup is not None:
+                g.dedup.upload_data(api, paths)
+            elif len(finished) == 0:
+                # data upload is not exposed for several datasets by the public API,
+                # this is the first step of api.image.upload_paths
+                api.image._upload_data_bulk(lambda path: open(path, "rb"), zip(paths, hashes))
+            for dataset_id, items in groups.items():
+                if dataset_id in finished:
+                    continue
+                names = [name for name, _ in items]
+                images = api.image.upload_hashes(dataset_id, names, [h for _, h in items])
+                if g.journal is not None:
+                    g.journal.add_images(dataset_id, names, [image.id for image in images])
+                finished.add(dataset_id)
+            return len(batch)
+        except Exception as e:
+            if attempt == g.UPLOAD_RETRIES - 1:
+                raise
+            delay = 2**attempt
+            sly.logger.warn(
+                f"Failed to upload batch of {len(batch)} images: {repr(e)}. "
+                f"Retrying in {delay} seconds..."
+            )
+            time.sleep(delay)
+
+
+def upload_only_images(
+    api: sly.Api, img_dirs: list, recursively: bool = False, index: DirIndex = None
+):
     project_name = "Images project"
-    project = api.project.create(g.WORKSPACE_ID, project_name, change_name_if_conflict=True)
-    images_cnt = 0
+    dir_names = sorted(basename(normpath(img_dir)) for img_dir in img_dirs)
+    project_key = get_project_key("images:" + ",".join(dir_names))
+    # images without annotations are never imported into the target project of the incremental
+    # import, the project is always created by the app, so it can be removed if it stays empty
+    project = create_project(api, project_name, None, project_key, use_target=False)
+
+    dirs_images = {}
     for img_dir in img_dirs:
-        if not sly.fs.dir_exists(img_dir):
-            continue
-        if recursively:
-            image_paths = sly.fs.list_files_recursively(
-                img_dir,
-                valid_extensions=sly.image.SUPPORTED_IMG_EXTS,
-            )
-        else:
-            image_paths = sly.fs.list_files(
-                img_dir,
-                valid_extensions=sly.image.SUPPORTED_IMG_EXTS,
-                ignore_valid_extensions_case=True,
-            )
-        if len(image_paths) == 0:
-            continue
-        dataset_name = os.path.basename(os.path.normpath(img_dir))
-        dataset = api.dataset.create(project.id, dataset_name, change_name_if_conflict=True)
-        image_names = [
-            os.path.basename(path) for path in image_paths if sly.image.has_valid_ext(path)
+        image_paths = list_images(img_dir, recursively, index)
+        if len(image_paths) > 0:
+            dirs_images[img_dir] = image_paths
+    # directories with the same name are handled by one worker one after another,
+    # so the names of their datasets do not conflict
+    dirs_by_name = defaultdict(list)
+    for img_dir in dirs_images:
+        dirs_by_name[basename(normpath(img_dir))].append(img_dir)
+
+    def _create_datasets(dataset_name):
+        dataset_ids, items, uploaded_cnt = [], [], 0
+        for img_dir in dirs_by_name[dataset_name]:
+            dataset = get_or_create_dataset(api, project.id, dataset_name)
+            dataset_ids.append(dataset.id)
+            uploaded = get_uploaded_images(api, dataset.id)
+            uploaded_cnt += len(uploaded)
+            for path in dirs_images[img_dir]:
+                if os.path.basename(path) not in uploaded:
+                    items.append((dataset.id, os.path.basename(path), path))
+        return dataset_ids, items, uploaded_cnt
+
+    def _upload_batch(batch):
+        sizeb = sum(os.path.getsize(path) for _, _, path in batch)
+        with g.metrics.stage("upload_images", items=len(batch), bytes=sizeb):
+            return upload_images_batch(api, batch)
+
+    dataset_ids, items = [], []
+    images_cnt = 0
+    with ThreadPoolExecutor(g.UPLOAD_WORKERS) as pool:
+        for ids, dataset_items, uploaded_cnt in pool.map(_create_datasets, dirs_by_name):
+            dataset_ids.extend(ids)
+            items.extend(dataset_items)
+            images_cnt += uploaded_cnt
+        batches = [
+            items[i : i + g.UPLOAD_BATCH_SIZE] for i in range(0, len(items), g.UPLOAD_BATCH_SIZE)
         ]
-        images = api.image.upload_paths(dataset.id, image_names, image_paths)
-        images_cnt += len(images)
+        images_cnt += sum(pool.map(_upload_batch, batches))
+
+    for img_dir in dirs_images:
         sly.fs.remove_dir(img_dir)
+        if index is not None:
+            index.discard(img_dir)
     if images_cnt > 1:
         sly.logger.info(f"{images_cnt} images were uploaded to project '{project.name}'.")
     elif images_cnt == 1:
@@ -357,52 +718,507 @@ def upload_only_images(api: sly.Api, img_dirs: list, recursively: bool = False):
     else:
         api.project.remove(project.id)
         return None
+    if g.journal is not None:
+        for dataset_id in dataset_ids:
+            g.journal.finish_dataset(dataset_id)
+        g.journal.finish_project(project_key)
     project = api.project.get_info_by_id(project.id)
     return project
 
 
-def check_items(imgs_dir, ann_dir, meta, keep_classes, remove_classes):
+def get_annotation_filter(meta: sly.ProjectMeta) -> AnnotationFilter:
+    """
+    Get filter of the classes with unsupported geometry types and the classes and tags
+    excluded by the settings (g.EXCLUDE_CLASSES, g.EXCLUDE_TAGS).
+    """
+    remove_classes = []
+    for obj_cls in meta.obj_classes:
+        if obj_cls.geometry_type == sly.Cuboid:
+            sly.logger.warn(
+                f"Class {obj_cls.name} has unsupported geometry type {obj_cls.geometry_type.name()}. "
+                f"Class will be removed from meta and all annotations."
+            )
+            remove_classes.append(obj_cls.name)
+        elif obj_cls.name in g.EXCLUDE_CLASSES:
+            sly.logger.info(f"Class {obj_cls.name} will be removed from meta and all annotations.")
+            remove_classes.append(obj_cls.name)
+    remove_tags = []
+    for tag_meta in meta.tag_metas:
+        if tag_meta.name in g.EXCLUDE_TAGS:
+            sly.logger.info(f"Tag {tag_meta.name} will be removed from meta and all annotations.")
+            remove_tags.append(tag_meta.name)
+    return AnnotationFilter(remove_classes, remove_tags)
+
+
+def check_dataset(
+    dataset_path,
+    meta,
+    ann_filter: AnnotationFilter,
+    index: DirIndex = None,
+    workers: int = None,
+):
+    """
+    Check dataset directory structure, validate its items and filter their annotations.
+
+    :param ann_filter: Filter applied to the valid annotations.
+    :type ann_filter: AnnotationFilter
+
+    :param index: Index of the directory tree with the dataset, the dataset is scanned
+        if it is not given. The index is updated with created and removed files.
+    :type index: DirIndex, optional
+    :param workers: Number of processes to validate items, g.VALIDATION_WORKERS by default.
+    :type workers: int, optional
+    :return: None if the directory is not a dataset (or it is empty and removed),
+        0 if the dataset has incorrect Supervisely format, otherwise number of valid items.
+    :rtype: Optional[int]
+    """
+    if index is None:
+        if not sly.fs.dir_exists(dataset_path):
+            return None
+        index = DirIndex(dataset_path)
+    imgs_dir = os.path.join(dataset_path, "img")
+    ann_dir = os.path.join(dataset_path, "ann")
+    if not index.is_dir(dataset_path):
+        return None
+    if len(index.listdir(dataset_path)) == 0:
+        sly.fs.remove_dir(dataset_path)
+        index.discard(dataset_path)
+        return None
+    if not index.is_dir(imgs_dir):
+        return 0
+    if len(index.listdir(imgs_dir)) == 0:
+        sly.fs.remove_dir(dataset_path)
+        index.discard(dataset_path)
+        return None
+    if not index.is_dir(ann_dir):
+        sly.fs.mkdir(ann_dir)
+        index.add_dir(ann_dir)
+    return check_items(imgs_dir, ann_dir, meta, ann_filter, workers, index)
+
+
+def get_project_key(project_dir: str) -> str:
+    return f"{g.INPUT_SOURCE}::{basename(normpath(project_dir))}"
+
+
+def create_project(
+    api: sly.Api,
+    project_name: str,
+    meta: Optional[sly.ProjectMeta],
+    project_key: str,
+    use_target: bool = True,
+):
+    """
+    Create project with the given meta. If the journal is enabled and the upload of the project
+    with the same key was interrupted, the existing project is returned instead.
+    In the incremental import the target project is returned (unless use_target is False),
+    the meta is merged into its meta.
+    """
+    if use_target and g.TARGET_PROJECT_ID is not None:
+        return get_target_project(api, meta)
+    if g.journal is not None:
+        project_id = g.journal.get_project(project_key)
+        project = api.project.get_info_by_id(project_id) if project_id is not None else None
+        if project is not None:
+            sly.logger.info(f"Resuming upload to the existing project '{project.name}'.")
+            if meta is not None:
+                api.project.update_meta(project.id, meta.to_json())
+            return project
+    project = api.project.create(g.WORKSPACE_ID, project_name, change_name_if_conflict=True)
+    if meta is not None:
+        api.project.update_meta(project.id, meta.to_json())
+    if g.journal is not None:
+        g.journal.add_project(project_key, project.id)
+    return project
+
+
+def get_target_project(api: sly.Api, meta: Optional[sly.ProjectMeta]):
+    """Return the target project of the incremental import, merging the meta into its meta."""
+    project = api.project.get_info_by_id(g.TARGET_PROJECT_ID)
+    if project is None:
+        raise Exception(f"Target project with ID {g.TARGET_PROJECT_ID} is not found.")
+    sly.logger.info(f"Importing incrementally to the existing project '{project.name}'.")
+    if meta is not None:
+        project_meta = sly.ProjectMeta.from_json(api.project.get_meta(project.id))
+        merged_meta = project_meta.merge(meta)
+        if merged_meta != project_meta:
+            api.project.update_meta(project.id, merged_meta.to_json())
+    return project
+
+
+def get_or_create_dataset(api: sly.Api, project_id: int, dataset_name: str):
+    if project_id == g.TARGET_PROJECT_ID:
+        dataset = api.dataset.get_info_by_name(project_id, dataset_name)
+        if dataset is not None:
+            return dataset
+    if g.journal is not None:
+        journal_dataset = g.journal.get_dataset(project_id, dataset_name)
+        if journal_dataset is not None:
+            dataset = api.dataset.get_info_by_id(journal_dataset[0])
+            if dataset is not None:
+                return dataset
+    dataset = api.dataset.create(project_id, dataset_name, change_name_if_conflict=True)
+    if g.journal is not None:
+        g.journal.add_dataset(project_id, dataset_name, dataset.id)
+    return dataset
+
+
+def get_uploaded_images(api: sly.Api, dataset_id: int) -> Dict[str, Tuple[int, bool]]:
+    """
+    Return images that are already uploaded to the dataset by the interrupted run:
+    name -> (image ID, annotation is uploaded). Images missing in the journal (e.g. the task
+    died in the middle of a batch) are taken from the server, their annotations are re-uploaded.
+    """
+    if g.journal is None:
+        return {}
+    uploaded = g.journal.get_images(dataset_id)
+    for image in api.image.get_list(dataset_id):
+        if image.name not in uploaded:
+            uploaded[image.name] = (image.id, False)
+    return uploaded
+
+
+def _read_item_meta(dataset_path: str, item_name: str) -> dict:
+    item_meta_path = os.path.join(dataset_path, "meta", item_name + g.ANN_EXT)
+    return json_backend.load_json_file(item_meta_path) if file_exists(item_meta_path) else {}
+
+
+def _upload_items(
+    api: sly.Api,
+    dataset,
+    dataset_path: str,
+    names: List[str],
+    img_paths: List[str],
+    ann_paths: List[str],
+    metas: List[dict],
+    progress_cb=None,
+) -> List:
+    """
+    Upload images and their annotations to the dataset by batches, every batch is recorded
+    to the journal (if enabled).
+
+    :return: Infos of the uploaded images.
+    :rtype: List[ImageInfo]
+    """
+    if g.dedup is not None:
+        upload_paths = functools.partial(g.dedup.upload_paths, api)
+    else:
+        upload_paths = api.image.upload_paths
+    uploaded_infos = []
+    for batch_start in range(0, len(names), g.UPLOAD_BATCH_SIZE):
+        batch = slice(batch_start, batch_start + g.UPLOAD_BATCH_SIZE)
+        sizeb = sum(os.path.getsize(path) for path in img_paths[batch])
+        with g.metrics.stage("upload_images", len(img_paths[batch]), sizeb, dataset=dataset_path):
+            img_infos = upload_paths(
+                dataset.id, names[batch], img_paths[batch], progress_cb, metas=metas[batch]
+            )
+        img_ids = [img_info.id for img_info in img_infos]
+        if g.journal is not None:
+            g.journal.add_images(dataset.id, names[batch], img_ids)
+        sizeb = sum(os.path.getsize(path) for path in ann_paths[batch])
+        with g.metrics.stage("upload_annotations", len(img_ids), sizeb, dataset=dataset_path):
+            api.annotation.upload_paths(img_ids, ann_paths[batch], progress_cb)
+        if g.journal is not None:
+            g.journal.finish_annotations(dataset.id, names[batch])
+        uploaded_infos.extend(img_infos)
+    return uploaded_infos
+
+
+def _hash_files(paths: List[str]) -> List[str]:
+    if g.dedup is not None:
+        return g.dedup.hash_files(paths)
+    with ThreadPoolExecutor(g.HASH_WORKERS) as pool:
+        return list(pool.map(get_file_hash_chunked, paths))
+
+
+def upload_dataset_changes(
+    api: sly.Api, dataset, dataset_fs: sly.Dataset, manifest: ImportManifest, progress_cb=None
+) -> int:
+    """
+    Upload only new and changed items of the checked dataset directory to the existing dataset
+    and update the manifest.
+
+    Images are compared with the images in the dataset on the server: an image is
+    re-uploaded if its size or hash differs. The replacement is uploaded under a temporary
+    name, the outdated image is removed only after that and the replacement is renamed, so a
+    failed upload keeps the outdated image. Annotations of the unchanged images are uploaded
+    only if their hashes differ from the manifest. Images missing in the input are kept in
+    the dataset.
+
+    :return: Number of images in the dataset directory.
+    :rtype: int
+    """
+    dataset_path = dataset_fs.directory
+    item_names = list(dataset_fs)
+    item_paths = [dataset_fs.get_item_paths(item_name) for item_name in item_names]
+    server_images = {image.name: image for image in api.image.get_list(dataset.id)}
+    # replacements left by the interrupted run (the images they replace were not removed or
+    # the replacements were not renamed) are removed, the changed images are uploaded again
+    input_names = set(item_names)
+    stale_ids = [
+        server_images.pop(name).id
+        for name in list(server_images)
+        if name.startswith(g.REPLACEMENT_PREFIX) and name not in input_names
+    ]
+    if len(stale_ids) > 0:
+        api.image.remove_batch(stale_ids)
+
+    # only images which may be unchanged are hashed, the size differs for most changed ones
+    sizes = [os.path.getsize(img_path) for img_path, _ in item_paths]
+    candidates = [
+        idx
+        for idx, (item_name, size) in enumerate(zip(item_names, sizes))
+        if item_name in server_images and server_images[item_name].size in (size, None)
+    ]
+    sizeb = sum(sizes[idx] for idx in candidates)
+    with g.metrics.stage("hashing", len(candidates), sizeb, dataset=dataset_path):
+        img_hashes = dict(zip(candidates, _hash_files([item_paths[idx][0] for idx in candidates])))
+        ann_hashes = _hash_files([ann_path for _, ann_path in item_paths])
+
+    new_items, changed_anns, outdated_ids = [], [], {}
+    for idx, item_name in enumerate(item_names):
+        image = server_images.get(item_name)
+        entry = manifest.get_item(dataset.name, item_name)
+        if entry is not None and (image is None or entry["image_id"] != image.id):
+            entry = None
+        image_hash = None
+        if image is not None:
+            image_hash = image.hash or (entry["hash"] if entry is not None else None)
+        if image is None or img_hashes.get(idx) is None or img_hashes[idx] != image_hash:
+            if image is not None:
+                outdated_ids[idx] = image.id
+            new_items.append(idx)
+        elif entry is None or entry["ann_hash"] != ann_hashes[idx]:
+            changed_anns.append(idx)
+
+    unchanged_cnt = len(item_names) - len(new_items) - len(changed_anns)
+    sly.logger.info(
+        f"Dataset '{dataset.name}': {len(new_items)} new or changed images "
+        f"({len(outdated_ids)} of them replace outdated ones), {len(changed_anns)} changed "
+        f"annotations, {unchanged_cnt} unchanged items are skipped."
+    )
+    missing_cnt = len(set(server_images) - input_names)
+    if missing_cnt > 0:
+        sly.logger.info(
+            f"Dataset '{dataset.name}': {missing_cnt} images are missing in the input, "
+            "they are kept in the dataset."
+        )
+    if progress_cb is not None:
+        progress_cb(unchanged_cnt * 2 + len(changed_anns))
+
+    if len(changed_anns) > 0:
+        ann_paths = [item_paths[idx][1] for idx in changed_anns]
+        sizeb = sum(os.path.getsize(path) for path in ann_paths)
+        with g.metrics.stage("upload_annotations", len(ann_paths), sizeb, dataset=dataset_path):
+            image_ids = [server_images[item_names[idx]].id for idx in changed_anns]
+            api.annotation.upload_paths(image_ids, ann_paths, progress_cb)
+        for idx in changed_anns:
+            image = server_images[item_names[idx]]
+            manifest.set_item(
+                dataset.name, image.name, image.id, sizes[idx], img_hashes[idx], ann_hashes[idx]
+            )
+    upload_names = [
+        g.REPLACEMENT_PREFIX + item_names[idx] if idx in outdated_ids else item_names[idx]
+        for idx in new_items
+    ]
+    img_infos = _upload_items(
+        api,
+        dataset,
+        dataset_path,
+        upload_names,
+        [item_paths[idx][0] for idx in new_items],
+        [item_paths[idx][1] for idx in new_items],
+        [_read_item_meta(dataset_path, item_names[idx]) for idx in new_items],
+        progress_cb,
+    )
+    if len(outdated_ids) > 0:
+        api.image.remove_batch(list(outdated_ids.values()))
+        img_infos = [
+            api.image.rename(img_info.id, item_names[idx]) if idx in outdated_ids else img_info
+            for idx, img_info in zip(new_items, img_infos)
+        ]
+    for idx, img_info in zip(new_items, img_infos):
+        image_hash = img_info.hash or img_hashes.get(idx)
+        manifest.set_item(
+            dataset.name, img_info.name, img_info.id, sizes[idx], image_hash, ann_hashes[idx]
+        )
+    return len(item_names)
+
+
+def upload_dataset(
+    api: sly.Api,
+    project_id: int,
+    dataset_path: str,
+    progress_cb=None,
+    manifest: ImportManifest = None,
+) -> int:
+    """
+    Upload single checked dataset directory to the existing project.
+    Images are uploaded by batches, every batch is recorded to the journal (if enabled),
+    already uploaded images are skipped.
+
+    :param manifest: Manifest of the incremental import, only new and changed items are
+        uploaded if it is given.
+    :type manifest: ImportManifest, optional
+    :return: Number of images in the dataset.
+    :rtype: int
+    """
+    dataset_fs = sly.Dataset(dataset_path, sly.OpenMode.READ)
+    dataset = get_or_create_dataset(api, project_id, dataset_fs.name)
+    if manifest is not None:
+        return upload_dataset_changes(api, dataset, dataset_fs, manifest, progress_cb)
+    uploaded = get_uploaded_images(api, dataset.id)
+    names, img_paths, ann_paths, metas = [], [], [], []
+    ann_only_names, ann_only_ids, ann_only_paths = [], [], []
+    for item_name in dataset_fs:
+        img_path, ann_path = dataset_fs.get_item_paths(item_name)
+        if item_name in uploaded:
+            image_id, ann_uploaded = uploaded[item_name]
+            if not ann_uploaded:
+                ann_only_names.append(item_name)
+                ann_only_ids.append(image_id)
+                ann_only_paths.append(ann_path)
+            continue
+        names.append(item_name)
+        img_paths.append(img_path)
+        ann_paths.append(ann_path)
+        metas.append(_read_item_meta(dataset_path, item_name))
+
+    if len(uploaded) > 0:
+        sly.logger.info(
+            f"Dataset '{dataset.name}': {len(uploaded)} images are already uploaded and skipped."
+        )
+        if progress_cb is not None:
+            progress_cb(len(uploaded) * 2 - len(ann_only_ids))
+    if len(ann_only_ids) > 0:
+        api.annotation.upload_paths(ann_only_ids, ann_only_paths, progress_cb)
+        if g.journal is not None:
+            g.journal.finish_annotations(dataset.id, ann_only_names)
+
+    _upload_items(api, dataset, dataset_path, names, img_paths, ann_paths, metas, progress_cb)
+
+    if g.journal is not None:
+        g.journal.finish_dataset(dataset.id)
+    return len(names) + len(uploaded)
+
+
+def upload_project(api: sly.Api, project_dir: str, project_name: str, progress_cb=None) -> int:
+    """
+    Upload project in Supervisely format dataset by dataset (journaled alternative
+    to sly.upload_project).
+
+    :return: Project ID.
+    :rtype: int
+    """
+    project_fs = sly.Project(project_dir, sly.OpenMode.READ)
+    project_key = get_project_key(project_dir)
+    project = create_project(api, project_name, project_fs.meta, project_key)
+    manifest = None
+    if g.TARGET_PROJECT_ID is not None:
+        manifest = ImportManifest.load(api, g.TEAM_ID, project.id, g.MANIFEST_PATH)
+    for dataset_fs in project_fs.datasets:
+        upload_dataset(api, project.id, dataset_fs.directory, progress_cb, manifest)
+        if manifest is not None:
+            # the local copy is kept up to date, it is uploaded when the project is imported
+            manifest.save(g.MANIFEST_PATH)
+    if manifest is not None:
+        manifest.upload(api, g.TEAM_ID, g.MANIFEST_PATH)
+    if g.journal is not None:
+        g.journal.finish_project(project_key)
+    return project.id
+
+
+def _init_check_worker(context: dict) -> None:
+    global _worker_check_context
+    _worker_check_context = context
+
+
+def _check_items_worker_shard(img_names):
+    return _check_items_shard(img_names, _worker_check_context)
+
+
+def _check_items_shard(img_names, context: dict):
+    """
+    Validate annotations for the given shard of image names.
+
+    Runs either in the calling thread or in a forked worker of the validation pool. Dataset-wide
+    arguments are prepared by :func:`check_items`: they are passed explicitly in the calling
+    thread (several projects may be validated in parallel threads) and are inherited by the
+    forked workers through the pool initializer, so only image names and results are passed
+    between processes.
+
+    :param img_names: Image names to validate.
+    :type img_names: List[str]
+    :param context: Dataset-wide arguments.
+    :type context: dict
+    :return: Items count, resulting annotation names and summary of the errors. The failed
+        items are written to g.validation_failures.
+    :rtype: Tuple[int, List[str], ValidationSummary]
+    """
+    imgs_dir = context["imgs_dir"]
+    ann_dir = context["ann_dir"]
+    meta = context["meta"]
+    raw_ann_names = context["raw_ann_names"]
+    img_sizes = context["img_sizes"]
+    ann_filter = context["ann_filter"]
+
     items_cnt = 0
-    failed_ann_names = defaultdict(list)
-    error_to_trace = defaultdict(str)
-    img_names = [name for name in os.listdir(imgs_dir) if sly.image.has_valid_ext(name)]
-    raw_ann_names = [name for name in os.listdir(ann_dir) if get_file_ext(name) == g.ANN_EXT]
+    summary = ValidationSummary(g.VALIDATION_LOG_SAMPLES)
+    failures = []
     res_ann_names = []
     for img_name in img_names:
         try:
             ann_name = get_effective_ann_name(img_name, raw_ann_names)
             try:
-                need_to_filter = False
                 if ann_name is None:
                     raise Exception("Annotation file not found")
                 ann_path = os.path.join(ann_dir, ann_name)
-                with open(ann_path) as ann_file:
-                    data = json.load(ann_file)
-                    if not isinstance(data[AnnotationJsonFields.LABELS], list):
-                        raise Exception("'objects' field must have a list type (list of dicts)")
-                    if not isinstance(data[AnnotationJsonFields.IMG_TAGS], list):
-                        raise Exception("'tags' field must have a list type (list of dicts)")
-                    for field in g.REQUIRED_FIELDS:
-                        if field not in data:
-                            raise Exception(f"No '{field}' field in annotation file")
-                        objs_list = data.get(AnnotationJsonFields.LABELS)
-                        objs_list_type = type(objs_list)
-                    if objs_list_type is None:
-                        raise Exception("No 'objects' field in annotation file")
-                    if objs_list_type is not list:
-                        raise Exception(f"'objects' field must be a list, not a {objs_list_type}")
-                    for label_json in objs_list:
-                        if label_json.get(LabelJsonFields.OBJ_CLASS_NAME) in remove_classes:
-                            need_to_filter = True
-                        sly.Label.from_json(label_json, meta)
-                if need_to_filter:
-                    ann = sly.Annotation.load_json_file(ann_path, meta)
-                    ann = ann.filter_labels_by_classes(keep_classes)
-                    sly.json.dump_json_file(ann.to_json(), ann_path)
+                # the file is parsed once, the decoded dict is validated and filtered in place
+                data = json_backend.load_json_file(ann_path)
+                if not isinstance(data[AnnotationJsonFields.LABELS], list):
+                    raise Exception("'objects' field must have a list type (list of dicts)")
+                if not isinstance(data[AnnotationJsonFields.IMG_TAGS], list):
+                    raise Exception("'tags' field must have a list type (list of dicts)")
+                for field in g.REQUIRED_FIELDS:
+                    if field not in data:
+                        raise Exception(f"No '{field}' field in annotation file")
+                    objs_list = data.get(AnnotationJsonFields.LABELS)
+                    objs_list_type = type(objs_list)
+                if objs_list_type is None:
+                    raise Exception("No 'objects' field in annotation file")
+                if objs_list_type is not list:
+                    raise Exception(f"'objects' field must be a list, not a {objs_list_type}")
+                geometries = None
+                if g.GEOMETRY_VALIDATION:
+                    geometries = label_validation.GeometryBatch(data[AnnotationJsonFields.IMG_SIZE])
+                for label_json in objs_list:
+                    if not ann_filter.is_removed(label_json):
+                        label_validation.validate_label(
+                            label_json, meta, g.DEEP_VALIDATION, geometries
+                        )
+                changed = False
+                if geometries is not None and len(geometries) > 0:
+                    invalid = geometries.find_invalid()
+                    if len(invalid) > 0:
+                        invalid_ids = {id(label_json) for label_json in invalid}
+                        data[AnnotationJsonFields.LABELS] = [
+                            label_json
+                            for label_json in objs_list
+                            if id(label_json) not in invalid_ids
+                        ]
+                        summary.add_invalid_geometries(
+                            (label_json[LabelJsonFields.OBJ_CLASS_NAME] for label_json in invalid),
+                            ann_name,
+                        )
+                        changed = True
+                if ann_filter.apply(data) or changed:
+                    json_backend.dump_json_file(data, ann_path, atomic=True)
             except Exception as e:
-                ann_name = create_empty_ann(imgs_dir, img_name, ann_dir)
-                failed_ann_names[e.args[0]].append(ann_name)
-                error_to_trace[e.args[0]] = traceback.format_exc()
+                ann_name = create_empty_ann(imgs_dir, img_name, ann_dir, img_sizes.get(img_name))
+                message = str(e.args[0]) if len(e.args) > 0 else repr(e)
+                # the traceback is formatted once per error message
+                trace = traceback.format_exc() if message not in summary.errors else ""
+                summary.add(message, ann_name, trace)
+                failures.append((ann_name, message))
             items_cnt += 1
             res_ann_names.append(ann_name)
         except Exception as e:
@@ -410,23 +1226,106 @@ def check_items(imgs_dir, ann_dir, meta, keep_classes, remove_classes):
                 f"Failed to process annotation for '{img_name}': {repr(e)}. Skipping.",
                 exc_info=True,
             )
+    g.validation_failures.write(os.path.dirname(os.path.normpath(imgs_dir)), failures)
+    return items_cnt, res_ann_names, summary
 
-    if len(failed_ann_names) > 0:
-        sly.logger.warn(f"Incorrect Supervisely JSON annotations format:")
-        for error, ann_names in failed_ann_names.items():
-            sly.logger.warn(
-                f" - following errors occurred for {len(ann_names)} items: {ann_names}. "
-            )
-            sly.logger.warn(error_to_trace[error])
-        sly.logger.info("These items will be skipped.")
 
-    unwanted_ann_names = list(set(raw_ann_names) - set(res_ann_names))
+def _split_to_shards(names: List[str], workers: int) -> List[List[str]]:
+    # several shards per worker to keep the pool busy when some annotations are heavier
+    shard_size = max(-(-len(names) // (workers * 4)), g.MIN_VALIDATION_SHARD_SIZE)
+    # shards and their results are kept small on huge datasets
+    shard_size = min(shard_size, g.MAX_VALIDATION_SHARD_SIZE)
+    return [names[i : i + shard_size] for i in range(0, len(names), shard_size)]
+
+
+def check_items(
+    imgs_dir,
+    ann_dir,
+    meta,
+    ann_filter: AnnotationFilter,
+    workers: int = None,
+    index: DirIndex = None,
+):
+    if workers is None:
+        workers = g.VALIDATION_WORKERS
+    if index is None:
+        index = DirIndex(os.path.dirname(os.path.normpath(imgs_dir)))
+    img_names = [name for name in index.files(imgs_dir) if sly.image.has_valid_ext(name)]
+    raw_ann_names = {name for name in index.files(ann_dir) if get_file_ext(name) == g.ANN_EXT}
+
+    # sizes of images without annotations are read in parallel before validation,
+    # empty annotations are created for them
+    no_ann_names = [
+        name for name in img_names if get_effective_ann_name(name, raw_ann_names) is None
+    ]
+    dataset_path = os.path.dirname(os.path.normpath(imgs_dir))
+    with g.metrics.stage("create_empty_ann", len(no_ann_names), dataset=dataset_path):
+        sizes = image_size.read_image_sizes(
+            [os.path.join(imgs_dir, name) for name in no_ann_names], g.IMAGE_SIZE_WORKERS
+        )
+
+    context = {
+        "imgs_dir": imgs_dir,
+        "ann_dir": ann_dir,
+        "meta": meta,
+        "raw_ann_names": raw_ann_names,
+        "ann_filter": ann_filter,
+        "img_sizes": {name: size for name, size in zip(no_ann_names, sizes) if size is not None},
+    }
+    anns_sizeb = sum(index.file_size(os.path.join(ann_dir, name)) for name in raw_ann_names)
+    items_cnt = 0
+    res_ann_names = set()
+    summary = ValidationSummary(g.VALIDATION_LOG_SAMPLES)
+
+    def _merge(result):
+        nonlocal items_cnt
+        shard_items_cnt, shard_ann_names, shard_summary = result
+        items_cnt += shard_items_cnt
+        res_ann_names.update(shard_ann_names)
+        summary.merge(shard_summary)
+
+    with g.metrics.stage("validation", len(img_names), anns_sizeb, dataset=dataset_path):
+        shards = _split_to_shards(img_names, workers)
+        if workers > 1 and len(shards) > 1:
+            # workers are forked, initializer arguments are inherited without pickling the meta
+            mp_context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(
+                min(workers, len(shards)),
+                mp_context=mp_context,
+                initializer=_init_check_worker,
+                initargs=(context,),
+            ) as pool:
+                # results are merged as they come, not collected for the whole dataset
+                for result in pool.map(_check_items_worker_shard, shards):
+                    _merge(result)
+        else:
+            for shard in shards:
+                _merge(_check_items_shard(shard, context))
+
+    summary.log(g.validation_failures.path if len(summary) > 0 else None)
+    if g.dedup is not None:
+        # hashes are cached for the upload, in the streaming import it overlaps with uploading
+        img_paths = [os.path.join(imgs_dir, name) for name in img_names]
+        sizeb = sum(index.file_size(path) for path in img_paths)
+        with g.metrics.stage("hashing", len(img_names), sizeb, dataset=dataset_path):
+            g.dedup.hash_files(img_paths)
+
+    unwanted_ann_names = sorted(raw_ann_names - res_ann_names)
     if len(unwanted_ann_names) > 0:
+        samples = unwanted_ann_names[: g.VALIDATION_LOG_SAMPLES]
+        more = len(unwanted_ann_names) - len(samples)
         sly.logger.warn(
             f"Found {len(unwanted_ann_names)} annotation files without corresponding images: "
-            f"{unwanted_ann_names}. Skipping."
+            f"{samples}{f' and {more} more' if more > 0 else ''}. Skipping."
+        )
+        g.validation_failures.write(
+            dataset_path,
+            ((name, "Annotation file without corresponding image") for name in unwanted_ann_names),
         )
         for name in unwanted_ann_names:
             sly.fs.silent_remove(os.path.join(ann_dir, name))
+            index.discard(os.path.join(ann_dir, name))
+    for name in res_ann_names - raw_ann_names:
+        index.add_file(os.path.join(ann_dir, name))
 
     return items_cnt
@@ -4,6 +4,12 @@ import supervisely as sly
 from dotenv import load_dotenv
 from supervisely.annotation.annotation import AnnotationJsonFields
 
+import downloads
+import json_backend
+from dedup import ImageDeduplicator
+from journal import UploadJournal
+from metrics import ImportMetrics
+from validation_report import FailuresFile
 from workflow import Workflow
 
 if sly.is_development():
@@ -25,12 +31,71 @@ INPUT_DIR = sly.env.folder(raise_not_found=False)
 INPUT_FILE = sly.env.file(raise_not_found=False)
 EXTERNAL_LINK: str = os.environ.get("modal.state.slyArchiveUrl", None)
 PROJECT_NAME: str = os.environ.get("modal.state.slyProjectName", None)
+RESUME_IMPORT: bool = os.environ.get("modal.state.resumeImport", "false").lower() == "true"
+# import into the existing project uploading only new and changed items (incremental import)
+TARGET_PROJECT_ID: int = os.environ.get("modal.state.targetProjectId", None)
+TARGET_PROJECT_ID = int(TARGET_PROJECT_ID) if TARGET_PROJECT_ID else None
+ARCHIVE_HASH: str = os.environ.get("modal.state.slyArchiveHash", None)
+# download only the files needed for the import instead of the whole input directory
+SELECTIVE_DOWNLOAD: bool = (
+    os.environ.get("modal.state.selectiveDownload", "false").lower() == "true"
+)
+DOWNLOAD_WORKERS: int = max(int(os.environ.get("modal.state.downloadWorkers", 8)), 1)
+DOWNLOAD_CONNECTIONS: int = int(os.environ.get("modal.state.downloadConnections", 1))
+STREAMING_IMPORT: bool = os.environ.get("modal.state.streamingImport", "false").lower() == "true"
+STREAMING_QUEUE_SIZE: int = int(os.environ.get("modal.state.streamingQueueSize", 2))
+# read the agent directory mounted to the app in place instead of downloading it
+IN_PLACE_IMPORT: bool = os.environ.get("modal.state.inPlaceImport", "false").lower() == "true"
+STREAM_ARCHIVES: bool = os.environ.get("modal.state.streamArchives", "false").lower() == "true"
+UNPACK_WORKERS: int = max(int(os.environ.get("modal.state.unpackWorkers", os.cpu_count() or 1)), 1)
+VALIDATION_WORKERS: int = max(
+    int(os.environ.get("modal.state.validationWorkers", os.cpu_count() or 1)), 1
+)
+UPLOAD_WORKERS: int = max(int(os.environ.get("modal.state.uploadWorkers", 4)), 1)
+PROJECT_WORKERS: int = max(int(os.environ.get("modal.state.projectWorkers", 1)), 1)
+# send API requests over the pool of keep-alive connections of this size, 0 disables the pool
+HTTP_CONNECTIONS: int = int(os.environ.get("modal.state.httpConnections", 0))
+# limit of API requests in flight shared by the concurrent imports of projects
+MAX_REQUESTS_IN_FLIGHT: int = int(os.environ.get("modal.state.maxRequestsInFlight", 16))
+MAX_BYTES_IN_FLIGHT: int = int(os.environ.get("modal.state.maxMbInFlight", 2048)) * 1024 * 1024
+DEDUP_IMAGES: bool = os.environ.get("modal.state.dedupImages", "false").lower() == "true"
+# validate projects before upload instead of trying sly.Project.upload first
+PREFLIGHT_VALIDATION: bool = (
+    os.environ.get("modal.state.preflightValidation", "false").lower() == "true"
+)
+# labels of these classes and these tags are removed from annotations and project meta
+EXCLUDE_CLASSES: list = [
+    name.strip() for name in os.environ.get("modal.state.excludeClasses", "").split(",")
+]
+EXCLUDE_CLASSES = [name for name in EXCLUDE_CLASSES if name != ""]
+EXCLUDE_TAGS: list = [
+    name.strip() for name in os.environ.get("modal.state.excludeTags", "").split(",")
+]
+EXCLUDE_TAGS = [name for name in EXCLUDE_TAGS if name != ""]
+# construct every label with sly.Label.from_json instead of the structural check
+DEEP_VALIDATION: bool = os.environ.get("modal.state.deepValidation", "false").lower() == "true"
+# decode bitmaps and check geometries against the image size in batches,
+# labels with invalid geometries are removed from annotations
+GEOMETRY_VALIDATION: bool = (
+    os.environ.get("modal.state.geometryValidation", "false").lower() == "true"
+)
+# upload the import metrics report to Team Files and set it as the task output
+UPLOAD_METRICS: bool = os.environ.get("modal.state.uploadMetrics", "false").lower() == "true"
+JSON_BACKEND: str = json_backend.set_backend(os.environ.get("modal.state.jsonBackend", None))
+if TARGET_PROJECT_ID is not None and STREAMING_IMPORT:
+    sly.logger.warn("Streaming import is not supported by the incremental import, disabling it.")
+    STREAMING_IMPORT = False
 if EXTERNAL_LINK is not None:
     if not (EXTERNAL_LINK.startswith("https://") or EXTERNAL_LINK.startswith("http://")):
         raise ValueError("The link must start with 'https://' or 'http://'")
+    if ARCHIVE_HASH:
+        # the hash is checked after the download, a malformed one fails before it starts
+        downloads.parse_expected_hash(ARCHIVE_HASH)
 
 
 sly.logger.debug(f"INPUT_DIR: {INPUT_DIR}, INPUT_FILE: {INPUT_FILE}, EXTERNAL_LINK={EXTERNAL_LINK}")
+# identifies the input in the upload journal, INPUT_DIR and INPUT_FILE are normalized later
+INPUT_SOURCE: str = INPUT_DIR or INPUT_FILE or EXTERNAL_LINK
 
 IS_ON_AGENT = False
 if INPUT_DIR:
@@ -38,8 +103,37 @@ if INPUT_DIR:
 elif INPUT_FILE:
     IS_ON_AGENT = api.file.is_on_agent(INPUT_FILE)
 
+# cached listings of Team Files, created when the input path is resolved
+input_listing = None
+
 STORAGE_DIR: str = my_app.data_dir
-sly.fs.mkdir(STORAGE_DIR, True)
+# archives downloaded from links are kept when the task is restarted, so an interrupted
+# download continues from the saved offsets (see downloads.download_resumable)
+DOWNLOADS_DIR: str = os.path.join(STORAGE_DIR, "downloads")
+# keep the journal and partially downloaded data of the interrupted run when resuming
+sly.fs.mkdir(STORAGE_DIR)
+if not RESUME_IMPORT:
+    for entry in os.scandir(STORAGE_DIR):
+        if entry.path == DOWNLOADS_DIR:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            sly.fs.remove_dir(entry.path)
+        else:
+            sly.fs.silent_remove(entry.path)
+sly.fs.mkdir(DOWNLOADS_DIR)
+
+journal = None
+if RESUME_IMPORT:
+    journal = UploadJournal(os.path.join(STORAGE_DIR, "upload_journal.sqlite3"))
+
+HASH_WORKERS = 8
+dedup = ImageDeduplicator(HASH_WORKERS) if DEDUP_IMAGES else None
+
+metrics = ImportMetrics()
+METRICS_PATH = os.path.join(STORAGE_DIR, "import_metrics.json")
+MANIFEST_PATH = os.path.join(STORAGE_DIR, "import_manifest.json")
+# every failed item is written to the file, only a few samples are logged
+validation_failures = FailuresFile(os.path.join(STORAGE_DIR, "validation_failures.jsonl"))
 
 ANN_EXT = ".json"
 REQUIRED_FIELDS = [
@@ -47,3 +141,13 @@ REQUIRED_FIELDS = [
     AnnotationJsonFields.IMG_SIZE,
     AnnotationJsonFields.IMG_TAGS,
 ]
+MIN_VALIDATION_SHARD_SIZE = 256
+MAX_VALIDATION_SHARD_SIZE = 10000
+VALIDATION_LOG_SAMPLES = 20
+UPLOAD_BATCH_SIZE = 500
+UPLOAD_RETRIES = 3
+# name prefix of the images uploaded by the incremental import to replace the outdated ones
+REPLACEMENT_PREFIX = "__replacement__"
+IMAGE_SIZE_WORKERS = 8
+# minimal part of the input directory size skipped by the selective download
+SELECTIVE_DOWNLOAD_MIN_SKIPPED = 0.1
@@ -0,0 +1,209 @@
+import os
+from collections import defaultdict
+from os.path import basename, dirname, normpath
+from typing import Dict, Iterable, List, Tuple
+
+import supervisely as sly
+
+import json_backend
+import sly_functions as f
+import sly_globals as g
+from fs_index import DirIndex
+from pipeline import Pipeline
+
+
+def list_remote_projects(api: sly.Api) -> Dict[str, List[str]]:
+    """
+    Find projects in Supervisely format in the input Team Files directory without downloading.
+
+    :param api: Supervisely API object.
+    :type api: sly.Api
+    :return: Remote project directories mapped to the names of their dataset directories
+        (every subdirectory with files).
+    :rtype: Dict[str, List[str]]
+    """
+    if g.IS_ON_AGENT or g.INPUT_DIR is None:
+        return {}
+    if g.input_listing is not None:
+        paths = g.input_listing.file_paths(g.INPUT_DIR)
+    else:
+        paths = api.file.listdir(g.TEAM_ID, g.INPUT_DIR, recursive=True)
+    project_dirs = {dirname(path) for path in paths if basename(path) == "meta.json"}
+    projects = defaultdict(set)
+    for path in paths:
+        # the file belongs to the dataset directory right under the nearest project directory,
+        # datasets without img/ are kept: they are uploaded as images only
+        child, parent = dirname(path), dirname(dirname(path))
+        while child != parent and child not in project_dirs:
+            if parent in project_dirs:
+                projects[parent].add(basename(child))
+                break
+            child, parent = parent, dirname(parent)
+    return {project_dir: sorted(datasets) for project_dir, datasets in projects.items()}
+
+
+def download_datasets(
+    api: sly.Api, remote_project_dir: str, datasets: List[str], project_dir: str
+) -> Iterable[str]:
+    """Download datasets of the remote project one by one and yield their local paths."""
+    for dataset in datasets:
+        remote_path = os.path.join(remote_project_dir, dataset, "")
+        dataset_path = os.path.join(project_dir, dataset)
+        sly.logger.info(f"Downloading dataset {remote_path.strip('/')}")
+        with g.metrics.stage("download", dataset=dataset_path) as stage:
+            api.file.download_directory(g.TEAM_ID, remote_path, dataset_path)
+            stage["bytes"] = sly.fs.get_directory_size(dataset_path)
+        sly.fs.remove_junk_from_dir(dataset_path)
+        yield dataset_path
+
+
+def import_project(
+    api: sly.Api,
+    task_id: int,
+    project_dir: str,
+    project_name: str,
+    datasets: Iterable[str],
+    index: DirIndex = None,
+) -> Tuple[bool, bool]:
+    """
+    Validate and upload datasets of the project as soon as they appear locally.
+
+    Datasets are passed through the pipeline: validation of the next dataset overlaps with
+    uploading of the previous one, and the source (e.g. download) blocks while
+    g.STREAMING_QUEUE_SIZE datasets are waiting, so only a few datasets are kept on disk.
+    Uploaded datasets are removed from the disk. Datasets are validated in the pipeline thread
+    without the pool of forked workers: forking while the upload stage has requests in flight
+    is not safe.
+
+    :param project_dir: Local project directory with meta.json.
+    :type project_dir: str
+    :param project_name: Name of the project to create.
+    :type project_name: str
+    :param datasets: Local dataset directories, may be produced lazily.
+    :type datasets: Iterable[str]
+    :param index: Index of the local project tree, every dataset is scanned separately
+        when it is not given (e.g. datasets are downloaded one by one).
+    :type index: DirIndex, optional
+    :return: Flags whether the project with annotations and the project without
+        annotations (from invalid datasets) were created.
+    :rtype: Tuple[bool, bool]
+    """
+    meta_path = os.path.join(project_dir, "meta.json")
+    meta = sly.ProjectMeta.from_json(json_backend.load_json_file(meta_path))
+    ann_filter = f.get_annotation_filter(meta)
+    if not ann_filter.is_empty():
+        sly.logger.info(
+            f"Meta was updated. Removed classes: {ann_filter.remove_classes}, "
+            f"tags: {ann_filter.remove_tags}."
+        )
+    upload_meta = ann_filter.filter_meta(meta)
+
+    invalid_datasets = []
+    project = None
+    project_key = f.get_project_key(project_dir)
+
+    def _validate(dataset_path):
+        ds_items_cnt = f.check_dataset(dataset_path, meta, ann_filter, index, workers=1)
+        if ds_items_cnt is None:
+            return None
+        if ds_items_cnt == 0:
+            invalid_datasets.append(dataset_path)
+            return None
+        return dataset_path, ds_items_cnt
+
+    def _upload(item):
+        nonlocal project
+        dataset_path, ds_items_cnt = item
+        if project is None:
+            project = f.create_project(api, project_name, upload_meta, project_key)
+            sly.logger.info(f"Start uploading project '{project.name}'...")
+        progress_cb = f.get_progress_cb(
+            api,
+            task_id,
+            f"Uploading dataset: {basename(normpath(dataset_path))}",
+            ds_items_cnt * 2,
+        )
+        uploaded_cnt = f.upload_dataset(api, project.id, dataset_path, progress_cb)
+        sly.fs.remove_dir(dataset_path)
+        if index is not None:
+            index.discard(dataset_path)
+        return uploaded_cnt
+
+    pipeline = Pipeline(queue_size=g.STREAMING_QUEUE_SIZE)
+    pipeline.add_stage("validation", _validate).add_stage("upload", _upload)
+    uploaded_cnt = sum(pipeline.run(datasets))
+
+    if project is not None:
+        if uploaded_cnt == 0:
+            api.project.remove(project.id)
+            project = None
+        else:
+            if g.journal is not None:
+                g.journal.finish_project(project_key)
+            sly.logger.info(f"Project '{project.name}' uploaded successfully.")
+            # -------------------------------------- Add Workflow Output ------------------------------------- #
+            g.workflow.add_output(project.id)
+            sly.logger.debug(f"Workflow Output: Successful project - {project.id}.")
+            # ----------------------------------------------- - ---------------------------------------------- #
+
+    project_without_ann = None
+    if len(invalid_datasets) > 0:
+        sly.logger.warn(
+            f"Incorrect Supervisely format datasets: {invalid_datasets}. \n"
+            f"Trying to upload only images."
+        )
+        project_without_ann = f.upload_only_images(
+            api, invalid_datasets, recursively=True, index=index
+        )
+        if project_without_ann is not None:
+            # -------------------------------------- Add Workflow Output ------------------------------------- #
+            g.workflow.add_output(project_without_ann.id)
+            sly.logger.debug(
+                f"Workflow Output: Project without annotations - {project_without_ann.id}."
+            )
+            # ----------------------------------------------- - ---------------------------------------------- #
+
+    return project is not None, project_without_ann is not None
+
+
+def import_remote_projects(api: sly.Api, task_id: int, save_path: str) -> List[Tuple[bool, bool]]:
+    """
+    Import projects from the input Team Files directory downloading them dataset by dataset.
+
+    :return: Import results for every found project (see :func:`import_project`),
+        empty list if the input can not be streamed and must be downloaded entirely.
+    :rtype: List[Tuple[bool, bool]]
+    """
+    remote_projects = list_remote_projects(api)
+    if len(remote_projects) == 0:
+        return []
+    sly.logger.info(
+        f"Found {len(remote_projects)} project directories in the given directory. "
+        f"Paths to the projects: {list(remote_projects)}."
+    )
+    results = []
+    for remote_project_dir, datasets in remote_projects.items():
+        dir_name = basename(normpath(remote_project_dir))
+        project_name = dir_name if g.PROJECT_NAME is None else g.PROJECT_NAME
+        project_dir = os.path.join(save_path, dir_name)
+        sly.fs.mkdir(project_dir)
+        api.file.download(
+            g.TEAM_ID,
+            os.path.join(remote_project_dir, "meta.json"),
+            os.path.join(project_dir, "meta.json"),
+        )
+        sly.logger.info(f"Working with directory '{remote_project_dir}'.")
+        if g.journal is not None:
+            project_id = g.journal.get_project(f.get_project_key(project_dir))
+            if project_id is not None:
+                finished = set(g.journal.get_finished_datasets(project_id))
+                datasets = [dataset for dataset in datasets if dataset not in finished]
+                sly.logger.info(f"Skipping already uploaded datasets: {sorted(finished)}.")
+        try:
+            datasets_source = download_datasets(api, remote_project_dir, datasets, project_dir)
+            results.append(import_project(api, task_id, project_dir, project_name, datasets_source))
+        except Exception as e:
+            sly.logger.warn(f"Project '{project_name}' uploading failed: {repr(e)}.")
+            results.append((False, False))
+        sly.fs.remove_dir(project_dir)
+    return results
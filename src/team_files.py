@@ -0,0 +1,92 @@
+from collections import defaultdict
+from os.path import dirname, normpath
+from typing import Dict, List, Set
+
+import supervisely as sly
+
+
+def _dir_path(path: str) -> str:
+    path = normpath(path)
+    return path if path.endswith("/") else path + "/"
+
+
+class TeamFilesListing:
+    """
+    Cache of Team Files listings for the time of one import.
+
+    Directories listed with :meth:`prefetch` are listed recursively with a single request,
+    then :meth:`listdir`, :meth:`dir_exists`, :meth:`get_directory_size` and
+    :meth:`file_paths` are answered locally for them and their subdirectories. Other
+    directories are requested once and cached. Empty directories are not visible in
+    recursive listings, they are treated as missing (as api.file.dir_exists does).
+
+    :param api: Supervisely API object.
+    :type api: sly.Api
+    :param team_id: Team ID.
+    :type team_id: int
+    """
+
+    def __init__(self, api: sly.Api, team_id: int):
+        self._api = api
+        self._team_id = team_id
+        self._roots: List[str] = []
+        self._files: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._subdirs: Dict[str, Set[str]] = defaultdict(set)
+        self._listdir_cache: Dict[str, List[str]] = {}
+        self._dir_exists_cache: Dict[str, bool] = {}
+
+    def _is_listed(self, dir_path: str) -> bool:
+        return any(dir_path.startswith(root) for root in self._roots)
+
+    def prefetch(self, path: str) -> None:
+        """List the directory recursively, unless it is already listed."""
+        root = _dir_path(path)
+        if self._is_listed(root):
+            return
+        for info in self._api.file.list(self._team_id, root, recursive=True):
+            file_path = info["path"]
+            parent = _dir_path(dirname(file_path))
+            self._files[parent][file_path] = (info.get("meta") or {}).get("size") or 0
+            # register the parent directories up to the listed root
+            while parent != root and parent.startswith(root):
+                grandparent = _dir_path(dirname(normpath(parent)))
+                if parent in self._subdirs[grandparent]:
+                    break
+                self._subdirs[grandparent].add(parent)
+                parent = grandparent
+        self._roots.append(root)
+
+    def listdir(self, path: str) -> List[str]:
+        """Paths of files and subdirectories of the directory."""
+        dir_path = _dir_path(path)
+        if self._is_listed(dir_path):
+            return sorted(self._files.get(dir_path, {})) + sorted(self._subdirs.get(dir_path, ()))
+        if dir_path not in self._listdir_cache:
+            self._listdir_cache[dir_path] = self._api.file.listdir(self._team_id, dir_path)
+        return list(self._listdir_cache[dir_path])
+
+    def dir_exists(self, path: str) -> bool:
+        dir_path = _dir_path(path)
+        if self._is_listed(dir_path):
+            return dir_path in self._files or dir_path in self._subdirs
+        if dir_path not in self._dir_exists_cache:
+            self._dir_exists_cache[dir_path] = self._api.file.dir_exists(self._team_id, dir_path)
+        return self._dir_exists_cache[dir_path]
+
+    def files(self, path: str) -> Dict[str, int]:
+        """Sizes of all files in the directory and its subdirectories by their paths."""
+        dir_path = _dir_path(path)
+        self.prefetch(dir_path)
+        return {
+            file_path: size
+            for parent, files in self._files.items()
+            if parent.startswith(dir_path)
+            for file_path, size in files.items()
+        }
+
+    def file_paths(self, path: str) -> List[str]:
+        """Paths of all files in the directory and its subdirectories."""
+        return sorted(self.files(path))
+
+    def get_directory_size(self, path: str) -> int:
+        return sum(self.files(path).values())
@@ -0,0 +1,175 @@
+import os
+import random
+import threading
+from typing import Dict, Optional
+
+import requests
+import supervisely as sly
+from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
+from supervisely.io.network_exceptions import (
+    process_requests_exception,
+    process_unhandled_request,
+)
+
+MAX_BACKOFF_SEC = 60
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """
+    Create session with the pool of keep-alive connections for every host. Connections
+    opened above the pool size (e.g. while streamed responses are not read to the end)
+    are closed after the request instead of blocking it.
+
+    :param pool_size: Maximum number of connections to one host.
+    :type pool_size: int
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def backoff_delay(retry_idx: int, base_sec: float, max_sec: float = MAX_BACKOFF_SEC) -> float:
+    """
+    Exponential backoff with jitter: a random delay between the half and the full exponential
+    delay, so the clients that failed at the same moment do not retry at the same moment.
+    """
+    delay = min(base_sec * (2**retry_idx), max_sec)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class PooledTransport:
+    """
+    Transport of the API requests over the pooled keep-alive connections.
+
+    sly.Api sends every request with a module-level requests.post / requests.get call, so
+    every call opens a new connection (TCP and TLS handshakes cost several round trips).
+    The transport replaces api.post and api.get of the given object with the same logic
+    running on a shared session: the connections are reused by all threads, the number of
+    requests in flight is bounded (by the pool size by default) and the retries are spread
+    with jittered exponential backoff. Requests, responses, errors, warnings and retry conditions are the
+    same as in sly.Api.post and sly.Api.get (checked by tests/test_transport.py), install it
+    once per API object.
+
+    :param api: Supervisely API object.
+    :type api: sly.Api
+    :param max_connections: Maximum number of keep-alive connections.
+    :type max_connections: int
+    :param max_requests: Maximum number of requests in flight, max_connections by default.
+    :type max_requests: int, optional
+    """
+
+    def __init__(self, api: sly.Api, max_connections: int, max_requests: Optional[int] = None):
+        self._api = api
+        self.session = create_session(max_connections)
+        if max_requests is None:
+            max_requests = max_connections
+        self._semaphore = threading.BoundedSemaphore(max(max_requests, 1))
+
+    def install(self) -> sly.Api:
+        """Send the requests of the API object through the transport."""
+        self._api.post = self.post
+        self._api.get = self.get
+        return self._api
+
+    def _request(
+        self,
+        http_method: str,
+        api_method: str,
+        url: str,
+        retries: Optional[int],
+        raise_error: bool = False,
+        **kwargs,
+    ) -> requests.Response:
+        api = self._api
+        if not api._skip_https_redirect_check:
+            api._check_https_redirect()
+        if retries is None:
+            retries = api.retry_count
+        sly.logger.trace(f"{http_method} {url}")
+        retry_offset = 2 if http_method == "GET" else 1
+
+        for retry_idx in range(retries):
+            response = None
+            try:
+                with self._semaphore:
+                    response = self.session.request(http_method, url, **kwargs)
+                if response.status_code != requests.codes.ok:  # pylint: disable=no-member
+                    # sly.Api checks the instance version on the failed POST requests only
+                    if http_method == "POST":
+                        api._check_version()
+                    sly.Api._raise_for_status(response)
+                return response
+            except requests.RequestException as exc:
+                if (
+                    isinstance(exc, requests.exceptions.HTTPError)
+                    and response.status_code == 400
+                    and api.token is None
+                ):
+                    api.logger.warning(
+                        "API_TOKEN env variable is undefined. See more: "
+                        "https://developer.supervisely.com/getting-started/basics-of-authentication"
+                    )
+                if raise_error:
+                    raise exc
+                process_requests_exception(
+                    api.logger,
+                    exc,
+                    api_method,
+                    url,
+                    verbose=True,
+                    swallow_exc=True,
+                    sleep_sec=backoff_delay(retry_idx, api.retry_sleep_sec),
+                    response=response,
+                    # sly.Api.get logs the retries starting from 2
+                    retry_info={"retry_idx": retry_idx + retry_offset, "retry_limit": retries},
+                )
+            except Exception as exc:
+                process_unhandled_request(api.logger, exc)
+        if http_method == "GET":
+            # sly.Api.get returns None when the retries are exhausted
+            return None
+        raise requests.exceptions.RetryError(f"Retry limit exceeded ({url!r})")
+
+    def post(
+        self,
+        method: str,
+        data: Dict,
+        retries: Optional[int] = None,
+        stream: Optional[bool] = False,
+        raise_error: Optional[bool] = False,
+    ) -> requests.Response:
+        """Performs POST request to server with given parameters, the same as sly.Api.post."""
+        api = self._api
+        url = api.api_server_address + "/v3/" + method
+        if type(data) is bytes:
+            kwargs = {"data": data, "headers": api.headers}
+        elif type(data) is MultipartEncoderMonitor or type(data) is MultipartEncoder:
+            kwargs = {"data": data, "headers": {**api.headers, "Content-Type": data.content_type}}
+        else:
+            json_body = data
+            if type(data) is dict:
+                json_body = {**data, **api.additional_fields}
+            kwargs = {"json": json_body, "headers": api.headers}
+        return self._request("POST", method, url, retries, raise_error, stream=stream, **kwargs)
+
+    def get(
+        self,
+        method: str,
+        params: Dict,
+        retries: Optional[int] = None,
+        stream: Optional[bool] = False,
+        use_public_api: Optional[bool] = True,
+    ) -> requests.Response:
+        """Performs GET request to server with given parameters, the same as sly.Api.get."""
+        api = self._api
+        url = api.api_server_address + "/v3/" + method
+        if use_public_api is False:
+            url = os.path.join(api.server_address, method)
+        json_body = params
+        if type(params) is dict:
+            json_body = {**params, **api.additional_fields}
+        return self._request(
+            "GET", method, url, retries, params=json_body, headers=api.headers, stream=stream
+        )
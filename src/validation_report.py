@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+import supervisely as sly
+
+OTHER_ERRORS = "Other errors"
+
+
+class ValidationSummary:
+    """
+    Bounded summary of validation errors: number of items for every error message, a few
+    sample names and the traceback of the first occurrence. Labels removed because of invalid
+    geometries are counted by class.
+
+    The number of distinct messages is limited too (messages may contain item-specific
+    details), the rest is counted under :data:`OTHER_ERRORS`. Summaries of the shards
+    validated in parallel are combined with :meth:`merge`.
+
+    :param max_samples: Maximum number of item names kept for every error.
+    :type max_samples: int
+    :param max_errors: Maximum number of distinct error messages.
+    :type max_errors: int
+    """
+
+    def __init__(self, max_samples: int = 20, max_errors: int = 50):
+        self.max_samples = max_samples
+        self.max_errors = max_errors
+        self.errors = {}
+        self.invalid_geometries = Counter()
+        self.invalid_geometry_samples = []
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def _get_error(self, message: str, trace: str) -> dict:
+        if message not in self.errors and len(self.errors) >= self.max_errors:
+            message = OTHER_ERRORS
+        return self.errors.setdefault(message, {"count": 0, "samples": [], "trace": trace})
+
+    def add(self, message: str, item_name: str, trace: str = "") -> None:
+        error = self._get_error(message, trace)
+        error["count"] += 1
+        if len(error["samples"]) < self.max_samples:
+            error["samples"].append(item_name)
+
+    def add_invalid_geometries(self, class_names: Iterable[str], item_name: str) -> None:
+        self.invalid_geometries.update(class_names)
+        if len(self.invalid_geometry_samples) < self.max_samples:
+            self.invalid_geometry_samples.append(item_name)
+
+    def merge(self, other: "ValidationSummary") -> None:
+        for message, other_error in other.errors.items():
+            error = self._get_error(message, other_error["trace"])
+            error["count"] += other_error["count"]
+            free = self.max_samples - len(error["samples"])
+            error["samples"].extend(other_error["samples"][:free])
+        self.invalid_geometries.update(other.invalid_geometries)
+        free = self.max_samples - len(self.invalid_geometry_samples)
+        self.invalid_geometry_samples.extend(other.invalid_geometry_samples[:free])
+
+    def log(self, failures_path: Optional[str] = None) -> None:
+        if len(self.invalid_geometries) > 0:
+            sly.logger.warn(
+                f"Removed {sum(self.invalid_geometries.values())} labels with invalid geometries "
+                "(broken or empty bitmaps, missing or wrong coordinates, outside the image), "
+                f"by class: {dict(self.invalid_geometries.most_common())}. "
+                f"Annotations: {self.invalid_geometry_samples}."
+            )
+        if len(self.errors) == 0:
+            return
+        sly.logger.warn("Incorrect Supervisely JSON annotations format:")
+        for message, error in self.errors.items():
+            samples = error["samples"]
+            more = (
+                f" and {error['count'] - len(samples)} more"
+                if error["count"] > len(samples)
+                else ""
+            )
+            sly.logger.warn(
+                f" - {message}: following errors occurred for {error['count']} items: "
+                f"{samples}{more}. "
+            )
+            if error["trace"]:
+                sly.logger.warn(error["trace"])
+        if failures_path is not None:
+            sly.logger.info(f"Full list of the failed items is saved to {failures_path}.")
+        sly.logger.info("These items will be skipped.")
+
+
+class FailuresFile:
+    """
+    JSON Lines file with every failed item of the import: dataset, item name and error.
+
+    Records are appended with a single write per call, so forked validation workers and
+    threads can write to the same file without holding full lists in memory.
+
+    :param path: Path to the file.
+    :type path: str
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, dataset: str, failures: Iterable[Tuple[str, str]]) -> None:
+        """Append records of the failed items given as (item name, error message) pairs."""
+        data = "".join(
+            json.dumps({"dataset": dataset, "item": name, "error": error}) + "\n"
+            for name, error in failures
+        ).encode("utf-8")
+        if len(data) == 0:
+            return
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                view = memoryview(data)
+                while len(view) > 0:
+                    view = view[os.write(fd, view) :]
+            finally:
+                os.close(fd)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
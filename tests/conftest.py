@@ -0,0 +1,11 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+# the app modules read the task context from the environment on import, the tests use the same
+# placeholders as the benchmarks (no requests are sent to the server)
+from common import setup_env  # noqa: E402
+
+setup_env()
@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import downloads
+import transport
+
+DATA = os.urandom(300 * 1024 + 17)
+
+
+class FileServer(ThreadingHTTPServer):
+    """Local HTTP server with Range support serving DATA, can cut responses short."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.etag = hashlib.md5(DATA).hexdigest()
+        self.ranges = []
+        self.connections = 0
+        # number of bytes sent before the connection is closed, None to send everything
+        self.cut_after = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/archive.tar"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        start, end = 0, len(DATA) - 1
+        range_header = self.headers.get("Range")
+        if range_header is not None:
+            start, end = [
+                int(value) for value in re.match(r"bytes=(\d+)-(\d+)", range_header).groups()
+            ]
+            self.server.ranges.append((start, end))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{self.server.etag}"')
+        self.end_headers()
+        body = DATA[start : end + 1]
+        if self.server.cut_after is not None and range_header is not None:
+            self.wfile.write(body[: self.server.cut_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(downloads, "CHUNK_SIZE", 4 * 1024)
+    monkeypatch.setattr(downloads, "STATE_SAVE_INTERVAL", 16 * 1024)
+    monkeypatch.setattr(downloads.time, "sleep", lambda seconds: None)
+
+
+def test_full_download(server, tmp_path):
+    path = str(tmp_path / "archive.tar")
+    info = downloads.probe(server.url)
+    assert info.size == len(DATA) and info.accept_ranges
+    server.ranges.clear()
+
+    downloads.download_resumable(info, path, connections=3)
+
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert not os.path.exists(path + ".state.json")
+    # the file is downloaded in 3 segments over parallel connections
+    segment_size = -(-len(DATA) // 3)
+    assert sorted(server.ranges) == [
+        (start, min(start + segment_size, len(DATA)) - 1)
+        for start in range(0, len(DATA), segment_size)
+    ]
+
+
+def test_probe_connection_is_reused(server, tmp_path):
+    path = str(tmp_path / "archive.tar")
+    with transport.create_session(1) as session:
+        info = downloads.probe(server.url, session)
+        downloads.download_resumable(info, path, session=session)
+    assert server.connections == 1
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_resumed_download(server, tmp_path, monkeypatch):
+    path = str(tmp_path / "archive.tar")
+    info = downloads.probe(server.url)
+    server.cut_after = 100 * 1024
+    monkeypatch.setattr(downloads, "MAX_RETRIES", 1)
+    with pytest.raises(RuntimeError):
+        downloads.download_resumable(info, path)
+    assert os.path.exists(path + ".state.json")
+
+    server.cut_after = None
+    server.ranges.clear()
+    progress = []
+    downloads.download_resumable(info, path, progress_cb=progress.append)
+
+    # the download continues from the saved offset, saved bytes are not requested again
+    resumed_from = server.ranges[0][0]
+    assert 0 < resumed_from <= 100 * 1024
+    assert progress[0] == resumed_from and sum(progress) == len(DATA)
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert not os.path.exists(path + ".state.json")
+
+
+def test_checksum_mismatch(server, tmp_path):
+    path = str(tmp_path / "archive.tar")
+    info = downloads.probe(server.url)
+
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        downloads.download_resumable(info, path, expected_hash="sha256:" + "0" * 64)
+
+    # the broken file is not resumed by the next attempt
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".state.json")
+    downloads.download_resumable(info, path, expected_hash=hashlib.sha256(DATA).hexdigest())
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_etag_mismatch(server, tmp_path):
+    path = str(tmp_path / "archive.tar")
+    server.etag = hashlib.md5(b"other content").hexdigest()
+    info = downloads.probe(server.url)
+
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        downloads.download_resumable(info, path)
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize(
+    "expected_hash",
+    ["0" * 50, "sha3000:" + "0" * 64, "shake_128:" + "0" * 32, "sha256:" + "0" * 40, "md5:xyz"],
+)
+def test_malformed_hash_fails_before_download(server, tmp_path, expected_hash):
+    path = str(tmp_path / "archive.tar")
+    info = downloads.probe(server.url)
+    server.ranges.clear()
+
+    with pytest.raises(ValueError):
+        downloads.download_resumable(info, path, expected_hash=expected_hash)
+    assert server.ranges == []
+    assert not os.path.exists(path)
+
+
+def test_hash_formats():
+    digest = hashlib.sha256(DATA)
+    b64 = base64.b64encode(digest.digest()).decode()
+    assert downloads.parse_expected_hash(digest.hexdigest()) == ("sha256", digest.hexdigest())
+    assert downloads.parse_expected_hash(f" SHA256:{b64} ") == ("sha256", b64)
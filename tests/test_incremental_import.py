@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+import supervisely as sly
+
+import sly_functions as f
+import sly_globals as g
+from manifest import ImportManifest
+from mock_api import MockApi
+
+ANN = {"description": "", "tags": [], "size": {"height": 4, "width": 4}, "objects": []}
+
+
+def write_item(dataset_dir: str, name: str, data: bytes) -> None:
+    with open(os.path.join(dataset_dir, "img", name), "wb") as file:
+        file.write(data)
+    with open(os.path.join(dataset_dir, "ann", name + ".json"), "w") as file:
+        json.dump(ANN, file)
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(g, "journal", None)
+    monkeypatch.setattr(g, "dedup", None)
+    return MockApi(str(tmp_path / "team_files"))
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    dataset_dir = str(tmp_path / "project" / "ds")
+    os.makedirs(os.path.join(dataset_dir, "img"))
+    os.makedirs(os.path.join(dataset_dir, "ann"))
+    return dataset_dir
+
+
+def upload_changes(api, dataset, dataset_dir, manifest) -> int:
+    dataset_fs = sly.Dataset(dataset_dir, sly.OpenMode.READ)
+    return f.upload_dataset_changes(api, dataset, dataset_fs, manifest)
+
+
+def server_images(api, dataset) -> dict:
+    return {image.name: image for image in api.image.get_list(dataset.id)}
+
+
+def test_changed_image_is_replaced(api, dataset_dir):
+    project = api.project.create(g.WORKSPACE_ID, "target")
+    dataset = api.dataset.create(project.id, "ds")
+    manifest = ImportManifest(project.id)
+    write_item(dataset_dir, "a.jpg", b"old a")
+    write_item(dataset_dir, "b.jpg", b"old b")
+    upload_changes(api, dataset, dataset_dir, manifest)
+    old_images = server_images(api, dataset)
+
+    write_item(dataset_dir, "a.jpg", b"new a")
+    upload_changes(api, dataset, dataset_dir, manifest)
+
+    images = server_images(api, dataset)
+    assert sorted(images) == ["a.jpg", "b.jpg"]
+    assert images["a.jpg"].id != old_images["a.jpg"].id
+    assert images["b.jpg"].id == old_images["b.jpg"].id
+    assert manifest.get_item("ds", "a.jpg")["image_id"] == images["a.jpg"].id
+
+
+def test_failed_replacement_keeps_outdated_image(api, dataset_dir, monkeypatch):
+    project = api.project.create(g.WORKSPACE_ID, "target")
+    dataset = api.dataset.create(project.id, "ds")
+    manifest = ImportManifest(project.id)
+    write_item(dataset_dir, "a.jpg", b"old a")
+    upload_changes(api, dataset, dataset_dir, manifest)
+    old_image = server_images(api, dataset)["a.jpg"]
+    old_entry = manifest.get_item("ds", "a.jpg")
+
+    def upload_paths(*args, **kwargs):
+        raise RuntimeError("Injected upload failure")
+
+    write_item(dataset_dir, "a.jpg", b"new a")
+    with monkeypatch.context() as patch:
+        patch.setattr(api.annotation, "upload_paths", upload_paths)
+        with pytest.raises(RuntimeError):
+            upload_changes(api, dataset, dataset_dir, manifest)
+
+    # the outdated image and its manifest entry are kept until the replacement is uploaded
+    assert server_images(api, dataset)["a.jpg"] == old_image
+    assert manifest.get_item("ds", "a.jpg") == old_entry
+
+    # the next run removes the unfinished replacement and replaces the image
+    upload_changes(api, dataset, dataset_dir, manifest)
+    images = server_images(api, dataset)
+    assert list(images) == ["a.jpg"]
+    assert images["a.jpg"].id != old_image.id
+    assert manifest.get_item("ds", "a.jpg")["image_id"] == images["a.jpg"].id
@@ -0,0 +1,59 @@
+import pytest
+import supervisely as sly
+
+from label_validation import validate_label
+
+META = sly.ProjectMeta(
+    obj_classes=[
+        sly.ObjClass("polygon", sly.Polygon),
+        sly.ObjClass("line", sly.Polyline),
+        sly.ObjClass("rectangle", sly.Rectangle),
+        sly.ObjClass("point", sly.Point),
+    ]
+)
+
+
+def label(class_name: str, exterior: list, interior: list = None) -> dict:
+    return {
+        "classTitle": class_name,
+        "tags": [],
+        "points": {"exterior": exterior, "interior": interior or []},
+    }
+
+
+def deserializes(label_json: dict) -> bool:
+    try:
+        sly.Label.from_json(label_json, META)
+    except Exception:
+        return False
+    return True
+
+
+def passes_structural_check(label_json: dict) -> bool:
+    try:
+        validate_label(label_json, META)
+    except Exception:
+        return False
+    return True
+
+
+@pytest.mark.parametrize(
+    "label_json",
+    [
+        label("polygon", []),
+        label("polygon", [[1, 1]]),
+        label("polygon", [[1, 1], [5, 1], [5, 5]]),
+        label("polygon", [[0, 0], [10, 0], [10, 10]], [[[2, 2], [3, 2], [3, 3]]]),
+        label("line", []),
+        label("line", [[1, 1]]),
+        label("line", [[1, 1], [5, 5]]),
+        label("rectangle", [[1, 1]]),
+        label("rectangle", [[1, 1], [5, 5]]),
+        label("rectangle", [[1, 1], [5, 5], [7, 7]]),
+        label("point", []),
+        label("point", [[1, 1]]),
+    ],
+)
+def test_structural_check_matches_from_json(label_json):
+    # a label that passes the check must be accepted by the SDK at upload, and the other way round
+    assert passes_structural_check(label_json) == deserializes(label_json)
@@ -0,0 +1,37 @@
+import os
+
+from overlay import create_overlay
+
+
+def test_directory_symlinks_are_skipped(tmp_path):
+    src_dir = tmp_path / "input"
+    outside_dir = tmp_path / "outside"
+    os.makedirs(src_dir / "project" / "ds" / "img")
+    os.makedirs(outside_dir)
+    (src_dir / "project" / "meta.json").write_text("{}")
+    (src_dir / "project" / "ds" / "img" / "a.jpg").write_bytes(b"a")
+    (outside_dir / "b.jpg").write_bytes(b"b")
+    os.symlink(outside_dir / "b.jpg", src_dir / "project" / "ds" / "img" / "b.jpg")
+    # a loop and a directory outside the input
+    os.symlink("..", src_dir / "project" / "ds" / "loop")
+    os.symlink(outside_dir, src_dir / "project" / "ds" / "outside")
+
+    dst_dir = str(tmp_path / "overlay")
+    files_cnt = create_overlay(str(src_dir), dst_dir)
+
+    paths = sorted(
+        os.path.relpath(os.path.join(root, name), dst_dir)
+        for root, dirs, files in os.walk(dst_dir)
+        for name in dirs + files
+    )
+    assert files_cnt == 3
+    assert paths == [
+        "project",
+        "project/ds",
+        "project/ds/img",
+        "project/ds/img/a.jpg",
+        "project/ds/img/b.jpg",
+        "project/meta.json",
+    ]
+    with open(os.path.join(dst_dir, "project/ds/img/b.jpg"), "rb") as f:
+        assert f.read() == b"b"
@@ -0,0 +1,47 @@
+import types
+
+import sly_functions as f
+from team_files import TeamFilesListing
+
+
+def create_listing(paths: list) -> TeamFilesListing:
+    files = [{"path": path, "meta": {"size": 1}} for path in paths]
+    api = types.SimpleNamespace(
+        file=types.SimpleNamespace(list=lambda team_id, path, recursive: files)
+    )
+    return TeamFilesListing(api, 1)
+
+
+def test_plan_download():
+    paths = [
+        "/input/project/meta.json",
+        "/input/project/ds/img/a.jpg",
+        "/input/project/ds/img/b.JPG",
+        "/input/project/ds/img/c.jpeg",
+        "/input/project/ds/img/d.png",
+        "/input/project/ds/ann/a.jpg.json",
+        # differs from the image name by case
+        "/input/project/ds/ann/b.jpg.json",
+        # differs from the image name by extension
+        "/input/project/ds/ann/c.jpg.json",
+        # the old format without the image extension
+        "/input/project/ds/ann/d.json",
+        "/input/project/ds/meta/A.JPG.json",
+        # no image for these files
+        "/input/project/ds/ann/e.jpg.json",
+        "/input/project/ds/meta/e.jpg.json",
+        "/input/project/ds/ann/notes.txt",
+        "/input/project/ds/img/.DS_Store",
+        # no "img" directory, the files are kept
+        "/input/project/ds2/ann/x.jpg.json",
+    ]
+
+    selected = f.plan_download(create_listing(paths), "/input/")
+
+    skipped = {
+        "/input/project/ds/ann/e.jpg.json",
+        "/input/project/ds/meta/e.jpg.json",
+        "/input/project/ds/ann/notes.txt",
+        "/input/project/ds/img/.DS_Store",
+    }
+    assert sorted(selected) == sorted(set(paths) - skipped)
@@ -0,0 +1,179 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import supervisely as sly
+from requests_toolbelt import MultipartEncoder
+
+import transport
+
+
+class ApiServer(ThreadingHTTPServer):
+    """Local API server recording the requests, the response depends on the method name."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.requests = []
+        self.calls = {}
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def address(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self) -> None:
+        self.requests = []
+        self.calls = {}
+        self.connections = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length > 0 else b""
+        self.server.requests.append(
+            (
+                self.command,
+                self.path,
+                body,
+                self.headers.get("Content-Type"),
+                self.headers.get("x-api-key"),
+            )
+        )
+        method = self.path.split("?")[0].rsplit("/", 1)[-1]
+        if method == "slow":
+            with self.server.lock:
+                self.server.in_flight += 1
+                self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            # time.sleep is patched by the tests
+            threading.Event().wait(0.02)
+            with self.server.lock:
+                self.server.in_flight -= 1
+        calls = self.server.calls[method] = self.server.calls.get(method, 0) + 1
+        status = {"bad": 400, "down": 503, "missing": 404}.get(method, 200)
+        if method == "flaky" and calls == 1:
+            status = 503
+        data = json.dumps({"method": method, "calls": calls}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _respond
+    do_POST = _respond
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append((record.levelname, record.getMessage()))
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ApiServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr("supervisely.io.network_exceptions.time.sleep", lambda seconds: None)
+
+
+def create_api(server: ApiServer, token, pooled: bool) -> sly.Api:
+    api = sly.Api(server.address, token, retry_count=3, retry_sleep_sec=0)
+    api._skip_https_redirect_check = True
+    api.additional_fields = {"context": {"task": 1}}
+    if pooled:
+        transport.PooledTransport(api, 4).install()
+    return api
+
+
+def run(server: ApiServer, api: sly.Api, call):
+    server.reset()
+    handler = ListHandler()
+    api.logger.addHandler(handler)
+    try:
+        response = call(api)
+        result = None if response is None else (response.status_code, response.json())
+    except Exception as e:
+        result = (type(e), str(e))
+    finally:
+        api.logger.removeHandler(handler)
+    return result, server.requests, handler.messages
+
+
+CALLS = {
+    "post_json": lambda api: api.post("ok", {"id": 1}),
+    "post_bytes": lambda api: api.post("ok", b"data"),
+    "post_multipart": lambda api: api.post(
+        "ok", MultipartEncoder(fields={"file": ("a.txt", b"data")}, boundary="b")
+    ),
+    "post_retry": lambda api: api.post("flaky", {"id": 1}),
+    "post_retries_exhausted": lambda api: api.post("down", {"id": 1}),
+    "post_client_error": lambda api: api.post("bad", {"id": 1}),
+    "post_not_found": lambda api: api.post("missing", {"id": 1}),
+    "post_raise_error": lambda api: api.post("flaky", {"id": 1}, raise_error=True),
+    "post_retries": lambda api: api.post("down", {"id": 1}, retries=1),
+    "get": lambda api: api.get("ok", {"id": 1}),
+    "get_private": lambda api: api.get("ok", {"id": 1}, use_public_api=False),
+    "get_retry": lambda api: api.get("flaky", {"id": 1}),
+    "get_retries_exhausted": lambda api: api.get("down", {"id": 1}),
+    "get_client_error": lambda api: api.get("bad", {"id": 1}),
+}
+
+
+@pytest.mark.parametrize("token", ["token", None])
+@pytest.mark.parametrize("name", CALLS)
+def test_same_as_sdk(server, name, token, monkeypatch):
+    if token is None:
+        monkeypatch.delenv("API_TOKEN")
+    # the pooled transport sends the same requests and returns or raises the same as sly.Api
+    expected = run(server, create_api(server, token, pooled=False), CALLS[name])
+    actual = run(server, create_api(server, token, pooled=True), CALLS[name])
+    assert actual == expected
+
+
+def test_connections_are_reused(server):
+    api = create_api(server, "token", pooled=True)
+    server.reset()
+    responses = [api.post("ok", {"id": 1}) for _ in range(3)]
+    responses += [api.get("ok", {"id": 1}) for _ in range(3)]
+    assert all(isinstance(response, requests.Response) for response in responses)
+    assert len(server.requests) == 6 and server.connections == 1
+
+
+def test_requests_in_flight_are_limited(server):
+    api = sly.Api(server.address, "token", retry_count=3, retry_sleep_sec=0)
+    api._skip_https_redirect_check = True
+    transport.PooledTransport(api, 8, max_requests=2).install()
+    server.max_in_flight = 0
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: api.post("slow", {}), range(16)))
+    assert server.max_in_flight == 2
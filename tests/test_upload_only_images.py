@@ -0,0 +1,94 @@
+import os
+from collections import Counter
+
+import pytest
+
+import sly_functions as f
+import sly_globals as g
+from mock_api import MockApi
+
+
+def make_image_dirs(root, sizes: dict) -> list:
+    img_dirs = []
+    for dir_name, images_cnt in sizes.items():
+        img_dir = os.path.join(root, dir_name)
+        os.makedirs(img_dir)
+        for idx in range(images_cnt):
+            with open(os.path.join(img_dir, f"image_{idx}.jpg"), "wb") as file:
+                file.write(f"{dir_name}/{idx}".encode() + os.urandom(16))
+        img_dirs.append(img_dir)
+    return img_dirs
+
+
+def uploaded_names(api: MockApi) -> Counter:
+    names = Counter()
+    for image in api.server.images.values():
+        names[(api.server.datasets[image.dataset_id].name, image.name)] += 1
+    return names
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(g, "UPLOAD_BATCH_SIZE", 4)
+    monkeypatch.setattr(g, "journal", None)
+    monkeypatch.setattr(g, "dedup", None)
+    monkeypatch.setattr(g, "TARGET_PROJECT_ID", None)
+    monkeypatch.setattr(f.time, "sleep", lambda seconds: None)
+    return MockApi(str(tmp_path / "team_files"))
+
+
+def test_batches_span_directories(api, tmp_path, monkeypatch):
+    img_dirs = make_image_dirs(tmp_path / "data", {"a": 3, "b": 2, "c": 4})
+    bulk_sizes = []
+    upload_data_bulk = api.image._upload_data_bulk
+
+    def _upload_data_bulk(func, items_hashes):
+        items_hashes = list(items_hashes)
+        bulk_sizes.append(len(items_hashes))
+        upload_data_bulk(func, items_hashes)
+
+    monkeypatch.setattr(api.image, "_upload_data_bulk", _upload_data_bulk)
+
+    project = f.upload_only_images(api, img_dirs)
+
+    assert project is not None and project.name == "Images project"
+    # 9 images of 3 directories are sent in batches of 4, not one request per directory
+    assert sorted(bulk_sizes) == [1, 4, 4]
+    expected = {
+        (d, f"image_{i}.jpg"): 1 for d, cnt in {"a": 3, "b": 2, "c": 4}.items() for i in range(cnt)
+    }
+    assert uploaded_names(api) == expected
+    assert not any(os.path.exists(img_dir) for img_dir in img_dirs)
+
+
+def test_retry_after_failure_does_not_duplicate_images(api, tmp_path, monkeypatch):
+    # batches of 4 images: a + b, c + d
+    img_dirs = make_image_dirs(tmp_path / "data", {"a": 2, "b": 2, "c": 2, "d": 2})
+    upload_hashes = api.image.upload_hashes
+    calls = Counter()
+
+    def _upload_hashes(dataset_id, names, hashes, *args, **kwargs):
+        # the second dataset of every batch fails once, after the first one got its images
+        dataset_name = api.server.datasets[dataset_id].name
+        calls[dataset_name] += 1
+        if dataset_name in ("b", "d") and calls[dataset_name] == 1:
+            raise RuntimeError("Injected upload failure")
+        return upload_hashes(dataset_id, names, hashes, *args, **kwargs)
+
+    monkeypatch.setattr(api.image, "upload_hashes", _upload_hashes)
+
+    project = f.upload_only_images(api, img_dirs)
+
+    assert project is not None
+    # the failed datasets are retried, the datasets of the batch that succeeded are not
+    assert calls == {"a": 1, "b": 2, "c": 1, "d": 2}
+    expected = {(d, f"image_{i}.jpg"): 1 for d in "abcd" for i in range(2)}
+    assert uploaded_names(api) == expected
+
+
+def test_empty_project_is_removed(api, tmp_path):
+    img_dir = tmp_path / "data" / "empty"
+    os.makedirs(img_dir)
+
+    assert f.upload_only_images(api, [str(img_dir)]) is None
+    assert api.server.projects == {}